@@ -0,0 +1,311 @@
+"""Liquid address encoding
+
+Base58check (p2pkh, p2sh) and bech32/bech32m (segwit) addresses for the
+supported networks, computed locally from scripts, and their confidential
+versions (base58check and blech32/blech32m), which embed a blinding public
+key.
+"""
+
+import hashlib
+
+from liquidswap.constants import (
+    P2PKH_PREFIX,
+    P2SH_PREFIX,
+    BECH32_HRP,
+    CONFIDENTIAL_PREFIX,
+    BLECH32_HRP,
+)
+
+
+B58_DIGITS = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+BECH32_CHARSET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+BECH32_CONST = 1
+BECH32M_CONST = 0x2bc830a3
+BLECH32_CONST = 1
+BLECH32M_CONST = 0x455972a3350f7a1
+# bech32 addresses are at most 90 characters long, blech32 ones 1000
+BECH32_MAX_LENGTH = 90
+BLECH32_MAX_LENGTH = 1000
+PUBKEY_SIZE = 33
+
+OP_0 = 0x00
+OP_1 = 0x51
+OP_16 = 0x60
+OP_DUP = 0x76
+OP_EQUAL = 0x87
+OP_EQUALVERIFY = 0x88
+OP_HASH160 = 0xa9
+OP_CHECKSIG = 0xac
+
+
+def _sha256d(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def b58check_encode(payload):
+    data = payload + _sha256d(payload)[:4]
+    n = int.from_bytes(data, 'big')
+    chars = []
+    while n:
+        n, r = divmod(n, 58)
+        chars.append(B58_DIGITS[r])
+    pad = len(data) - len(data.lstrip(b'\0'))
+    return '1' * pad + ''.join(reversed(chars))
+
+
+def b58check_decode(s):
+    """Return the payload of a base58check string, raise ValueError if it is
+    not valid
+    """
+    n = 0
+    for c in s:
+        if c not in B58_DIGITS:
+            raise ValueError('Invalid base58 character')
+        n = n * 58 + B58_DIGITS.index(c)
+    pad = len(s) - len(s.lstrip('1'))
+    data = b'\0' * pad + n.to_bytes((n.bit_length() + 7) // 8, 'big')
+    payload, checksum = data[:-4], data[-4:]
+    if len(data) < 4 or _sha256d(payload)[:4] != checksum:
+        raise ValueError('Invalid base58 checksum')
+    return payload
+
+
+def _polymod(values, generator, checksum_length):
+    chk = 1
+    shift = 5 * (checksum_length - 1)
+    for value in values:
+        top = chk >> shift
+        chk = (chk & ((1 << shift) - 1)) << 5 ^ value
+        for i, g in enumerate(generator):
+            chk ^= g if (top >> i) & 1 else 0
+    return chk
+
+
+BECH32_GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd,
+                    0x2a1462b3)
+BLECH32_GENERATOR = (0x7d52fba40bd886, 0x5e8dbf1a03950c, 0x1c3a3c74072a18,
+                     0x385d72fa0e5139, 0x7093e5a608865b)
+
+
+def _hrp_expand(hrp):
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+
+def _convertbits(data, frombits, tobits, pad=True):
+    acc = bits = 0
+    ret = []
+    maxv = (1 << tobits) - 1
+    for value in data:
+        if value >> frombits:
+            raise ValueError('Invalid data')
+        acc = (acc << frombits) | value
+        bits += frombits
+        while bits >= tobits:
+            bits -= tobits
+            ret.append((acc >> bits) & maxv)
+    if pad:
+        if bits:
+            ret.append((acc << (tobits - bits)) & maxv)
+    elif bits >= frombits or ((acc << (tobits - bits)) & maxv):
+        raise ValueError('Invalid padding')
+    return ret
+
+
+def _checksummed(hrp, data, const, generator, checksum_length):
+    values = _hrp_expand(hrp) + data
+    polymod = _polymod(values + [0] * checksum_length, generator,
+                       checksum_length) ^ const
+    return data + [(polymod >> 5 * (checksum_length - 1 - i)) & 31
+                   for i in range(checksum_length)]
+
+
+def segwit_encode(hrp, version, program):
+    """bech32 (version 0) or bech32m address of a witness program"""
+    const = BECH32_CONST if version == 0 else BECH32M_CONST
+    data = _checksummed(hrp, [version] + _convertbits(program, 8, 5), const,
+                        BECH32_GENERATOR, 6)
+    return hrp + '1' + ''.join(BECH32_CHARSET[d] for d in data)
+
+
+def blech32_encode(hrp, version, pubkey, program):
+    """blech32 (version 0) or blech32m address of a blinded witness program
+    """
+    const = BLECH32_CONST if version == 0 else BLECH32M_CONST
+    data = _checksummed(hrp, [version] + _convertbits(pubkey + program, 8, 5),
+                        const, BLECH32_GENERATOR, 12)
+    return hrp + '1' + ''.join(BECH32_CHARSET[d] for d in data)
+
+
+def _segwit_decode(address, hrp, consts, generator, checksum_length,
+                   max_length):
+    """Return (version, payload) of a (b)lech32 address with hrp, raise
+    ValueError if it is not valid
+    """
+    if len(address) > max_length or \
+            address.lower() != address and address.upper() != address:
+        raise ValueError('Invalid segwit address')
+    address = address.lower()
+    pos = address.rfind('1')
+    if address[:pos] != hrp or len(address) - pos - 1 < checksum_length + 1:
+        raise ValueError('Invalid segwit address prefix')
+    if any(c not in BECH32_CHARSET for c in address[pos + 1:]):
+        raise ValueError('Invalid segwit address character')
+    data = [BECH32_CHARSET.index(c) for c in address[pos + 1:]]
+    version = data[0]
+    const = consts[0] if version == 0 else consts[1]
+    if version > 16 or \
+            _polymod(_hrp_expand(hrp) + data, generator,
+                     checksum_length) != const:
+        raise ValueError('Invalid segwit address checksum')
+    return version, bytes(_convertbits(data[1:-checksum_length], 5, 8,
+                                       pad=False))
+
+
+def _check_program(version, program):
+    if not 2 <= len(program) <= 40 or \
+            version == 0 and len(program) not in (20, 32):
+        raise ValueError('Invalid witness program length')
+
+
+def _check_pubkey(pubkey):
+    # the curve point is not checked
+    if len(pubkey) != PUBKEY_SIZE or pubkey[0] not in (2, 3):
+        raise ValueError('Invalid blinding public key')
+
+
+def parse_address(address, network):
+    """Return (unconfidential address, blinding public key) of a Liquid
+    address, the key is None if the address is not confidential
+
+    Raise ValueError if address is not valid for network.
+    """
+    if not isinstance(address, str):
+        raise ValueError('Invalid address')
+
+    if address.lower().startswith(BLECH32_HRP[network] + '1'):
+        version, payload = _segwit_decode(
+            address, BLECH32_HRP[network], (BLECH32_CONST, BLECH32M_CONST),
+            BLECH32_GENERATOR, 12, BLECH32_MAX_LENGTH)
+        pubkey, program = payload[:PUBKEY_SIZE], payload[PUBKEY_SIZE:]
+        _check_pubkey(pubkey)
+        _check_program(version, program)
+        return segwit_encode(BECH32_HRP[network], version, program), pubkey
+
+    if address.lower().startswith(BECH32_HRP[network] + '1'):
+        version, program = _segwit_decode(
+            address, BECH32_HRP[network], (BECH32_CONST, BECH32M_CONST),
+            BECH32_GENERATOR, 6, BECH32_MAX_LENGTH)
+        _check_program(version, program)
+        return segwit_encode(BECH32_HRP[network], version, program), None
+
+    payload = b58check_decode(address)
+    prefixes = (P2PKH_PREFIX[network], P2SH_PREFIX[network])
+    if len(payload) == 21 and payload[0] in prefixes:
+        return address, None
+    if len(payload) == 2 + PUBKEY_SIZE + 20 and \
+            payload[0] == CONFIDENTIAL_PREFIX[network] and \
+            payload[1] in prefixes:
+        pubkey = payload[2:2 + PUBKEY_SIZE]
+        _check_pubkey(pubkey)
+        return b58check_encode(payload[1:2] + payload[2 + PUBKEY_SIZE:]), \
+            pubkey
+    raise ValueError('Invalid address for network')
+
+
+def confidential_address(address, pubkey, network):
+    """Confidential address of an unconfidential address and a blinding
+    public key (bytes)
+
+    Raise ValueError if address is not valid for network.
+    """
+    u_address, _ = parse_address(address, network)
+    _check_pubkey(pubkey)
+    if u_address.startswith(BECH32_HRP[network] + '1'):
+        version, program = _segwit_decode(
+            u_address, BECH32_HRP[network], (BECH32_CONST, BECH32M_CONST),
+            BECH32_GENERATOR, 6, BECH32_MAX_LENGTH)
+        return blech32_encode(BLECH32_HRP[network], version, pubkey, program)
+    payload = b58check_decode(u_address)
+    return b58check_encode(bytes([CONFIDENTIAL_PREFIX[network]]) +
+                           payload[:1] + pubkey + payload[1:])
+
+
+def address_script(address, network):
+    """Output script (bytes) of a (confidential or unconfidential) address
+
+    Raise ValueError if address is not valid for network.
+    """
+    u_address, _ = parse_address(address, network)
+    if u_address.startswith(BECH32_HRP[network] + '1'):
+        version, program = _segwit_decode(
+            u_address, BECH32_HRP[network], (BECH32_CONST, BECH32M_CONST),
+            BECH32_GENERATOR, 6, BECH32_MAX_LENGTH)
+        return bytes([OP_0 if version == 0 else OP_1 + version - 1,
+                      len(program)]) + program
+    payload = b58check_decode(u_address)
+    if payload[0] == P2PKH_PREFIX[network]:
+        return bytes([OP_DUP, OP_HASH160, 20]) + payload[1:] + \
+            bytes([OP_EQUALVERIFY, OP_CHECKSIG])
+    return bytes([OP_HASH160, 20]) + payload[1:] + bytes([OP_EQUAL])
+
+
+def is_valid_address(address, network):
+    try:
+        parse_address(address, network)
+    except ValueError:
+        return False
+    return True
+
+
+def witness_program(script):
+    """Return (version, program) of a witness output script, None if script
+    is not a witness program
+    """
+    if 4 <= len(script) <= 42 and \
+            (script[0] == OP_0 or OP_1 <= script[0] <= OP_16) and \
+            script[1] == len(script) - 2:
+        version = 0 if script[0] == OP_0 else script[0] - OP_1 + 1
+        return version, script[2:]
+    return None
+
+
+def script_type(script):
+    """Output type of script, as reported by decoderawtransaction (Elements
+    versions before 22 report witness_unknown for version 1 too)
+    """
+    if not script:
+        return 'fee'
+    if len(script) == 25 and script[:3] == bytes([OP_DUP, OP_HASH160, 20]) \
+            and script[23:] == bytes([OP_EQUALVERIFY, OP_CHECKSIG]):
+        return 'pubkeyhash'
+    if len(script) == 23 and script[:2] == bytes([OP_HASH160, 20]) and \
+            script[22] == OP_EQUAL:
+        return 'scripthash'
+    program = witness_program(script)
+    if program is not None:
+        version, data = program
+        if version == 0 and len(data) == 20:
+            return 'witness_v0_keyhash'
+        if version == 0 and len(data) == 32:
+            return 'witness_v0_scripthash'
+        if version == 1 and len(data) == 32:
+            return 'witness_v1_taproot'
+        if version != 0:
+            return 'witness_unknown'
+        return 'nonstandard'
+    if script[0] == 0x6a:
+        return 'nulldata'
+    return 'nonstandard'
+
+
+def script_address(script, network):
+    """Unconfidential address of an output script, None if it has none"""
+    typ = script_type(script)
+    if typ == 'pubkeyhash':
+        return b58check_encode(bytes([P2PKH_PREFIX[network]]) + script[3:23])
+    if typ == 'scripthash':
+        return b58check_encode(bytes([P2SH_PREFIX[network]]) + script[2:22])
+    if typ.startswith('witness_'):
+        version, program = witness_program(script)
+        return segwit_encode(BECH32_HRP[network], version, program)
+    return None
@@ -1,4 +1,6 @@
-from liquidswap.liquidrpc import RawProxy, JSONRPCError
+import threading
+
+from liquidswap.liquidrpc import RawProxy, RPCCache, RPCMetrics, JSONRPCError
 from liquidswap.exceptions import LiquidSwapError
 
 
@@ -7,11 +9,82 @@ CONNECTION_ERROR_MESSAGE = \
     'Unable to connect to Elements Node. Are you sure you have started the ' \
     'node and the parameters are correct?'
 
+# http.client connections are not thread safe, each thread keeps its own
+# connections
+_cache = threading.local()
+
+# results of metadata calls and metrics are shared by the connections of all
+# the threads: credentials key -> (RPCCache, RPCMetrics)
+_shared = dict()
+_shared_lock = threading.Lock()
+
 
 class ConnectionError(ValueError):
     """Unable to connect to the Elements node"""
 
 
+def _credentials_key(credentials):
+    return tuple(sorted(credentials.items()))
+
+
+def _cached_connections():
+    if not hasattr(_cache, 'connections'):
+        _cache.connections = dict()
+    return _cache.connections
+
+
+def _shared_state(key):
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = (RPCCache(), RPCMetrics())
+        return _shared[key]
+
+
+def get_connection(credentials):
+    """Get a connection with the Elements node
+
+    Connections are cached by credentials, so that the same keep-alive
+    connection is reused instead of parsing elements.conf and the cookie file
+    and opening a new socket every time.
+    """
+    connections = _cached_connections()
+    key = _credentials_key(credentials)
+    connection = connections.get(key)
+    if connection is None:
+        cache, metrics = _shared_state(key)
+        connection = RawProxy(cache=cache, metrics=metrics, **credentials)
+        connections[key] = connection
+    return connection
+
+
+def drop_connection(credentials):
+    """Close and forget the cached connection for the given credentials
+
+    The next request re-reads elements.conf and the cookie file, e.g. after
+    the node has been restarted.
+    """
+    key = _credentials_key(credentials)
+    connection = _cached_connections().pop(key, None)
+    if connection is not None:
+        connection.close()
+    cache, _ = _shared_state(key)
+    cache.invalidate()
+
+
+def get_metrics(credentials):
+    """RPCMetrics of the connections (of all threads) using credentials"""
+    _, metrics = _shared_state(_credentials_key(credentials))
+    return metrics
+
+
+def close_connections():
+    """Close all the connections cached by the current thread"""
+    connections = _cached_connections()
+    while connections:
+        _, connection = connections.popitem()
+        connection.close()
+
+
 class ConnCtx(object):
     """Connection context
 
@@ -35,7 +108,7 @@ class ConnCtx(object):
         """Get a connection with the Elements node
         """
         try:
-            return RawProxy(**self.credentials)
+            return get_connection(self.credentials)
         except Exception as e:
             raise ConnectionError('{}\n\n{}'.format(CONNECTION_ERROR_MESSAGE,
                                                     str(e)))
@@ -52,6 +125,9 @@ class ConnCtx(object):
                           message=str(value),
                           start_over=self.start_over)
         elif issubclass(typ, Exception):
+            # the connection may be broken or the credentials outdated (e.g.
+            # new cookie), start from scratch next time
+            drop_connection(self.credentials)
             self.critical(title='Error',
                           message=str(value),
                           start_over=self.start_over)
@@ -41,8 +41,67 @@ DUMMY_ADDRESS_CONFIDENTIAL = {
 #        lead to an incorrect fee estimation. In addition, for better anonimity
 #        it would be better if all the address types are equal.
 
+# address version bytes and segwit human readable parts
+P2PKH_PREFIX = {
+    NETWORK_REGTEST: 0xeb,
+    NETWORK_MAINNET: 0x39,
+    NETWORK_LIQUIDTESTNET: 0x24,
+}
+P2SH_PREFIX = {
+    NETWORK_REGTEST: 0x4b,
+    NETWORK_MAINNET: 0x27,
+    NETWORK_LIQUIDTESTNET: 0x13,
+}
+BECH32_HRP = {
+    NETWORK_REGTEST: 'ert',
+    NETWORK_MAINNET: 'ex',
+    NETWORK_LIQUIDTESTNET: 'tex',
+}
+# confidential addresses: base58 prefix and blech32 human readable parts
+CONFIDENTIAL_PREFIX = {
+    NETWORK_REGTEST: 0x04,
+    NETWORK_MAINNET: 0x0c,
+    NETWORK_LIQUIDTESTNET: 0x17,
+}
+BLECH32_HRP = {
+    NETWORK_REGTEST: 'el',
+    NETWORK_MAINNET: 'lq',
+    NETWORK_LIQUIDTESTNET: 'tlq',
+}
+
+# decoderawtransaction reports a single 'address' in scriptPubKey since this
+# version, 'reqSigs' and 'addresses' before
+SINGLE_ADDRESS_MIN_VERSION = 220000
+
+# where transactions are decoded: by the node, locally, or both comparing the
+# results
+DECODER_NODE = 'node'
+DECODER_LOCAL = 'local'
+DECODER_CHECK = 'check'
+DECODERS = [DECODER_NODE, DECODER_LOCAL, DECODER_CHECK]
+
+# swaps are done with PSETs (partially signed Elements transactions) since
+# this version, which reveals the values of the inputs in them
+PSET_MIN_VERSION = 220100
+
+# outstanding proposals keep their unspents reserved for this long (seconds)
+RESERVATION_TTL = 24 * 60 * 60
+
+# states of a swap in a session store
+SESSION_PROPOSED = 'proposed'
+SESSION_PARSED = 'parsed'
+SESSION_ACCEPTED = 'accepted'
+SESSION_FINALIZED = 'finalized'
+SESSION_BROADCAST = 'broadcast'
+SESSION_STATES = [SESSION_PROPOSED, SESSION_PARSED, SESSION_ACCEPTED,
+                  SESSION_FINALIZED, SESSION_BROADCAST]
+
 PROPOSED_KEYS = ['tx', 'u_address_p', 'map_confidential', 'unspents_details']
 ACCEPTED_KEYS = ['tx', 'blinding_keys', 'u_address_p', 'u_address_r']
+PROPOSED_PSET_KEYS = ['pset', 'u_address_p', 'fee_p']
+ACCEPTED_PSET_KEYS = ['pset', 'u_address_p', 'u_address_r']
+UNSPENT_DETAILS_KEYS = ['txid', 'vout', 'amount', 'asset', 'amountblinder',
+                        'assetblinder']
 
 OWN_PROPOSAL_ERROR_MSG = 'Unable to continue swap. This proposal was created' \
                          ' by the same wallet. The Liquid Swap Tool requires' \
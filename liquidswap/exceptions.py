@@ -39,6 +39,14 @@ class InvalidTransactionError(LiquidSwapError):
     """Transaction won't be accepted by mempool"""
 
 
+class TransactionDecodeError(LiquidSwapError):
+    """Unable to decode a raw transaction"""
+
+
+class DecodeMismatchError(LiquidSwapError):
+    """Local and node decoding of a transaction differ"""
+
+
 class UnsupportedLiquidVersionError(LiquidSwapError):
     """Liquid version running is below minimum supported"""
 
@@ -51,6 +59,10 @@ class LockedWalletError(LiquidSwapError):
     """Wallet is locked"""
 
 
+class ReservationStoreError(LiquidSwapError):
+    """Unable to read the unspents reservations"""
+
+
 class InvalidAssetIdError(LiquidSwapError):
     """Asset id or already in the wallet"""
 
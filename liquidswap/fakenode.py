@@ -0,0 +1,1361 @@
+"""In-process stand-in for an Elements node
+
+A JSON-RPC HTTP server backed by an in-memory wallet model, implementing the
+calls used by the swap tool, so that swaps can be load tested without running
+elementsd.
+
+Several wallets (one per port) share a FakeChain: broadcast transactions are
+mined at once, their outputs are spendable by the next call. Transactions are
+serialized as Elements transactions, with fake commitments, proofs and
+signatures, but they are structurally consistent: inputs must exist and be
+signed, blinded amounts and assets are kept by the chain and checked against
+the inputs, signatures are invalidated by any change to the transaction, fees
+must meet the relay fee.
+
+Addresses are p2sh base58 addresses, blinding keys are random and not valid
+curve points. PSETs are base64 encoded JSON, they are not real PSETs: only
+the decodepsbt results look like the Elements ones.
+
+Run with:
+python -m liquidswap.fakenode --port 7050 --wallets 2
+"""
+
+import argparse
+import base64
+import decimal
+import hashlib
+import http.server
+import json
+import math
+import os
+import random
+import re
+import socketserver
+import sys
+import threading
+
+from liquidswap import transaction
+from liquidswap.address import b58check_encode, b58check_decode, script_type
+from liquidswap.exceptions import TransactionDecodeError
+from liquidswap.util import get_chain_index
+
+
+# chain name -> (policy asset, p2sh prefix, confidential prefix)
+CHAIN_PARAMS = {
+    'elementsregtest': (
+        '5ac9f65c0efcc4775e0baec4ec03abdde22473cd3cf33c0419ca290e0751b225',
+        0x4b, 0x04),
+    'liquidv1': (
+        '6f0279e9ed041c3d710a9f57d0c02928416460c4b722ae3457a11eec381c526d',
+        0x27, 0x0c),
+    'liquidtestnet': (
+        '144c654344aa716d6f3abcc1ca90e5641e4e2a7f633bc09fe3baf64585819a49',
+        0x13, 0x17),
+}
+
+DEFAULT_VERSION = 210000
+WALLET_VERSION = 169900
+# BTC/kvB
+RELAY_FEE = decimal.Decimal('0.00001')
+DEFAULT_FEE_RATE = decimal.Decimal('0.0001')
+
+SEQUENCE_FINAL = 0xffffffff
+SEQUENCE_RBF = 0xfffffffd
+ZERO_BLINDER = '00' * 32
+
+# fake proofs and signatures have the size of the real ones, see
+# liquidswap.transaction
+# rangeproof header: minimum value 1, 36 bits mantissa, exponent 0
+RANGEPROOF_HEADER = bytes([0x60, 35]) + (1).to_bytes(8, 'big')
+SIGHASH_ALL = b'\x01'
+# change output, to estimate the size of a transaction once funded
+ESTIMATE_CHANGE_OUTPUT = {'address': b58check_encode(bytes(21)),
+                          'nonce': '02' + ZERO_BLINDER,
+                          'asset': ZERO_BLINDER, 'value': 0}
+
+# prefix of the (fake) serialized PSETs
+PSET_MAGIC = b'pset\xff'
+FAKE_PROOF = '00' * 32
+
+# decoded fields holding an amount
+AMOUNT_FIELDS = ['value', 'value-minimum', 'value-maximum']
+
+# JSON-RPC error codes
+RPC_METHOD_NOT_FOUND = -32601
+RPC_WALLET_ERROR = -4
+RPC_INVALID_ADDRESS_OR_KEY = -5
+RPC_WALLET_INSUFFICIENT_FUNDS = -6
+RPC_INVALID_PARAMETER = -8
+RPC_DESERIALIZATION_ERROR = -22
+RPC_VERIFY_ERROR = -25
+RPC_VERIFY_REJECTED = -26
+
+
+class RPCError(Exception):
+    """Error returned to the client as JSON-RPC error"""
+
+    def __init__(self, code, message):
+        super(RPCError, self).__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _sha256d(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def blinding_pubkey(privkey):
+    """Fake public key of a blinding private key (hex)"""
+    return '02' + hashlib.sha256(b'blinding' +
+                                 bytes.fromhex(privkey)).hexdigest()
+
+
+def sat2btc(sat):
+    return decimal.Decimal(sat).scaleb(-8)
+
+
+def btc2sat(btc):
+    if isinstance(btc, bool) or not isinstance(
+            btc, (int, float, decimal.Decimal)):
+        raise RPCError(RPC_INVALID_PARAMETER, 'Invalid amount')
+    return int(round(decimal.Decimal(btc).scaleb(8)))
+
+
+class Amount(object):
+    """Amount in satoshis, encoded in JSON as BTC with 8 decimals"""
+
+    def __init__(self, sat):
+        self.sat = sat
+
+
+_AMOUNT_RE = re.compile(r'"\\u0000(-?[0-9]+\.[0-9]{8})\\u0000"')
+
+
+def _json_default(obj):
+    # the stdlib encoder cannot write numbers verbatim: write a marked string
+    # and remove the quotes afterwards
+    if isinstance(obj, Amount):
+        return '\0{}\0'.format(sat2btc(obj.sat))
+    raise TypeError('Object of type %s is not JSON serializable' %
+                    type(obj).__name__)
+
+
+def dumps(obj):
+    return _AMOUNT_RE.sub(r'\1', json.dumps(obj, default=_json_default))
+
+
+def _is_blinded(output):
+    return output.get('valuecommitment') is not None
+
+
+def _wire_input(input_):
+    """Input as in liquidswap.transaction, signed inputs spend p2sh-p2wpkh
+    outputs"""
+    wire = {'txid': input_['txid'], 'vout': input_['vout'],
+            'is_pegin': False, 'script_sig': b'',
+            'sequence': input_['sequence'], 'issuance': None,
+            'issuance_amount_rangeproof': b'',
+            'inflation_keys_rangeproof': b'', 'witness': [],
+            'pegin_witness': []}
+    if input_.get('witness'):
+        signature = bytes.fromhex(input_['witness'])
+        pubkey = b'\x02' + hashlib.sha256(signature).digest()
+        keyhash = hashlib.sha256(pubkey).digest()[:20]
+        wire['script_sig'] = bytes([22, 0, 20]) + keyhash
+        wire['witness'] = [
+            signature.ljust(transaction.SIGNATURE_SIZE - 1, b'\0') +
+            SIGHASH_ALL, pubkey]
+    return wire
+
+
+def _wire_output(output, n_inputs):
+    """Output as in liquidswap.transaction, with fake proofs if blinded"""
+    script = b''
+    if output.get('address') is not None:
+        script = bytes([0xa9, 20]) + b58check_decode(output['address'])[1:] \
+            + bytes([0x87])
+    nonce = output.get('nonce')
+    wire = {
+        'nonce': bytes.fromhex(nonce) if nonce else transaction.NULL,
+        'script_pubkey': script,
+        'surjectionproof': b'',
+        'rangeproof': b'',
+    }
+    if _is_blinded(output):
+        wire.update({
+            'asset': bytes.fromhex(output['assetcommitment']),
+            'value': bytes.fromhex(output['valuecommitment']),
+            'surjectionproof': bytes(
+                transaction.surjectionproof_size(n_inputs)),
+            'rangeproof': RANGEPROOF_HEADER.ljust(
+                transaction.RANGEPROOF_SIZE, b'\0'),
+        })
+    else:
+        wire.update({
+            'asset': b'\x01' + bytes.fromhex(output['asset'])[::-1],
+            'value': b'\x01' + output['value'].to_bytes(8, 'big'),
+        })
+    return wire
+
+
+def _wire_tx(tx):
+    return {
+        'version': tx.get('version', 2),
+        'locktime': tx.get('locktime', 0),
+        'vin': [_wire_input(i) for i in tx['vin']],
+        'vout': [_wire_output(o, len(tx['vin'])) for o in tx['vout']],
+    }
+
+
+def encode_tx(tx):
+    return transaction.serialize(_wire_tx(tx)).hex()
+
+
+def decode_tx(hex_tx, p2sh_prefix):
+    """Decode a transaction with p2sh and fee outputs only"""
+    try:
+        wire = transaction.deserialize(bytes.fromhex(hex_tx))
+        if any(o['script_pubkey'] and
+               script_type(o['script_pubkey']) != 'scripthash'
+               for o in wire['vout']):
+            raise ValueError
+    except (TypeError, ValueError, TransactionDecodeError):
+        raise RPCError(RPC_DESERIALIZATION_ERROR, 'TX decode failed')
+
+    tx = {'version': wire['version'], 'locktime': wire['locktime'],
+          'vin': [], 'vout': []}
+    for input_ in wire['vin']:
+        witness = input_['witness']
+        tx['vin'].append({
+            'txid': input_['txid'],
+            'vout': input_['vout'],
+            'sequence': input_['sequence'],
+            'witness': witness[0][:32].hex() if witness else None,
+        })
+    for output in wire['vout']:
+        script = output['script_pubkey']
+        decoded = {
+            'address': b58check_encode(bytes([p2sh_prefix]) + script[2:22])
+            if script else None,
+            'nonce': output['nonce'].hex()
+            if output['nonce'] != transaction.NULL else None,
+            'asset': transaction.explicit_asset(output['asset']),
+            'value': transaction.explicit_value(output['value']),
+        }
+        if decoded['value'] is None:
+            decoded.update({'assetcommitment': output['asset'].hex(),
+                            'valuecommitment': output['value'].hex()})
+        tx['vout'].append(decoded)
+    return tx
+
+
+def _without_witness(tx):
+    return dict(tx, vin=[dict(i, witness=None) for i in tx['vin']])
+
+
+def txid(tx):
+    return transaction.txid(_wire_tx(tx))
+
+
+def _signature(tx, n):
+    sighash = _sha256d(transaction.serialize(_wire_tx(_without_witness(tx)),
+                                             witness=False))
+    return hashlib.sha256(b'signature' + sighash +
+                          n.to_bytes(4, 'little')).hexdigest()
+
+
+def encode_pset(pset):
+    return base64.b64encode(PSET_MAGIC + json.dumps(pset).encode(
+        'utf8')).decode('utf8')
+
+
+def decode_pset(psbt):
+    """PSET (dict) of a base64 string, raise RPCError if it is not valid"""
+    try:
+        data = base64.b64decode(psbt, validate=True)
+        if not data.startswith(PSET_MAGIC):
+            raise ValueError
+        return json.loads(data[len(PSET_MAGIC):].decode('utf8'))
+    except (TypeError, ValueError):
+        raise RPCError(RPC_DESERIALIZATION_ERROR, 'TX decode failed')
+
+
+def tx_pset(tx):
+    """PSET of an unsigned transaction, with explicit outputs"""
+    return {
+        'locktime': tx['locktime'],
+        'inputs': [{'txid': i['txid'], 'vout': i['vout'],
+                    'sequence': i['sequence'], 'utxo': False,
+                    'explicit': False, 'witness': None}
+                   for i in tx['vin']],
+        'outputs': [{'address': o['address'], 'nonce': o['nonce'],
+                     'asset': o['asset'], 'value': o['value'],
+                     'blinder_index': o.get('blinder_index'),
+                     'assetcommitment': None, 'valuecommitment': None}
+                    for o in tx['vout']],
+    }
+
+
+def pset_tx(pset):
+    """Transaction of a PSET, blinded outputs only carry their commitments"""
+    return {
+        'version': 2,
+        'locktime': pset['locktime'],
+        'vin': [{'txid': i['txid'], 'vout': i['vout'],
+                 'sequence': i['sequence'], 'witness': i['witness']}
+                for i in pset['inputs']],
+        'vout': [dict(o, asset=None, value=None) if _is_blinded(o) else o
+                 for o in pset['outputs']],
+    }
+
+
+def _same_outpoint(a, b):
+    return (a['txid'], a['vout']) == (b['txid'], b['vout'])
+
+
+def _is_signed(pset):
+    tx = pset_tx(pset)
+    return all(i['witness'] == _signature(tx, n)
+               for n, i in enumerate(pset['inputs']))
+
+
+def vsize(tx, final=False):
+    """Virtual size of tx
+
+    If final, estimate the size once inputs are signed and outputs with a
+    blinding key are blinded.
+    """
+    if final:
+        return transaction.estimate_vsize(_wire_tx(tx))
+    return transaction.vsize(_wire_tx(tx))
+
+
+def _fee(fee_rate, size):
+    """Fee (sat) for size at fee_rate (BTC/kvB)"""
+    return int(math.ceil(fee_rate * 10**5 * size))
+
+
+class FakeChain(object):
+    """UTXO set and blinding data shared by the wallets
+
+    Broadcast transactions are mined at once.
+    """
+
+    def __init__(self, chain='elementsregtest', version=DEFAULT_VERSION):
+        if chain not in CHAIN_PARAMS:
+            raise ValueError('Unknown chain {}'.format(chain))
+        self.chain = chain
+        self.version = version
+        (self.policy_asset, self.p2sh_prefix,
+         self.confidential_prefix) = CHAIN_PARAMS[chain]
+        self.lock = threading.RLock()
+        self.height = 0
+        # (txid, vout) -> output
+        self.utxos = dict()
+        # value commitment -> (asset, value, assetblinder, amountblinder)
+        self.secrets = dict()
+        # unconfidential address -> FakeWallet
+        self.owners = dict()
+        self.wallets = dict()
+        self.labels = {'bitcoin': self.policy_asset}
+
+    def new_wallet(self, name=None):
+        with self.lock:
+            name = name if name is not None else str(len(self.wallets))
+            wallet = FakeWallet(self, name)
+            self.wallets[name] = wallet
+            return wallet
+
+    def decode_address(self, address):
+        """Return (unconfidential address, blinding pubkey or None)
+
+        Raise ValueError if address is not valid for this chain.
+        """
+        payload = b58check_decode(address)
+        if len(payload) == 21 and payload[0] == self.p2sh_prefix:
+            return address, None
+        if len(payload) == 55 and payload[0] == self.confidential_prefix \
+                and payload[1] == self.p2sh_prefix:
+            u_address = b58check_encode(payload[1:2] + payload[35:])
+            return u_address, payload[2:35].hex()
+        raise ValueError('Invalid address for {}'.format(self.chain))
+
+    def confidential_address(self, u_address, pubkey):
+        payload = b58check_decode(u_address)
+        return b58check_encode(bytes([self.confidential_prefix]) +
+                               payload[:1] + bytes.fromhex(pubkey) +
+                               payload[1:])
+
+    def script_pubkey(self, address):
+        h = b58check_decode(address)[1:].hex()
+        script = {
+            'asm': 'OP_HASH160 {} OP_EQUAL'.format(h),
+            'hex': 'a914{}87'.format(h),
+            'type': 'scripthash',
+        }
+        if self.version >= 220000:
+            script['address'] = address
+        else:
+            script.update({'reqSigs': 1, 'addresses': [address]})
+        return script
+
+    def blind(self, output, asset, value, assetblinder=None,
+              amountblinder=None):
+        """Replace asset and value of output with (fake) commitments"""
+        assetblinder = assetblinder or os.urandom(32).hex()
+        amountblinder = amountblinder or os.urandom(32).hex()
+        valuecommitment = '08' + os.urandom(32).hex()
+        output.update({
+            'asset': None,
+            'value': None,
+            'assetcommitment': '0a' + os.urandom(32).hex(),
+            'valuecommitment': valuecommitment,
+        })
+        self.secrets[valuecommitment] = (asset, value, assetblinder,
+                                         amountblinder)
+
+    def reveal(self, output):
+        """Return (asset, value, assetblinder, amountblinder) of output"""
+        if _is_blinded(output):
+            return self.secrets[output['valuecommitment']]
+        return output['asset'], output['value'], ZERO_BLINDER, ZERO_BLINDER
+
+    def issue_asset(self, label=None):
+        with self.lock:
+            asset = hashlib.sha256('asset {} {}'.format(
+                len(self.labels), label).encode('utf8')).hexdigest()
+            if label is not None:
+                self.labels[label] = asset
+            return asset
+
+    def mint(self, wallet, asset, sats, blind=True):
+        """Create an output of sats of asset owned by wallet, return its
+        outpoint"""
+        with self.lock:
+            c_address = wallet.get_new_address()
+            u_address, pubkey = self.decode_address(c_address)
+            output = {'address': u_address, 'nonce': pubkey,
+                      'asset': asset, 'value': sats}
+            if blind:
+                self.blind(output, asset, sats)
+            tx = {'version': 2, 'locktime': 0, 'vout': [output], 'vin': [{
+                'txid': os.urandom(32).hex(), 'vout': 0,
+                'sequence': SEQUENCE_FINAL, 'witness': None,
+                'coinbase': True}]}
+            self.add_tx(tx)
+            return txid(tx), 0
+
+    def check_tx(self, tx):
+        """Raise RPCError if tx is not acceptable by the mempool"""
+        balance = dict()
+        seen = set()
+        for n, input_ in enumerate(tx['vin']):
+            outpoint = (input_.get('txid'), input_.get('vout'))
+            if outpoint not in self.utxos or outpoint in seen:
+                raise RPCError(RPC_VERIFY_ERROR,
+                               'bad-txns-inputs-missingorspent')
+            seen.add(outpoint)
+            if input_.get('witness') != _signature(tx, n):
+                raise RPCError(RPC_VERIFY_REJECTED,
+                               'mandatory-script-verify-flag-failed')
+            asset, value, _, _ = self.reveal(self.utxos[outpoint])
+            balance[asset] = balance.get(asset, 0) + value
+
+        fee = 0
+        for output in tx['vout']:
+            if _is_blinded(output):
+                if output['valuecommitment'] not in self.secrets:
+                    raise RPCError(RPC_VERIFY_REJECTED, 'bad-txns-vout-proof')
+            elif not isinstance(output.get('value'), int) or \
+                    output['value'] < 0:
+                raise RPCError(RPC_VERIFY_REJECTED, 'bad-txns-vout-negative')
+            asset, value, _, _ = self.reveal(output)
+            balance[asset] = balance.get(asset, 0) - value
+            if output.get('address') is None:
+                if asset != self.policy_asset:
+                    raise RPCError(RPC_VERIFY_REJECTED, 'bad-txns-fee-asset')
+                fee += value
+
+        if any(balance.values()):
+            raise RPCError(RPC_VERIFY_REJECTED, 'bad-txns-in-ne-out')
+        if fee < _fee(RELAY_FEE, vsize(tx)):
+            raise RPCError(RPC_VERIFY_REJECTED, 'min relay fee not met')
+
+    def add_tx(self, tx):
+        """Spend the inputs of tx and add its outputs to the UTXO set"""
+        with self.lock:
+            tx_id = txid(tx)
+            for input_ in tx['vin']:
+                outpoint = (input_['txid'], input_['vout'])
+                output = self.utxos.pop(outpoint, None)
+                if output is not None:
+                    owner = self.owners.get(output['address'])
+                    if owner is not None:
+                        owner.utxos.discard(outpoint)
+                        owner.spent.add(outpoint)
+                        owner.locked.discard(outpoint)
+            for n, output in enumerate(tx['vout']):
+                if output.get('address') is None:
+                    continue
+                outpoint = (tx_id, n)
+                self.utxos[outpoint] = output
+                owner = self.owners.get(output['address'])
+                if owner is not None:
+                    owner.utxos.add(outpoint)
+            self.height += 1
+            return tx_id
+
+
+class FakeWallet(object):
+    """Addresses, blinding keys and UTXOs of a wallet"""
+
+    def __init__(self, chain, name):
+        self.chain = chain
+        self.name = name
+        # unconfidential address -> blinding private key
+        self.addresses = dict()
+        # blinding pubkey -> private key (own and imported)
+        self.blinding_keys = dict()
+        # outpoints of the owned UTXOs, and of the spent ones
+        self.utxos = set()
+        self.spent = set()
+        # outpoints not to be selected when funding
+        self.locked = set()
+
+    def get_new_address(self):
+        with self.chain.lock:
+            u_address = b58check_encode(bytes([self.chain.p2sh_prefix]) +
+                                        os.urandom(20))
+            privkey = os.urandom(32).hex()
+            pubkey = blinding_pubkey(privkey)
+            self.addresses[u_address] = privkey
+            self.blinding_keys[pubkey] = privkey
+            self.chain.owners[u_address] = self
+            return self.chain.confidential_address(u_address, pubkey)
+
+    def import_blinding_key(self, privkey):
+        self.blinding_keys[blinding_pubkey(privkey)] = privkey
+
+    def can_unblind(self, output):
+        return not _is_blinded(output) or \
+            output.get('nonce') in self.blinding_keys
+
+    def unspents(self):
+        """Yield (outpoint, output) of the owned UTXOs"""
+        for outpoint in sorted(self.utxos):
+            yield outpoint, self.chain.utxos[outpoint]
+
+
+class FakeNode(object):
+    """JSON-RPC calls of a wallet
+
+    Each call is an rpc_<method name> method, params are passed as
+    positional arguments.
+    """
+
+    def __init__(self, wallet):
+        self.wallet = wallet
+        self.chain = wallet.chain
+
+    def handle(self, request):
+        """Return the response to a (decoded) JSON-RPC request"""
+        if isinstance(request, list):
+            return [self.handle(r) for r in request]
+
+        response = {'result': None, 'error': None, 'id': request.get('id')}
+        try:
+            method = getattr(self, 'rpc_' + str(request.get('method')), None)
+            if method is None:
+                raise RPCError(RPC_METHOD_NOT_FOUND, 'Method not found')
+            params = request.get('params') or []
+            with self.chain.lock:
+                try:
+                    response['result'] = method(*params)
+                except TypeError as e:
+                    raise RPCError(RPC_INVALID_PARAMETER, str(e))
+        except RPCError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+        return response
+
+    def _address(self, address):
+        """Decode address, raise RPCError if invalid"""
+        try:
+            return self.chain.decode_address(address)
+        except (ValueError, TypeError):
+            raise RPCError(RPC_INVALID_ADDRESS_OR_KEY,
+                           'Invalid address: {}'.format(address))
+
+    def _unspent(self, outpoint, output):
+        asset, value, assetblinder, amountblinder = self.chain.reveal(output)
+        address = output['address']
+        unspent = {
+            'txid': outpoint[0],
+            'vout': outpoint[1],
+            'address': address,
+            'scriptPubKey': self.chain.script_pubkey(address)['hex'],
+            'amount': Amount(value),
+            'asset': asset,
+            'amountblinder': amountblinder,
+            'assetblinder': assetblinder,
+            'confirmations': 1,
+            'spendable': True,
+            'solvable': True,
+            'safe': True,
+        }
+        if _is_blinded(output):
+            unspent.update({
+                'amountcommitment': output['valuecommitment'],
+                'assetcommitment': output['assetcommitment'],
+            })
+        return unspent
+
+    # Node
+
+    def rpc_getnetworkinfo(self):
+        return {
+            'version': self.chain.version,
+            'subversion': '/FakeElements:{}/'.format(self.chain.version),
+            'protocolversion': 70016,
+            'connections': 0,
+            'relayfee': Amount(btc2sat(RELAY_FEE)),
+            'incrementalfee': Amount(btc2sat(RELAY_FEE)),
+            'warnings': '',
+        }
+
+    def rpc_getblockchaininfo(self):
+        return {
+            'chain': self.chain.chain,
+            'blocks': self.chain.height,
+            'headers': self.chain.height,
+            'initialblockdownload': False,
+            'warnings': '',
+        }
+
+    def rpc_getsidechaininfo(self):
+        return {
+            'pegged_asset': self.chain.policy_asset,
+            'min_peg_diff': '',
+            'parent_blockhash': '00' * 32,
+            'parent_chain_has_pow': False,
+            'enforce_pak': False,
+            'pegin_confirmation_depth': 1,
+        }
+
+    def rpc_dumpassetlabels(self):
+        return dict(self.chain.labels)
+
+    # Wallet
+
+    def rpc_getwalletinfo(self):
+        return {
+            'walletname': self.wallet.name,
+            'walletversion': WALLET_VERSION,
+            'balance': self.rpc_getbalance(),
+            'txcount': len(self.wallet.utxos),
+            'keypoolsize': 1000,
+            'paytxfee': Amount(0),
+            'private_keys_enabled': True,
+        }
+
+    def rpc_getbalance(self, *args):
+        balances = dict()
+        for _, output in self.wallet.unspents():
+            asset, value, _, _ = self.chain.reveal(output)
+            balances[asset] = balances.get(asset, 0) + value
+        labels = {asset: label for label, asset in self.chain.labels.items()}
+        return {labels.get(asset, asset): Amount(value)
+                for asset, value in balances.items()}
+
+    def rpc_getnewaddress(self, label='', address_type=None):
+        return self.wallet.get_new_address()
+
+    def rpc_getrawchangeaddress(self, address_type=None):
+        return self.wallet.get_new_address()
+
+    def rpc_validateaddress(self, address):
+        try:
+            u_address, pubkey = self.chain.decode_address(address)
+        except (ValueError, TypeError):
+            return {'isvalid': False}
+        result = {
+            'isvalid': True,
+            'address': address,
+            'scriptPubKey': self.chain.script_pubkey(u_address)['hex'],
+            'isscript': True,
+            'iswitness': False,
+            'unconfidential': u_address,
+        }
+        if pubkey is not None:
+            result['confidential_key'] = pubkey
+        return result
+
+    def rpc_getaddressinfo(self, address):
+        u_address, pubkey = self._address(address)
+        privkey = self.wallet.addresses.get(u_address)
+        if privkey is not None:
+            pubkey = blinding_pubkey(privkey)
+        if pubkey is not None:
+            c_address = self.chain.confidential_address(u_address, pubkey)
+        else:
+            c_address = u_address
+        return {
+            'address': address,
+            'scriptPubKey': self.chain.script_pubkey(u_address)['hex'],
+            'ismine': privkey is not None,
+            'solvable': privkey is not None,
+            'iswatchonly': False,
+            'isscript': True,
+            'iswitness': False,
+            'confidential': c_address,
+            'confidential_key': pubkey or '',
+            'unconfidential': u_address,
+            'labels': [],
+        }
+
+    def rpc_dumpblindingkey(self, address):
+        u_address, _ = self._address(address)
+        privkey = self.wallet.addresses.get(u_address)
+        if privkey is None:
+            raise RPCError(RPC_WALLET_ERROR,
+                           'Blinding key for address is unknown')
+        return privkey
+
+    def rpc_importblindingkey(self, address, privkey):
+        self._address(address)
+        try:
+            bytes.fromhex(privkey)
+        except (TypeError, ValueError):
+            raise RPCError(RPC_INVALID_ADDRESS_OR_KEY, 'Invalid hexadecimal '
+                           'for key')
+        self.wallet.import_blinding_key(privkey)
+
+    def rpc_listunspent(self, minconf=1, maxconf=9999999, addresses=None,
+                        include_unsafe=True, query_options=None):
+        if addresses:
+            addresses = set(self._address(a)[0] for a in addresses)
+        # as Bitcoin, locked unspents are not listed
+        return [self._unspent(outpoint, output)
+                for outpoint, output in self.wallet.unspents()
+                if outpoint not in self.wallet.locked and
+                (not addresses or output['address'] in addresses)]
+
+    def rpc_lockunspent(self, unlock, transactions=None):
+        # as Elements, checked and applied at once, no transaction spends the
+        # outputs meanwhile
+        with self.chain.lock:
+            return self._lockunspent(unlock, transactions)
+
+    def _lockunspent(self, unlock, transactions):
+        if transactions is None:
+            if not unlock:
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid parameter, '
+                               'expected unspent outputs')
+            self.wallet.locked.clear()
+            return True
+        outpoints = set()
+        for output in transactions:
+            outpoint = (output.get('txid'), output.get('vout'))
+            # as Elements, spent outputs can not be (un)locked
+            if outpoint in self.wallet.spent:
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid parameter, '
+                               'expected unspent output')
+            if outpoint not in self.wallet.utxos:
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid parameter, '
+                               'unknown transaction')
+            # as Elements, (un)locking twice is an error
+            if unlock and outpoint not in self.wallet.locked:
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid parameter, '
+                               'expected locked output')
+            if not unlock and outpoint in self.wallet.locked:
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid parameter, '
+                               'output already locked')
+            outpoints.add(outpoint)
+        if unlock:
+            self.wallet.locked.difference_update(outpoints)
+        else:
+            self.wallet.locked.update(outpoints)
+        return True
+
+    def rpc_listlockunspent(self):
+        return [{'txid': tx_id, 'vout': n}
+                for tx_id, n in sorted(self.wallet.locked)]
+
+    def rpc_gettxout(self, tx_id, n, include_mempool=True):
+        output = self.chain.utxos.get((tx_id, n))
+        if output is None:
+            return None
+        result = {
+            'bestblock': '00' * 32,
+            'confirmations': 1,
+            'scriptPubKey': self.chain.script_pubkey(output['address']),
+            'coinbase': False,
+        }
+        if _is_blinded(output):
+            result.update({
+                'valuecommitment': output['valuecommitment'],
+                'assetcommitment': output['assetcommitment'],
+                'commitmentnonce': output.get('nonce') or '',
+            })
+        else:
+            result.update({
+                'value': Amount(output['value']),
+                'asset': output['asset'],
+            })
+        return result
+
+    def rpc_issueasset(self, assetamount, tokenamount, blind=True):
+        asset = self.chain.issue_asset()
+        token = self.chain.issue_asset()
+        tx_id, _ = self.chain.mint(self.wallet, asset, btc2sat(assetamount),
+                                   blind)
+        if btc2sat(tokenamount):
+            self.chain.mint(self.wallet, token, btc2sat(tokenamount), blind)
+        return {'txid': tx_id, 'vin': 0, 'entropy': '00' * 32,
+                'asset': asset, 'token': token}
+
+    # Transactions
+
+    def _create_tx(self, inputs, outputs, locktime=0, replaceable=False,
+                   output_assets=None):
+        if replaceable:
+            sequence = SEQUENCE_RBF
+        elif locktime:
+            sequence = SEQUENCE_FINAL - 1
+        else:
+            sequence = SEQUENCE_FINAL
+        tx = {'version': 2, 'locktime': locktime, 'vin': [], 'vout': []}
+        for input_ in inputs:
+            if not isinstance(input_.get('txid'), str) or \
+                    not isinstance(input_.get('vout'), int):
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid input')
+            tx['vin'].append({'txid': input_['txid'],
+                              'vout': input_['vout'],
+                              'sequence': input_.get('sequence', sequence),
+                              'witness': None})
+
+        if isinstance(outputs, dict):
+            output_assets = output_assets or dict()
+            outputs = [{k: v, 'asset': output_assets.get(k)}
+                       for k, v in outputs.items()]
+        for output in outputs:
+            asset = output.get('asset') or self.chain.policy_asset
+            (key, value), = [(k, v) for k, v in output.items()
+                             if k not in ('asset', 'blinder_index')]
+            sats = btc2sat(value)
+            if key == 'fee':
+                # as Elements, the fee output keeps its position
+                tx['vout'].append({'address': None, 'nonce': None,
+                                   'asset': asset, 'value': sats})
+                continue
+            if sats <= 0:
+                raise RPCError(RPC_INVALID_PARAMETER, 'Invalid amount')
+            u_address, pubkey = self._address(key)
+            tx['vout'].append({'address': u_address, 'nonce': pubkey,
+                               'asset': asset, 'value': sats,
+                               'blinder_index': output.get('blinder_index')})
+        return tx
+
+    def rpc_createrawtransaction(self, inputs, outputs, locktime=0,
+                                 replaceable=False, output_assets=None):
+        return encode_tx(self._create_tx(inputs, outputs, locktime,
+                                         replaceable, output_assets))
+
+    def rpc_decoderawtransaction(self, hex_tx, iswitness=None):
+        try:
+            decoded = transaction.decode(
+                hex_tx, get_chain_index(self.chain.chain), self.chain.version)
+        except TransactionDecodeError:
+            raise RPCError(RPC_DESERIALIZATION_ERROR, 'TX decode failed')
+        for vout in decoded['vout']:
+            for field in AMOUNT_FIELDS:
+                if field in vout:
+                    vout[field] = Amount(vout[field])
+        return decoded
+
+    def _fund(self, tx, options):
+        """Add inputs, change and fee outputs to tx, return the fee and the
+        position of the first change output"""
+        options = options or dict()
+        fee_rate = decimal.Decimal(options.get('feeRate', DEFAULT_FEE_RATE))
+        policy_asset = self.chain.policy_asset
+
+        # the fee is recomputed
+        tx['vout'] = [o for o in tx['vout'] if o.get('address') is not None]
+
+        balance = dict()
+        for input_ in tx['vin']:
+            output = self.chain.utxos.get((input_['txid'], input_['vout']))
+            if output is None:
+                raise RPCError(RPC_INVALID_PARAMETER,
+                               'Unable to find UTXO for external input')
+            asset, value, _, _ = self.chain.reveal(output)
+            balance[asset] = balance.get(asset, 0) + value
+        for output in tx['vout']:
+            asset, value, _, _ = self.chain.reveal(output)
+            balance[asset] = balance.get(asset, 0) - value
+
+        used = set((i['txid'], i['vout']) for i in tx['vin'])
+        available = dict()
+        for outpoint, output in self.wallet.unspents():
+            if outpoint not in used and outpoint not in self.wallet.locked \
+                    and self.wallet.can_unblind(output):
+                asset, value, _, _ = self.chain.reveal(output)
+                available.setdefault(asset, []).append((value, outpoint))
+        for utxos in available.values():
+            utxos.sort(reverse=True)
+
+        def add_input(asset):
+            if not available.get(asset):
+                raise RPCError(RPC_WALLET_INSUFFICIENT_FUNDS,
+                               'Insufficient funds')
+            value, (tx_id, n) = available[asset].pop(0)
+            sequence = tx['vin'][0]['sequence'] if tx['vin'] else \
+                SEQUENCE_FINAL
+            tx['vin'].append({'txid': tx_id, 'vout': n,
+                              'sequence': sequence, 'witness': None})
+            balance[asset] = balance.get(asset, 0) + value
+
+        for asset in list(balance):
+            while asset != policy_asset and balance[asset] < 0:
+                add_input(asset)
+
+        n_outputs = len(tx['vout'])
+        while True:
+            change = {asset: value for asset, value in balance.items()
+                      if value > 0 and asset != policy_asset}
+            # change outputs (including the policy asset one) and fee
+            estimate = dict(tx, vout=tx['vout'] + [
+                ESTIMATE_CHANGE_OUTPUT] * (len(change) + 1) + [
+                {'address': None, 'asset': policy_asset, 'value': 0}])
+            fee = _fee(fee_rate, vsize(estimate, final=True))
+            if balance.get(policy_asset, 0) >= fee:
+                break
+            add_input(policy_asset)
+
+        change[policy_asset] = balance.get(policy_asset, 0) - fee
+        for asset, value in sorted(change.items()):
+            if value <= 0:
+                continue
+            u_address, pubkey = self.chain.decode_address(
+                self.wallet.get_new_address())
+            tx['vout'].append({'address': u_address, 'nonce': pubkey,
+                               'asset': asset, 'value': value})
+        tx['vout'].append({'address': None, 'nonce': None,
+                           'asset': policy_asset, 'value': fee})
+        if options.get('lockUnspents'):
+            self.wallet.locked.update((i['txid'], i['vout'])
+                                      for i in tx['vin'])
+        return fee, n_outputs if len(tx['vout']) > n_outputs + 1 else -1
+
+    def rpc_fundrawtransaction(self, hex_tx, options=None):
+        tx = decode_tx(hex_tx, self.chain.p2sh_prefix)
+        fee, changepos = self._fund(tx, options)
+        return {'hex': encode_tx(tx), 'fee': Amount(fee),
+                'changepos': changepos}
+
+    def rpc_rawblindrawtransaction(self, hex_tx, amountblinders, amounts,
+                                   assets, assetblinders, totalblinder=None,
+                                   ignoreblindfail=True):
+        tx = decode_tx(hex_tx, self.chain.p2sh_prefix)
+        n_inputs = len(tx['vin'])
+        if not n_inputs == len(amountblinders) == len(amounts) == \
+                len(assets) == len(assetblinders):
+            raise RPCError(RPC_INVALID_PARAMETER, 'Input data and inputs '
+                           'count mismatch')
+        for input_, asset, amount in zip(tx['vin'], assets, amounts):
+            output = self.chain.utxos.get((input_['txid'], input_['vout']))
+            if output is None or \
+                    self.chain.reveal(output)[:2] != (asset, btc2sat(amount)):
+                raise RPCError(RPC_INVALID_PARAMETER, 'Unable to blind '
+                               'transaction: invalid input data')
+        blinded = 0
+        for output in tx['vout']:
+            if output.get('nonce') and not _is_blinded(output):
+                self.chain.blind(output, output['asset'], output['value'])
+                blinded += 1
+        if not blinded and not ignoreblindfail:
+            raise RPCError(RPC_INVALID_PARAMETER, 'Unable to blind '
+                           'transaction: no output to blind')
+        return encode_tx(tx)
+
+    def rpc_unblindrawtransaction(self, hex_tx):
+        tx = decode_tx(hex_tx, self.chain.p2sh_prefix)
+        for output in tx['vout']:
+            if _is_blinded(output) and self.wallet.can_unblind(output) and \
+                    output['valuecommitment'] in self.chain.secrets:
+                asset, value, _, _ = self.chain.reveal(output)
+                output.update({'asset': asset, 'value': value,
+                               'assetcommitment': None,
+                               'valuecommitment': None})
+        return {'hex': encode_tx(tx)}
+
+    def rpc_signrawtransactionwithwallet(self, hex_tx, prevtxs=None,
+                                         sighashtype='ALL'):
+        tx = decode_tx(hex_tx, self.chain.p2sh_prefix)
+        errors = []
+        for n, input_ in enumerate(tx['vin']):
+            output = self.chain.utxos.get((input_['txid'], input_['vout']))
+            if output is not None and \
+                    output['address'] in self.wallet.addresses:
+                input_['witness'] = _signature(tx, n)
+            elif input_.get('witness') != _signature(tx, n):
+                errors.append({'txid': input_['txid'],
+                               'vout': input_['vout'],
+                               'error': 'Unable to sign input'})
+        result = {'hex': encode_tx(tx), 'complete': not errors}
+        if errors:
+            result['errors'] = errors
+        return result
+
+    def rpc_combinerawtransaction(self, txs):
+        txs = [decode_tx(hex_tx, self.chain.p2sh_prefix) for hex_tx in txs]
+        if not txs or any(_without_witness(tx) != _without_witness(txs[0])
+                          for tx in txs):
+            raise RPCError(RPC_DESERIALIZATION_ERROR, 'Input not found or '
+                           'already spent')
+        tx = txs[0]
+        for n, input_ in enumerate(tx['vin']):
+            for other in txs[1:]:
+                if input_['witness'] is None:
+                    input_['witness'] = other['vin'][n]['witness']
+        return encode_tx(tx)
+
+    def rpc_testmempoolaccept(self, rawtxs, maxfeerate=None):
+        results = []
+        for hex_tx in rawtxs:
+            tx = decode_tx(hex_tx, self.chain.p2sh_prefix)
+            result = {'txid': txid(tx), 'allowed': True}
+            try:
+                self.chain.check_tx(tx)
+            except RPCError as e:
+                result = {'txid': txid(tx), 'allowed': False,
+                          'reject-reason': e.message}
+            results.append(result)
+        return results
+
+    def rpc_sendrawtransaction(self, hex_tx, maxfeerate=None):
+        tx = decode_tx(hex_tx, self.chain.p2sh_prefix)
+        self.chain.check_tx(tx)
+        return self.chain.add_tx(tx)
+
+    # PSET
+
+    def _is_mine(self, input_):
+        output = self.chain.utxos.get((input_['txid'], input_['vout']))
+        return output is not None and \
+            output['address'] in self.wallet.addresses
+
+    def _fill(self, pset):
+        """Add the UTXOs (and reveal the values) of the wallet inputs"""
+        for input_ in pset['inputs']:
+            if self._is_mine(input_):
+                input_.update({'utxo': True, 'explicit': True})
+
+    def rpc_createpsbt(self, inputs, outputs, locktime=0, replaceable=False,
+                       psbt_version=2):
+        return encode_pset(tx_pset(self._create_tx(inputs, outputs, locktime,
+                                                   replaceable)))
+
+    def rpc_walletcreatefundedpsbt(self, inputs, outputs, locktime=0,
+                                   options=None, bip32derivs=True):
+        options = options or dict()
+        replaceable = options.get('replaceable', False)
+        tx = self._create_tx(inputs, outputs, locktime, replaceable)
+        fee, changepos = self._fund(tx, options)
+        if replaceable:
+            for input_ in tx['vin']:
+                input_['sequence'] = SEQUENCE_RBF
+        # the wallet blinds the outputs it funds
+        for output in tx['vout']:
+            if output.get('nonce') and output.get('blinder_index') is None:
+                output['blinder_index'] = 0
+        pset = tx_pset(tx)
+        self._fill(pset)
+        return {'psbt': encode_pset(pset), 'fee': Amount(fee),
+                'changepos': changepos}
+
+    def rpc_decodepsbt(self, psbt):
+        pset = decode_pset(psbt)
+        inputs = []
+        for input_ in pset['inputs']:
+            decoded = {
+                'previous_txid': input_['txid'],
+                'previous_vout': input_['vout'],
+                'sequence': input_['sequence'],
+            }
+            output = self.chain.utxos.get((input_['txid'], input_['vout']))
+            if input_['utxo'] and output is not None:
+                utxo = {'scriptPubKey': self.chain.script_pubkey(
+                    output['address'])}
+                if _is_blinded(output):
+                    utxo.update({
+                        'amountcommitment': output['valuecommitment'],
+                        'assetcommitment': output['assetcommitment'],
+                    })
+                else:
+                    utxo.update({'amount': Amount(output['value']),
+                                 'asset': output['asset']})
+                decoded['witness_utxo'] = utxo
+            if input_['explicit'] and output is not None:
+                asset, value, _, _ = self.chain.reveal(output)
+                decoded.update({
+                    'explicit_value': Amount(value),
+                    'value_proof': FAKE_PROOF,
+                    'explicit_asset': asset,
+                    'asset_proof': FAKE_PROOF,
+                })
+            if input_['witness']:
+                decoded['final_scriptwitness'] = [input_['witness']]
+            inputs.append(decoded)
+
+        outputs = []
+        fees = dict()
+        for output in pset['outputs']:
+            decoded = {'amount': Amount(output['value']),
+                       'asset': output['asset']}
+            if output['address'] is None:
+                decoded['script'] = {'asm': '', 'hex': '', 'type': 'fee'}
+                fees[output['asset']] = fees.get(output['asset'], 0) + \
+                    output['value']
+            else:
+                decoded['script'] = dict(
+                    self.chain.script_pubkey(output['address']),
+                    address=output['address'])
+            if output['nonce']:
+                decoded['blinding_pubkey'] = output['nonce']
+            if output['blinder_index'] is not None:
+                decoded['blinder_index'] = output['blinder_index']
+            if _is_blinded(output):
+                decoded.update({
+                    'value_commitment': output['valuecommitment'],
+                    'asset_commitment': output['assetcommitment'],
+                    'blind_value_proof': FAKE_PROOF,
+                    'blind_asset_proof': FAKE_PROOF,
+                })
+            outputs.append(decoded)
+
+        return {
+            'global': {
+                'tx_version': 2,
+                'fallback_locktime': pset['locktime'],
+                'input_count': len(inputs),
+                'output_count': len(outputs),
+                'pset_version': 2,
+            },
+            'inputs': inputs,
+            'outputs': outputs,
+            'fees': {asset: Amount(fee) for asset, fee in fees.items()},
+        }
+
+    def rpc_joinpsbts(self, psbts):
+        psets = [decode_pset(psbt) for psbt in psbts]
+        if len(set(pset['locktime'] for pset in psets)) > 1:
+            raise RPCError(RPC_INVALID_PARAMETER,
+                           'PSBTs do not have the same locktime')
+        inputs = []
+        outputs = []
+        for pset in psets:
+            for input_ in pset['inputs']:
+                if any(_same_outpoint(input_, i) for i in inputs):
+                    raise RPCError(RPC_INVALID_PARAMETER, 'Input {}:{} exists '
+                                   'in multiple PSBTs'.format(input_['txid'],
+                                                              input_['vout']))
+            outputs.extend(pset['outputs'])
+            inputs.extend(pset['inputs'])
+        # as Bitcoin, the inputs and outputs are shuffled; blinder indexes
+        # are not remapped, they may point to another input once joined
+        # without touching the random state of the process it runs in
+        shuffle = random.SystemRandom().shuffle
+        shuffle(inputs)
+        shuffle(outputs)
+        return encode_pset({'locktime': psets[0]['locktime'],
+                            'inputs': inputs,
+                            'outputs': outputs})
+
+    def rpc_combinepsbt(self, txs):
+        psets = [decode_pset(psbt) for psbt in txs]
+        unsigned = [_without_witness(pset_tx(pset)) for pset in psets]
+        if not psets or any(tx != unsigned[0] for tx in unsigned):
+            raise RPCError(RPC_INVALID_PARAMETER, 'PSBTs not compatible '
+                           '(different transactions)')
+        pset = psets[0]
+        for n, input_ in enumerate(pset['inputs']):
+            for other in psets[1:]:
+                other = other['inputs'][n]
+                input_['utxo'] = input_['utxo'] or other['utxo']
+                input_['explicit'] = input_['explicit'] or other['explicit']
+                input_['witness'] = input_['witness'] or other['witness']
+        return encode_pset(pset)
+
+    def rpc_walletprocesspsbt(self, psbt, sign=True, sighashtype='ALL',
+                              bip32derivs=True, finalize=True):
+        pset = decode_pset(psbt)
+        self._fill(pset)
+        inputs = pset['inputs']
+        mine = [n for n, input_ in enumerate(inputs) if self._is_mine(input_)]
+        for output in pset['outputs']:
+            # outputs without blinder are blinded by the first wallet input
+            if output['nonce'] and output['blinder_index'] is None and \
+                    mine:
+                output['blinder_index'] = mine[0]
+            n = output['blinder_index']
+            if output['nonce'] and not _is_blinded(output) and \
+                    n is not None and n < len(inputs) and \
+                    self._is_mine(inputs[n]):
+                explicit = output['asset'], output['value']
+                self.chain.blind(output, *explicit)
+                output['asset'], output['value'] = explicit
+
+        # signatures commit to the blinded outputs
+        if sign and all(_is_blinded(o) for o in pset['outputs']
+                        if o['nonce']):
+            tx = pset_tx(pset)
+            for n, input_ in enumerate(inputs):
+                if self._is_mine(input_):
+                    input_['witness'] = _signature(tx, n)
+        return {'psbt': encode_pset(pset),
+                'complete': _is_signed(pset)}
+
+    def rpc_finalizepsbt(self, psbt, extract=True):
+        pset = decode_pset(psbt)
+        if not _is_signed(pset):
+            return {'psbt': psbt, 'complete': False}
+        return {'hex': encode_tx(pset_tx(pset)), 'complete': True}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, do not wait for the ack
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        if server.auth is not None and \
+                self.headers.get('Authorization') != server.auth:
+            self._reply(401, b'')
+            return
+
+        node = server.node
+        if self.path.startswith('/wallet/'):
+            wallet = server.chain.wallets.get(self.path[len('/wallet/'):])
+            if wallet is None:
+                self._reply(500, dumps({'result': None, 'id': None, 'error': {
+                    'code': -18, 'message': 'Requested wallet does not '
+                    'exist or is not loaded'}}).encode('utf8'))
+                return
+            node = FakeNode(wallet)
+
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            request = json.loads(data.decode('utf8'),
+                                 parse_float=decimal.Decimal)
+        except ValueError:
+            self._reply(500, dumps({'result': None, 'id': None, 'error': {
+                'code': -32700, 'message': 'Parse error'}}).encode('utf8'))
+            return
+
+        self._reply(200, (dumps(node.handle(request)) + '\n').encode('utf8'))
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeNodeServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server of a wallet, other wallets of the chain are reachable at
+    /wallet/<name>"""
+
+    daemon_threads = True
+
+    def __init__(self, wallet, host='127.0.0.1', port=0, rpcuser=None,
+                 rpcpassword=None):
+        http.server.HTTPServer.__init__(self, (host, port), _Handler)
+        self.chain = wallet.chain
+        self.node = FakeNode(wallet)
+        self.auth = None
+        if rpcuser is not None:
+            authpair = '{}:{}'.format(rpcuser, rpcpassword or '')
+            self.auth = 'Basic ' + base64.b64encode(
+                authpair.encode('utf8')).decode('utf8')
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}@{}:{}'.format('fake', 'fake', host, port)
+
+    def start(self):
+        """Serve in a daemon thread"""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+def start_fake_nodes(wallets=2, utxos=10, amount=1, chain='elementsregtest',
+                     version=DEFAULT_VERSION, host='127.0.0.1', port=0):
+    """Start servers for a new chain with funded wallets
+
+    Each wallet gets utxos outputs of amount (BTC) of the policy asset and of
+    a newly issued asset. Return the servers, in a background thread;
+    wallets are on consecutive ports if port is set.
+    """
+    fake_chain = FakeChain(chain, version)
+    servers = []
+    for i in range(wallets):
+        wallet = fake_chain.new_wallet()
+        asset = fake_chain.issue_asset('asset{}'.format(i))
+        for _ in range(utxos):
+            fake_chain.mint(wallet, fake_chain.policy_asset, btc2sat(amount))
+            fake_chain.mint(wallet, asset, btc2sat(amount))
+        servers.append(FakeNodeServer(
+            wallet, host, port + i if port else 0).start())
+    return servers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Fake Elements node for swap load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7050,
+                        help='port of the first wallet, the others follow')
+    parser.add_argument('--wallets', type=int, default=2)
+    parser.add_argument('--utxos', type=int, default=10,
+                        help='UTXOs per asset of each wallet')
+    parser.add_argument('--amount', type=decimal.Decimal, default=1,
+                        help='amount of each UTXO (BTC)')
+    parser.add_argument('--chain', default='elementsregtest',
+                        choices=sorted(CHAIN_PARAMS))
+    parser.add_argument('--version', type=int, default=DEFAULT_VERSION,
+                        help='Elements version to report')
+    args = parser.parse_args(argv)
+
+    servers = start_fake_nodes(args.wallets, args.utxos, args.amount,
+                               args.chain, args.version, args.host,
+                               args.port)
+    chain = servers[0].chain
+    labels = {asset: label for label, asset in chain.labels.items()}
+    json.dump({
+        'policy_asset': chain.policy_asset,
+        'wallets': [{
+            'url': server.url,
+            'asset': [a for a in sorted(labels)
+                      if labels[a] == 'asset{}'.format(i)][0],
+        } for i, server in enumerate(servers)],
+    }, sys.stdout, indent=4)
+    sys.stdout.write('\n')
+    sys.stdout.flush()
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
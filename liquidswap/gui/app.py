@@ -16,6 +16,7 @@ from liquidswap import swap
 from liquidswap.encode import encode_payload, decode_payload
 from liquidswap.asset_data import AssetsData
 from liquidswap.connect import ConnCtx, DEFAULT_REGTEST_RPC_PORT
+from liquidswap.session import SessionStore
 from liquidswap.constants import PROPOSED_KEYS, ACCEPTED_KEYS
 from liquidswap.constants import PROPOSED_KEYS, ACCEPTED_KEYS, NETWORK_REGTEST, NETWORK_MAINNET, NETWORK_LIQUIDTESTNET
 from liquidswap.exceptions import LiquidSwapError
@@ -27,6 +28,7 @@ from liquidswap.util import (
     do_initial_checks,
     check_wallet_unlocked,
     compute_receiver_fee,
+    compute_receiver_fee_pset,
     set_logging,
     check_not_mine,
 )
@@ -68,6 +70,11 @@ def set_conf_tip(elements_conf_file, action):
         action.setStatusTip('elements.conf: {}'.format(elements_conf_file))
 
 
+def parse_payload(parent, proposal, connection):
+    """Parse a swap, with or without PSET, once per session"""
+    return swap.parse_payload(proposal, connection, session=parent.session)
+
+
 def setup_toolbar(parent, window):
     set_url_tip(parent.credentials['service_url'], window.actionURL)
     set_conf_tip(parent.credentials['elements_conf_file'], window.actionConf)
@@ -238,35 +245,34 @@ class AcceptWindow(QMainWindow, Ui_AcceptWindow):
             parent.asset_data.update(connection)
             check_not_mine(proposal['u_address_p'], connection)
 
-            (tx, address_p, amount_p, asset_p, fee_p, amount_r, asset_r,
-             map_amount, map_asset, unspents_details) = swap.parse_proposed(
-                *[proposal[k] for k in PROPOSED_KEYS],
-                connection=connection)
+            parsed = parse_payload(parent, proposal, connection)
 
-            self.labelProposerAmountValue.setText(f2s(sat2btc(amount_p)))
+            self.labelProposerAmountValue.setText(
+                f2s(sat2btc(parsed.amount_p)))
             self.labelProposerAssetValue.setText(
-                parent.asset_data.get_label(asset_p))
-            self.labelReceiverAmountValue.setText(f2s(sat2btc(amount_r)))
+                parent.asset_data.get_label(parsed.asset_p))
+            self.labelReceiverAmountValue.setText(
+                f2s(sat2btc(parsed.amount_r)))
             self.labelReceiverAssetValue.setText(
-                parent.asset_data.get_label(asset_r))
+                parent.asset_data.get_label(parsed.asset_r))
 
     def accept(self, parent, proposal):
         with ConnCtx(parent.credentials, parent.critical) as cc:
             connection = cc.connection
             check_wallet_unlocked(connection)
-            check_not_mine(proposal['u_address_p'], connection)
-
-            ret = swap.parse_proposed(
-                *[proposal[k] for k in PROPOSED_KEYS],
-                connection=connection)
 
             fee_rate = float(connection.getnetworkinfo()['relayfee'])
-            accepted_swap = swap.accept(*ret, connection, fee_rate)
+            fee_p = parse_payload(parent, proposal, connection).fee_p
+            accepted_swap = swap.accept_payload(proposal, connection,
+                                                fee_rate,
+                                                session=parent.session)
+            if get_status(proposal) == 'proposed_pset':
+                fee_r = compute_receiver_fee_pset(
+                    connection, accepted_swap['pset'], fee_p)
+            else:
+                fee_r = compute_receiver_fee(
+                    connection, accepted_swap['tx'], fee_p)
             encoded_payload = encode_payload(accepted_swap)
-
-            tx = accepted_swap['tx']
-            fee_p = ret[4]
-            fee_r = compute_receiver_fee(connection, tx, fee_p)
             msg = 'Are you sure you want to accept this swap?\n\n' \
                   'Paying fees {:.8f} L-BTC.\n\nReceiving address: {}.'.format(
                     sat2btc(fee_r), accepted_swap['u_address_r'])
@@ -294,17 +300,16 @@ class FinalizeWindow(QMainWindow, Ui_FinalizeWindow):
             parent.asset_data.update(connection)
             check_not_mine(proposal['u_address_r'], connection)
 
-            (tx, amount_p, asset_p, fee_p, amount_r, asset_r,
-             fee_r) = swap.parse_accepted(
-                *[proposal[k] for k in ACCEPTED_KEYS],
-                connection=connection)
+            parsed = parse_payload(parent, proposal, connection)
 
-            self.labelProposerAmountValue.setText(f2s(sat2btc(amount_p)))
+            self.labelProposerAmountValue.setText(
+                f2s(sat2btc(parsed.amount_p)))
             self.labelProposerAssetValue.setText(
-                parent.asset_data.get_label(asset_p))
-            self.labelReceiverAmountValue.setText(f2s(sat2btc(amount_r)))
+                parent.asset_data.get_label(parsed.asset_p))
+            self.labelReceiverAmountValue.setText(
+                f2s(sat2btc(parsed.amount_r)))
             self.labelReceiverAssetValue.setText(
-                parent.asset_data.get_label(asset_r))
+                parent.asset_data.get_label(parsed.asset_r))
 
     def finalize(self, parent, proposal, broadcast=False):
 
@@ -313,9 +318,7 @@ class FinalizeWindow(QMainWindow, Ui_FinalizeWindow):
             check_wallet_unlocked(connection)
             check_not_mine(proposal['u_address_r'], connection)
 
-            (incomplete_tx, _, _, fee_p, _, _, _) = swap.parse_accepted(
-                *[proposal[k] for k in ACCEPTED_KEYS],
-                connection=connection)
+            fee_p = parse_payload(parent, proposal, connection).fee_p
 
             msg = 'Are you sure you want to execute this swap?\n\n' \
                   'Paying fees {:.8f} L-BTC.'.format(sat2btc(fee_p))
@@ -323,7 +326,8 @@ class FinalizeWindow(QMainWindow, Ui_FinalizeWindow):
             if ans != QMessageBox.Yes:
                 return
 
-            ret = swap.finalize(incomplete_tx, connection, broadcast)
+            ret = swap.finalize_payload(proposal, connection, broadcast,
+                                        session=parent.session)
             if broadcast:
                 msg = 'Transaction ID: {}'.format(ret)
                 QMessageBox.information(parent, 'Transaction sent', msg)
@@ -353,7 +357,7 @@ class LiquidSwapToolWindow(QMainWindow):
     """Parent window holding session data"""
 
     def __init__(self, service_url=None, elements_conf_file=None,
-                 network=NETWORK_REGTEST):
+                 network=NETWORK_REGTEST, session=None):
         QMainWindow.__init__(self)
 
         self.credentials = {
@@ -363,6 +367,8 @@ class LiquidSwapToolWindow(QMainWindow):
         }
         self.network = network
         self.asset_data = AssetsData()
+        # swaps parsed, accepted or finalized, kept in memory by default
+        self.session = SessionStore(session or ':memory:')
 
         self.center()
 
@@ -457,7 +463,7 @@ class LiquidSwapToolWindow(QMainWindow):
                                  'Unable to decode proposal: {}'.format(e))
             InitialWindow(self)
         else:
-            if status == 'proposed':
+            if status in ('proposed', 'proposed_pset'):
                 AcceptWindow(self, proposal)
             else:
                 FinalizeWindow(self, proposal)
@@ -485,6 +491,9 @@ def parse_args():
                         help='Use with liquidtestnet.')
     parser.add_argument('-v', '--verbose', action='count',
                         help='Be more verbose, may be used multiple times.')
+    parser.add_argument('-s', '--session',
+                        help='Keep the state of the swaps in this SQLite '
+                             'file.')
     args = parser.parse_args()
     set_logging(args.verbose or 0)
 
@@ -501,7 +510,8 @@ def parse_args():
     return {
         'service_url': args.service_url,
         'elements_conf_file': args.conf_file,
-        'network': network
+        'network': network,
+        'session': args.session,
     }
 
 
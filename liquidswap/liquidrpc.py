@@ -1,22 +1,75 @@
 # Copied from python-bitcoinlib f04a1a30cbeb16fd0e3a2e036769d6da4476fcc8 bitcoin/rpc.py
 
 from __future__ import absolute_import, division, print_function, unicode_literals
-import ssl
 
+import asyncio
 import http.client as httplib
 import base64
 import binascii
+import bisect
+import codecs
+import collections
+import copy
 import decimal
+import hashlib
+import io
 import json
 import os
 import platform
-import sys
+import random
+import re
+import select
+import socket
+import threading
+import time
 import urllib.parse as urlparse
 
 DEFAULT_USER_AGENT = "AuthServiceProxy/0.1"
 
 DEFAULT_HTTP_TIMEOUT = 30
 
+DEFAULT_ASYNC_MAX_CONNECTIONS = 4
+
+# Calls which can be safely sent again if the first attempt failed midway:
+# node and wallet reads only, which neither change the wallet state nor
+# return a different result when sent twice.
+IDEMPOTENT_METHODS = frozenset([
+    'decodepsbt',
+    'decoderawtransaction',
+    'getaddressinfo',
+    'getbalance',
+    'getblockchaininfo',
+    'getnetworkinfo',
+    'getsidechaininfo',
+    'gettxout',
+    'getwalletinfo',
+    'listlockunspent',
+    'listunspent',
+    'testmempoolaccept',
+    'validateaddress',
+])
+
+# Seconds the results of slow-changing calls are cached for. Only fields that
+# do not change while the node runs (version, chain, wallet version) are
+# supposed to be read from them.
+DEFAULT_CACHE_TTLS = {
+    'getblockchaininfo': 60,
+    'getnetworkinfo': 60,
+    'getsidechaininfo': 3600,
+    'getwalletinfo': 10,
+}
+
+# Number of results cached for calls depending only on their params (e.g.
+# the same transaction always decodes the same), the least recently used are
+# evicted.
+DEFAULT_CACHE_SIZES = {
+    'decoderawtransaction': 128,
+}
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10)
+
 DEFAULT_ELEMENTS_RPC_PORT = 7041
 
 unhexlify = lambda h: binascii.unhexlify(h.encode('utf8'))
@@ -79,6 +132,845 @@ class InWarmupError(JSONRPCError):
     RPC_ERROR_CODE = -28
 
 
+# Failures after which the node is expected to answer if asked again
+TRANSIENT_ERRORS = (
+    InWarmupError,
+    httplib.BadStatusLine,
+    httplib.CannotSendRequest,
+    httplib.IncompleteRead,
+    ConnectionError,
+    socket.timeout,
+    asyncio.IncompleteReadError,
+    asyncio.TimeoutError,
+)
+
+
+class RetryPolicy(object):
+    """Bounded retry of idempotent calls failing for transient reasons
+
+    The delay before the n-th retry is backoff * 2**n (capped to max_backoff),
+    randomly reduced by up to jitter (as a fraction). Each retry consumes a
+    token from the budget, each successful call gives back budget_refill
+    tokens, so that a node that keeps failing is not flooded.
+    """
+
+    def __init__(self,
+                 max_attempts=6,
+                 backoff=0.2,
+                 max_backoff=10.0,
+                 jitter=0.5,
+                 budget=10,
+                 budget_refill=0.1,
+                 methods=IDEMPOTENT_METHODS):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.budget = budget
+        self.budget_refill = budget_refill
+        self.methods = methods
+        self._tokens = budget
+
+    def should_retry(self, service_names, exc, attempt):
+        """Whether (attempt + 1)-th failure of service_names can be retried
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+        if not isinstance(exc, TRANSIENT_ERRORS):
+            return False
+        if not all(name in self.methods for name in service_names):
+            return False
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay * (1 - self.jitter * random.random())
+
+    def succeeded(self):
+        self._tokens = min(self.budget, self._tokens + self.budget_refill)
+
+
+def _raise_if_warming_up(responses):
+    # in a batch each call fails on its own, retry the whole batch
+    for response in responses:
+        error = response.get('error')
+        if error is not None and error.get('code') == \
+                InWarmupError.RPC_ERROR_CODE:
+            raise JSONRPCError(error)
+
+
+def _check_batch_responses(responses):
+    if not isinstance(responses, list):
+        # the whole batch was rejected
+        raise JSONRPCError(responses.get('error') or {
+            'code': -344,
+            'message': 'unexpected JSON-RPC batch response'})
+    _raise_if_warming_up(responses)
+
+
+def _responses_by_id(rpc_call_list, responses):
+    responses_by_id = {r.get('id'): r for r in responses}
+    return [responses_by_id.get(c['id']) for c in rpc_call_list]
+
+
+def _batch_pending(cache, calls):
+    """Look up the cacheable calls of a batch
+
+    Return the responses (None for the calls to send) and the calls to send
+    as (service_name, args, indexes of the calls), cacheable calls repeated
+    in the batch are sent once.
+    """
+    responses = [None] * len(calls)
+    # (service_name, args) to send -> indexes of the calls
+    pending = collections.OrderedDict()
+    for i, (service_name, args) in enumerate(calls):
+        if cache.cacheable(service_name):
+            hit, result = cache.lookup(service_name, args)
+            if hit:
+                responses[i] = {'result': result, 'error': None}
+                continue
+            key = cache._key(service_name, args)
+        else:
+            key = i
+        pending.setdefault(key, (service_name, args, []))[2].append(i)
+    return responses, list(pending.values())
+
+
+def _batch_store(cache, generation, sent, sent_responses, responses):
+    """Cache the responses of the sent calls and fill responses with them"""
+    for (service_name, args, indexes), response in zip(sent, sent_responses):
+        if cache.cacheable(service_name) and response is not None and \
+                response.get('error') is None and 'result' in response:
+            cache.store(service_name, args, response['result'], generation)
+        for n, i in enumerate(indexes):
+            responses[i] = response if n == 0 else copy.deepcopy(response)
+    return responses
+
+
+class RPCCache(object):
+    """Cache of the results of slow-changing calls
+
+    Results are kept for ttls[method] seconds, keyed by method and (a hash
+    of) params. The last sizes[method] results of the methods in sizes are
+    kept until evicted, least recently used first. Other methods are never
+    cached (RPCCache({}, {}) disables caching).
+    Concurrent requests of the same missing result, from different threads
+    or asyncio tasks, wait for the one in flight instead of being sent again.
+    The cache can be shared by several proxies to the same node.
+    """
+
+    def __init__(self, ttls=None, sizes=None):
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self.sizes = dict(DEFAULT_CACHE_SIZES if sizes is None else sizes)
+        self._lock = threading.Lock()
+        # key -> (expiry, result)
+        self._entries = dict()
+        # method -> key -> result, in least recently used order
+        self._lru = {service_name: collections.OrderedDict()
+                     for service_name in self.sizes}
+        # key -> threading.Event
+        self._inflight = dict()
+        # key -> asyncio.Future
+        self._async_inflight = dict()
+        # bumped on invalidation, results fetched before are not stored
+        self._generation = 0
+
+    def cacheable(self, service_name):
+        return bool(self.sizes.get(service_name) or
+                    self.ttls.get(service_name))
+
+    def invalidate(self, *service_names):
+        """Forget the results of service_names, of every call if none"""
+        with self._lock:
+            self._generation += 1
+            for service_name, lru in self._lru.items():
+                if not service_names or service_name in service_names:
+                    lru.clear()
+            if not service_names:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if key[0] in service_names:
+                    del self._entries[key]
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def lookup(self, service_name, args):
+        """Return (True, result) if a fresh result is cached, (False, None)
+        otherwise
+        """
+        key = self._key(service_name, args)
+        with self._lock:
+            lru = self._lru.get(service_name)
+            if lru is not None:
+                if key not in lru:
+                    return False, None
+                lru.move_to_end(key)
+                result = lru[key]
+            else:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] <= time.monotonic():
+                    return False, None
+                result = entry[1]
+        return True, copy.deepcopy(result)
+
+    def store(self, service_name, args, result, generation):
+        """Cache result, unless the cache was invalidated after generation
+        """
+        key = self._key(service_name, args)
+        result = copy.deepcopy(result)
+        with self._lock:
+            if generation != self._generation:
+                return
+            lru = self._lru.get(service_name)
+            if lru is not None:
+                lru[key] = result
+                lru.move_to_end(key)
+                while len(lru) > self.sizes[service_name]:
+                    lru.popitem(last=False)
+                return
+            expiry = time.monotonic() + self.ttls[service_name]
+            self._entries[key] = (expiry, result)
+
+    def get(self, service_name, args, fetch):
+        """Return the cached result, or fetch() and cache it"""
+        key = self._key(service_name, args)
+        while True:
+            hit, result = self.lookup(service_name, args)
+            if hit:
+                return result
+            with self._lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    break
+            # fetched (or failed) by another thread, look again
+            event.wait()
+
+        generation = self._generation
+        try:
+            result = fetch()
+            self.store(service_name, args, result, generation)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+        return result
+
+    async def get_async(self, service_name, args, fetch):
+        """Same as get, fetch() returns an awaitable"""
+        key = self._key(service_name, args)
+        while True:
+            hit, result = self.lookup(service_name, args)
+            if hit:
+                return result
+            inflight = self._async_inflight.get(key)
+            if inflight is None:
+                break
+            await asyncio.shield(inflight)
+
+        inflight = asyncio.get_event_loop().create_future()
+        self._async_inflight[key] = inflight
+        generation = self._generation
+        try:
+            result = await fetch()
+            self.store(service_name, args, result, generation)
+        finally:
+            del self._async_inflight[key]
+            inflight.set_result(None)
+        return result
+
+    @staticmethod
+    def _key(service_name, args):
+        # params may be large (e.g. transactions), keep only their digest
+        params = json.dumps(args, sort_keys=True, default=str)
+        return service_name, hashlib.sha256(params.encode('utf8')).digest()
+
+
+class RPCMetrics(object):
+    """Per method counters and latency histograms of the calls sent
+
+    Each attempt is recorded, so retries show up as errors. Calls sent in a
+    batch are recorded with the latency of the whole batch (and counted as
+    batched), the bytes of the request are recorded under 'batch'. Cached
+    results are not recorded. Metrics can be shared by several proxies.
+    """
+
+    BATCH = 'batch'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._methods = dict()
+
+    def record(self, service_name, seconds, request_bytes=0,
+               response_bytes=0, error=False, batched=False):
+        with self._lock:
+            m = self._methods.get(service_name)
+            if m is None:
+                m = self._methods[service_name] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'batched': 0,
+                    'request_bytes': 0,
+                    'response_bytes': 0,
+                    'seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'histogram': [0] * (len(self.buckets) + 1),
+                }
+            m['calls'] += 1
+            m['errors'] += int(bool(error))
+            m['batched'] += int(bool(batched))
+            m['request_bytes'] += request_bytes
+            m['response_bytes'] += response_bytes
+            m['seconds'] += seconds
+            m['max_seconds'] = max(m['max_seconds'], seconds)
+            m['histogram'][bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def record_batch(self, rpc_call_list, responses, seconds, request_bytes,
+                     response_bytes):
+        """Record a batch request, responses is None if it failed"""
+        self.record(self.BATCH, seconds, request_bytes=request_bytes,
+                    response_bytes=response_bytes,
+                    error=not isinstance(responses, list))
+        errors = dict()
+        if isinstance(responses, list):
+            errors = {r.get('id'): r.get('error') is not None
+                      for r in responses}
+        for c in rpc_call_list:
+            self.record(c['method'], seconds, error=errors.get(c['id'], True),
+                        batched=True)
+
+    def snapshot(self):
+        """Return a JSON serializable copy of the metrics
+
+        Histograms map the upper bound of each bucket (as string, 'inf' for
+        the last one) to the number of calls in the bucket.
+        """
+        bounds = [str(b) for b in self.buckets] + ['inf']
+        with self._lock:
+            snapshot = collections.OrderedDict()
+            for service_name in sorted(self._methods):
+                m = dict(self._methods[service_name])
+                m['histogram'] = collections.OrderedDict(
+                    zip(bounds, m['histogram']))
+                snapshot[service_name] = m
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+    def dumps(self):
+        return json.dumps(self.snapshot(), indent=4)
+
+
+class Satoshi(int):
+    """Amount decoded straight to integer satoshis"""
+
+
+# Fields holding an amount (in BTC) converted to Satoshi by the codecs when
+# satoshi=True
+SATOSHI_FIELDS = frozenset(['amount', 'value'])
+
+
+def _json_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError('Object of type %s is not JSON serializable' %
+                    type(obj).__name__)
+
+
+class JSONCodec(object):
+    """Standard library JSON codec
+
+    Floats are decoded as Decimal. If satoshi is set, SATOSHI_FIELDS are
+    decoded as Satoshi instead.
+    """
+    name = 'json'
+
+    def __init__(self, satoshi=False, satoshi_fields=SATOSHI_FIELDS):
+        self.satoshi = satoshi
+        self.satoshi_fields = satoshi_fields
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=_json_default)
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf8')
+        object_hook = self._object_hook if self.satoshi else None
+        return json.loads(data, parse_float=decimal.Decimal,
+                          object_hook=object_hook)
+
+    def finish_object(self, obj):
+        """Apply the codec conversions to a dict built by other means"""
+        return self._object_hook(obj) if self.satoshi else obj
+
+    def _object_hook(self, obj):
+        for field in self.satoshi_fields:
+            value = obj.get(field)
+            if isinstance(value, (decimal.Decimal, int)) and \
+                    not isinstance(value, (bool, Satoshi)):
+                obj[field] = Satoshi(value * 10**8)
+        return obj
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson based codec, floats are decoded as float, see get_codec
+    """
+    name = 'orjson'
+
+    def __init__(self, satoshi=False, satoshi_fields=SATOSHI_FIELDS):
+        import orjson
+        self._orjson = orjson
+        super(OrjsonCodec, self).__init__(satoshi=satoshi,
+                                          satoshi_fields=satoshi_fields)
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj, default=_json_default)
+
+    def loads(self, data):
+        obj = self._orjson.loads(data)
+        if self.satoshi:
+            self._to_satoshi(obj)
+        return obj
+
+    def finish_object(self, obj):
+        if self.satoshi:
+            self._to_satoshi(obj)
+        return obj
+
+    def _to_satoshi(self, obj):
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, dict):
+                for k, v in obj.items():
+                    if isinstance(v, (dict, list)):
+                        stack.append(v)
+                    elif k in self.satoshi_fields and \
+                            isinstance(v, (float, int)) and \
+                            not isinstance(v, (bool, Satoshi)):
+                        obj[k] = Satoshi(round(v * 10**8))
+            elif isinstance(obj, list):
+                stack.extend(v for v in obj if isinstance(v, (dict, list)))
+
+
+def get_codec(satoshi=False, fast=False):
+    """Return the stdlib codec, or the orjson one (if installed) if fast and
+    satoshi
+
+    orjson decodes amounts as floats, it is only used when they are converted
+    to Satoshi. The tool uses the default codec, other codecs are meant for
+    library users passing codec to the proxies.
+    """
+    if fast and satoshi:
+        try:
+            return OrjsonCodec(satoshi=satoshi)
+        except ImportError:
+            pass
+    return JSONCodec(satoshi=satoshi)
+
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR_RE = re.compile(r'[^ \t\n\r,:\]}]+')
+_STRUCTURAL_RE = re.compile(r'["{}\[\]]')
+
+
+class _ProjectingParser(object):
+    """Incremental JSON parser keeping only the requested fields
+
+    The response is read in chunks, values that are not requested are
+    skipped without being decoded, so that memory usage does not depend on
+    the response size but on the projected result.
+
+    fields is a dict: each key is kept, its value is either None (keep the
+    whole value) or fields to apply to the value; fields apply to each
+    element of an array.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, stream, codec):
+        self._stream = stream
+        self._codec = codec
+        self._decoder = codecs.getincrementaldecoder('utf8')()
+        self._buf = ''
+        self._pos = 0
+        # start of the value being scanned, it must be kept in the buffer
+        self._mark = None
+        self._eof = False
+        # bytes read from stream
+        self.size = 0
+
+    def _fill(self):
+        if self._eof:
+            raise ValueError('Unexpected end of JSON data')
+        data = self._stream.read(self.CHUNK_SIZE)
+        self.size += len(data)
+        if not data:
+            self._eof = True
+        drop = self._pos if self._mark is None else self._mark
+        self._buf = self._buf[drop:] + self._decoder.decode(data, final=not data)
+        self._pos -= drop
+        if self._mark is not None:
+            self._mark -= drop
+
+    def _match(self, regex):
+        # match regex at the current position, it must not end at the
+        # end of the buffer (the token may continue in the next chunk)
+        while True:
+            m = regex.match(self._buf, self._pos)
+            if m and (m.end() < len(self._buf) or self._eof):
+                return m
+            self._fill()
+
+    def _peek(self):
+        self._pos = self._match(_WHITESPACE_RE).end()
+        if self._pos == len(self._buf):
+            raise ValueError('Unexpected end of JSON data')
+        return self._buf[self._pos]
+
+    def _expect(self, c):
+        if self._peek() != c:
+            raise ValueError('Invalid JSON data: expected %r at %r' %
+                             (c, self._buf[self._pos:self._pos + 20]))
+        self._pos += 1
+
+    def _skip(self):
+        """Move after the value at the current position"""
+        c = self._peek()
+        if c == '"':
+            self._pos = self._match(_STRING_RE).end()
+        elif c in '{[':
+            depth = 0
+            while True:
+                m = _STRUCTURAL_RE.search(self._buf, self._pos)
+                if m is None:
+                    self._pos = len(self._buf)
+                    self._fill()
+                    continue
+                c = m.group()
+                if c == '"':
+                    self._pos = m.start()
+                    self._pos = self._match(_STRING_RE).end()
+                    continue
+                self._pos = m.end()
+                depth += 1 if c in '{[' else -1
+                if depth == 0:
+                    return
+        else:
+            self._pos = self._match(_SCALAR_RE).end()
+
+    def _raw(self):
+        """Return the text of the value at the current position"""
+        self._peek()
+        self._mark = self._pos
+        try:
+            self._skip()
+            return self._buf[self._mark:self._pos]
+        finally:
+            self._mark = None
+
+    def _members(self):
+        """Iterate over keys of the object at the current position, the
+        caller must consume each value"""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = json.loads(self._raw())
+            self._expect(':')
+            yield key
+            c = self._peek()
+            self._pos += 1
+            if c == '}':
+                return
+            elif c != ',':
+                raise ValueError('Invalid JSON data: unexpected %r' % c)
+
+    def _elements(self):
+        """Iterate over the array at the current position, the caller must
+        consume each value"""
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield
+            c = self._peek()
+            self._pos += 1
+            if c == ']':
+                return
+            elif c != ',':
+                raise ValueError('Invalid JSON data: unexpected %r' % c)
+
+    def project(self, fields):
+        """Decode the value at the current position keeping only fields"""
+        c = self._peek()
+        if fields is None or c not in '{[':
+            return self._codec.loads(self._raw())
+        elif c == '[':
+            return [self.project(fields) for _ in self._elements()]
+        elif any(v is not None for v in fields.values()):
+            # nested fields, go through the object
+            obj = dict()
+            for key in self._members():
+                if key in fields:
+                    obj[key] = self.project(fields[key])
+                else:
+                    self._skip()
+            return self._codec.finish_object(obj)
+        else:
+            # flat object, decode it at once (faster) and drop the rest
+            obj = self._codec.loads(self._raw())
+            return {k: v for k, v in obj.items() if k in fields}
+
+    def response(self, fields):
+        """Decode a JSON-RPC response projecting its result"""
+        return self.project({'result': fields, 'error': None, 'id': None})
+
+    def raw_members(self):
+        """Return the object at the current position as {key: raw text}"""
+        return {key: self._raw() for key in self._members()}
+
+
+def _split_raw(data):
+    """Split a JSON-RPC request or response into {member: raw text}, a list
+    of them for a batch
+    """
+    if isinstance(data, str):
+        data = data.encode('utf8')
+    parser = _ProjectingParser(io.BytesIO(data), None)
+    if parser._peek() == '[':
+        return [parser.raw_members() for _ in parser._elements()]
+    return parser.raw_members()
+
+
+def _params_key(raw_params):
+    return json.dumps(json.loads(raw_params or '[]'), sort_keys=True)
+
+
+class RecordTransport(object):
+    """Send requests to the node, appending the calls to a trace file
+
+    Each call is a JSON line with method, params, result, error and seconds
+    (latency of the request, split between the calls of a batch). Result and
+    error are copied verbatim from the response, so that they are replayed
+    exactly by ReplayTransport.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def request(self, postdata, send):
+        start = time.monotonic()
+        data = send(postdata)
+        self._record(postdata, data, time.monotonic() - start)
+        return data
+
+    async def request_async(self, postdata, send):
+        start = time.monotonic()
+        data = await send(postdata)
+        self._record(postdata, data, time.monotonic() - start)
+        return data
+
+    def _record(self, postdata, data, seconds):
+        calls = _split_raw(postdata)
+        responses = _split_raw(data)
+        if not isinstance(calls, list):
+            calls, responses = [calls], [responses]
+        elif not isinstance(responses, list):
+            # the whole batch was rejected
+            return
+
+        responses_by_id = {json.loads(r.get('id', 'null')): r
+                           for r in responses}
+        lines = []
+        for call in calls:
+            response = responses_by_id.get(json.loads(call.get('id', 'null')))
+            if response is None:
+                continue
+            lines.append(
+                '{{"method": {}, "params": {}, "result": {}, "error": {}, '
+                '"seconds": {}}}\n'.format(
+                    call['method'], call.get('params', '[]'),
+                    response.get('result', 'null'),
+                    response.get('error', 'null'),
+                    json.dumps(seconds / len(calls))))
+
+        with self._lock:
+            with open(self.path, 'a') as fd:
+                fd.writelines(lines)
+
+
+class ReplayTransport(object):
+    """Answer requests with the calls recorded by RecordTransport, without
+    any node
+
+    Calls are matched on method and params, recorded calls are used once and
+    in order. If there is no (unused) call with the same params, the next
+    unused call of the same method is used, so that requests containing
+    random data (e.g. shuffled inputs) still match; once all the calls of a
+    method are used, the last one is used again.
+
+    latency is None (answer at once), 'recorded' (wait as long as the
+    recorded calls took) or the seconds to wait for each request.
+    """
+
+    def __init__(self, path, latency=None):
+        self.path = path
+        self.latency = latency
+        self._lock = threading.Lock()
+        # method -> [[params key, raw result, raw error, seconds, used]]
+        self._calls = dict()
+        with open(path, 'r') as fd:
+            for line in fd:
+                if not line.strip():
+                    continue
+                call = _split_raw(line)
+                self._calls.setdefault(json.loads(call['method']), []).append(
+                    [_params_key(call['params']), call['result'],
+                     call['error'], float(call['seconds']), False])
+
+    def request(self, postdata, send):
+        data, delay = self._respond(postdata)
+        if delay:
+            time.sleep(delay)
+        return data
+
+    async def request_async(self, postdata, send):
+        data, delay = self._respond(postdata)
+        if delay:
+            await asyncio.sleep(delay)
+        return data
+
+    def _match(self, method, params_key):
+        calls = self._calls.get(method)
+        if not calls:
+            raise ValueError('No recorded call for method %r' % method)
+        unused = [c for c in calls if not c[4]]
+        for call in unused:
+            if call[0] == params_key:
+                return call
+        if unused:
+            return unused[0]
+        for call in reversed(calls):
+            if call[0] == params_key:
+                return call
+        return calls[-1]
+
+    def _respond(self, postdata):
+        calls = _split_raw(postdata)
+        is_batch = isinstance(calls, list)
+        if not is_batch:
+            calls = [calls]
+
+        responses = []
+        seconds = 0
+        with self._lock:
+            for call in calls:
+                recorded = self._match(json.loads(call['method']),
+                                       _params_key(call.get('params')))
+                recorded[4] = True
+                seconds += recorded[3]
+                responses.append(
+                    '{{"result": {}, "error": {}, "id": {}}}'.format(
+                        recorded[1], recorded[2], call.get('id', 'null')))
+
+        if is_batch:
+            data = '[' + ', '.join(responses) + ']'
+        else:
+            data = responses[0]
+        delay = seconds if self.latency == 'recorded' else self.latency
+        return data.encode('utf8'), delay
+
+
+def _parse_credentials(service_url=None,
+                       service_port=None,
+                       elements_conf_file=None):
+    """Return the service URL and the authentication pair
+
+    If service_url is not given, they are deduced from elements.conf and the
+    cookie file.
+    """
+    authpair = None
+
+    if service_url is None:
+        # Figure out the path to the conf file
+        if elements_conf_file is None:
+            if platform.system() == 'Darwin':
+                elements_conf_file = os.path.expanduser('~/Library/Application Support/Elements/')
+            elif platform.system() == 'Windows':
+                elements_conf_file = os.path.join(os.environ['APPDATA'], 'Elements')
+            else:
+                elements_conf_file = os.path.expanduser('~/.elements')
+            elements_conf_file = os.path.join(elements_conf_file, 'elements.conf')
+
+        # Elements Core accepts empty rpcuser, not specified in elements_conf_file
+        conf = {'rpcuser': ""}
+
+        # Extract contents of elements.conf to build service_url
+        try:
+            with open(elements_conf_file, 'r') as fd:
+                for line in fd.readlines():
+                    if '#' in line:
+                        line = line[:line.index('#')]
+                    if '=' not in line:
+                        continue
+                    k, v = line.split('=', 1)
+                    conf[k.strip()] = v.strip()
+
+        # Treat a missing elements.conf as though it were empty
+        except FileNotFoundError:
+            pass
+
+        # if chain is specified, chain.key replaces key
+        chain = conf.get('chain', 'liquidv1')
+        for key in conf.copy():
+            if key.startswith(chain + '.'):
+                conf[key[(len(chain) + 1):]] = conf.pop(key)
+
+        if service_port is None:
+            service_port = DEFAULT_ELEMENTS_RPC_PORT
+        conf['rpcport'] = int(conf.get('rpcport', service_port))
+        conf['rpchost'] = conf.get('rpcconnect', 'localhost')
+
+        service_url = ('%s://%s:%d' %
+            ('http', conf['rpchost'], conf['rpcport']))
+
+        if 'rpcwallet' in conf:
+            service_url += ('/wallet/%s' % conf['rpcwallet'])
+
+        cookie_dir = conf.get('datadir', os.path.dirname(elements_conf_file))
+        cookie_dir = os.path.join(cookie_dir, chain)
+        cookie_file = conf.get('rpccookiefile', os.path.join(cookie_dir, ".cookie"))
+        try:
+            with open(cookie_file, 'r') as fd:
+                authpair = fd.read()
+        except IOError as err:
+            if 'rpcpassword' in conf:
+                authpair = "%s:%s" % (conf['rpcuser'], conf['rpcpassword'])
+
+            else:
+                raise ValueError('Cookie file unusable (%s) and rpcpassword not specified in the configuration file: %r' % (err, elements_conf_file))
+
+    else:
+        url = urlparse.urlparse(service_url)
+        authpair = "%s:%s" % (url.username, url.password)
+
+    return service_url, authpair
+
+
 class BaseProxy(object):
     """Base JSON-RPC proxy class. Contains only private methods; do not use
     directly."""
@@ -87,76 +979,20 @@ class BaseProxy(object):
                  service_url=None,
                  service_port=None,
                  elements_conf_file=None,
-                 timeout=DEFAULT_HTTP_TIMEOUT):
+                 timeout=DEFAULT_HTTP_TIMEOUT,
+                 retry_policy=None,
+                 codec=None,
+                 cache=None,
+                 metrics=None,
+                 transport=None):
 
         # Create a dummy connection early on so if __init__() fails prior to
         # __conn being created __del__() can detect the condition and handle it
         # correctly.
         self.__conn = None
-        authpair = None
-
-        if service_url is None:
-            # Figure out the path to the conf file
-            if elements_conf_file is None:
-                if platform.system() == 'Darwin':
-                    elements_conf_file = os.path.expanduser('~/Library/Application Support/Elements/')
-                elif platform.system() == 'Windows':
-                    elements_conf_file = os.path.join(os.environ['APPDATA'], 'Elements')
-                else:
-                    elements_conf_file = os.path.expanduser('~/.elements')
-                elements_conf_file = os.path.join(elements_conf_file, 'elements.conf')
-
-            # Elements Core accepts empty rpcuser, not specified in elements_conf_file
-            conf = {'rpcuser': ""}
-
-            # Extract contents of elements.conf to build service_url
-            try:
-                with open(elements_conf_file, 'r') as fd:
-                    for line in fd.readlines():
-                        if '#' in line:
-                            line = line[:line.index('#')]
-                        if '=' not in line:
-                            continue
-                        k, v = line.split('=', 1)
-                        conf[k.strip()] = v.strip()
-
-            # Treat a missing elements.conf as though it were empty
-            except FileNotFoundError:
-                pass
-
-            # if chain is specified, chain.key replaces key
-            chain = conf.get('chain', 'liquidv1')
-            for key in conf.copy():
-                if key.startswith(chain + '.'):
-                    conf[key[(len(chain) + 1):]] = conf.pop(key)
-
-            if service_port is None:
-                service_port = DEFAULT_ELEMENTS_RPC_PORT
-            conf['rpcport'] = int(conf.get('rpcport', service_port))
-            conf['rpchost'] = conf.get('rpcconnect', 'localhost')
-
-            service_url = ('%s://%s:%d' %
-                ('http', conf['rpchost'], conf['rpcport']))
-
-            if 'rpcwallet' in conf:
-                service_url += ('/wallet/%s' % conf['rpcwallet'])
-
-            cookie_dir = conf.get('datadir', os.path.dirname(elements_conf_file))
-            cookie_dir = os.path.join(cookie_dir, chain)
-            cookie_file = conf.get('rpccookiefile', os.path.join(cookie_dir, ".cookie"))
-            try:
-                with open(cookie_file, 'r') as fd:
-                    authpair = fd.read()
-            except IOError as err:
-                if 'rpcpassword' in conf:
-                    authpair = "%s:%s" % (conf['rpcuser'], conf['rpcpassword'])
-
-                else:
-                    raise ValueError('Cookie file unusable (%s) and rpcpassword not specified in the configuration file: %r' % (err, elements_conf_file))
-
-        else:
-            url = urlparse.urlparse(service_url)
-            authpair = "%s:%s" % (url.username, url.password)
+        service_url, authpair = _parse_credentials(service_url,
+                                                   service_port,
+                                                   elements_conf_file)
 
         self.__service_url = service_url
         self.__url = urlparse.urlparse(service_url)
@@ -169,6 +1005,9 @@ class BaseProxy(object):
         else:
             port = self.__url.port
         self.__id_count = 0
+        # sizes of the last request and response
+        self.__request_size = 0
+        self.__response_size = 0
 
         if authpair is None:
             self.__auth_header = None
@@ -179,26 +1018,85 @@ class BaseProxy(object):
         self.__conn = httplib.HTTPConnection(self.__url.hostname, port=port,
                                              timeout=timeout)
 
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.__retry_policy = retry_policy
+
+        if codec is None:
+            codec = get_codec()
+        self.__codec = codec
+
+        if cache is None:
+            cache = RPCCache()
+        self.__cache = cache
+
+        if metrics is None:
+            metrics = RPCMetrics()
+        self.__metrics = metrics
+
+        # RecordTransport, ReplayTransport or None to talk to the node
+        self.__transport = transport
+
     def _call(self, service_name, *args):
+        if self.__cache.cacheable(service_name):
+            return self.__cache.get(
+                service_name, args,
+                lambda: self._call_uncached(service_name, *args))
+        return self._call_uncached(service_name, *args)
+
+    def invalidate_cache(self, *service_names):
+        """Forget the cached results of service_names (all if none)"""
+        self.__cache.invalidate(*service_names)
+
+    def _call_uncached(self, service_name, *args):
         self.__id_count += 1
 
-        postdata = json.dumps({'version': '1.1',
-                               'method': service_name,
-                               'params': args,
-                               'id': self.__id_count})
+        postdata = self.__codec.dumps({'version': '1.1',
+                                       'method': service_name,
+                                       'params': args,
+                                       'id': self.__id_count})
 
-        headers = {
-            'Host': self.__url.hostname,
-            'User-Agent': DEFAULT_USER_AGENT,
-            'Content-type': 'application/json',
-        }
+        return self._retry([service_name],
+                           lambda: self._call_once(service_name, postdata))
 
-        if self.__auth_header is not None:
-            headers['Authorization'] = self.__auth_header
+    def _call_projected(self, fields, service_name, *args):
+        self.__id_count += 1
 
-        self.__conn.request('POST', self.__url.path, postdata, headers)
+        postdata = self.__codec.dumps({'version': '1.1',
+                                       'method': service_name,
+                                       'params': args,
+                                       'id': self.__id_count})
+
+        return self._retry(
+            [service_name],
+            lambda: self._call_once(service_name, postdata, fields))
+
+    def projected(self, fields):
+        """Keep only fields of the result, parsing the response while it is
+        read
+
+        Usage:
+        unspents = proxy.projected({'txid': None, 'vout': None}).listunspent()
+        """
+        return RPCProjection(self, fields)
+
+    @property
+    def metrics(self):
+        """RPCMetrics of the calls sent by this proxy"""
+        return self.__metrics
+
+    def _call_once(self, service_name, postdata, fields=None):
+        start = time.monotonic()
+        response = None
+        try:
+            response = self._post(postdata, fields)
+        finally:
+            self.__metrics.record(
+                service_name, time.monotonic() - start,
+                request_bytes=len(postdata),
+                response_bytes=self.__response_size,
+                error=response is None or response['error'] is not None)
 
-        response = self._get_response()
         if response['error'] is not None:
             raise JSONRPCError(response['error'])
         elif 'result' not in response:
@@ -207,8 +1105,87 @@ class BaseProxy(object):
         else:
             return response['result']
 
+    def _retry(self, service_names, f):
+        attempt = 0
+        while True:
+            try:
+                result = f()
+            except Exception as e:
+                if not self.__retry_policy.should_retry(service_names, e,
+                                                        attempt):
+                    raise
+                time.sleep(self.__retry_policy.delay(attempt))
+                attempt += 1
+            else:
+                self.__retry_policy.succeeded()
+                return result
+
+    def _batch_call(self, calls):
+        """Send a list of (service_name, args) in a single request
+
+        Return the responses in the same order of the calls, None if the
+        server did not answer to a call. Cached results are not requested,
+        cacheable calls repeated in the batch are sent once.
+        """
+        cache = self.__cache
+        generation = cache.generation
+        responses, sent = _batch_pending(cache, calls)
+        if not sent:
+            return responses
+
+        sent_responses = self._batch_send([(n, a) for n, a, _ in sent])
+        return _batch_store(cache, generation, sent, sent_responses,
+                            responses)
+
+    def _batch_send(self, calls):
+        rpc_call_list = []
+        for service_name, args in calls:
+            self.__id_count += 1
+            rpc_call_list.append({'version': '1.1',
+                                  'method': service_name,
+                                  'params': args,
+                                  'id': self.__id_count})
+
+        def batch_once():
+            start = time.monotonic()
+            responses = None
+            try:
+                responses = self._batch(rpc_call_list)
+            finally:
+                self.__metrics.record_batch(
+                    rpc_call_list, responses, time.monotonic() - start,
+                    self.__request_size, self.__response_size)
+            _check_batch_responses(responses)
+            return responses
+
+        responses = self._retry([c['method'] for c in rpc_call_list],
+                                batch_once)
+        return _responses_by_id(rpc_call_list, responses)
+
+    def batch(self):
+        """Queue calls and send them in a single request
+
+        Usage:
+        with proxy.batch() as b:
+            f1 = b.getnetworkinfo()
+            f2 = b.getblockchaininfo()
+        f1.result(), f2.result()
+        """
+        return RPCBatch(self)
+
     def _batch(self, rpc_call_list):
-        postdata = json.dumps(list(rpc_call_list))
+        postdata = self.__codec.dumps(list(rpc_call_list))
+        return self._post(postdata)
+
+    def _post(self, postdata, fields=None, raw=False):
+        if self.__transport is not None and not raw:
+            self.__request_size = len(postdata)
+            data = self.__transport.request(postdata, self._post_raw)
+            self.__response_size = len(data)
+            if fields is None:
+                return self.__codec.loads(data)
+            return _ProjectingParser(io.BytesIO(data),
+                                     self.__codec).response(fields)
 
         headers = {
             'Host': self.__url.hostname,
@@ -219,17 +1196,52 @@ class BaseProxy(object):
         if self.__auth_header is not None:
             headers['Authorization'] = self.__auth_header
 
-        self.__conn.request('POST', self.__url.path, postdata, headers)
-        return self._get_response()
+        self.__request_size = len(postdata)
+        self.__response_size = 0
+        self._reconnect_if_closed()
+        try:
+            self.__conn.request('POST', self.__url.path, postdata, headers)
+            return self._get_response(fields, raw)
+        except (httplib.HTTPException, OSError, ValueError):
+            # leave the connection in a clean state, a new socket is opened
+            # by the next request
+            self.__conn.close()
+            raise
+
+    def _post_raw(self, postdata):
+        """Send postdata to the node, return the undecoded response"""
+        return self._post(postdata, raw=True)
+
+    def _reconnect_if_closed(self):
+        # An idle keep-alive socket that became readable has been closed (or
+        # half-closed) by the server: drop it, http.client opens a new one on
+        # the next request.
+        sock = self.__conn.sock
+        if sock is None:
+            return
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            readable = True
+        if readable:
+            self.__conn.close()
 
-    def _get_response(self):
+    def _get_response(self, fields=None, raw=False):
         http_response = self.__conn.getresponse()
         if http_response is None:
             raise JSONRPCError({
                 'code': -342, 'message': 'missing HTTP response from server'})
 
-        return json.loads(http_response.read().decode('utf8'),
-                          parse_float=decimal.Decimal)
+        if raw or fields is None:
+            data = http_response.read()
+            self.__response_size = len(data)
+            return data if raw else self.__codec.loads(data)
+
+        parser = _ProjectingParser(http_response, self.__codec)
+        response = parser.response(fields)
+        # trailing newline
+        self.__response_size = parser.size + len(http_response.read())
+        return response
 
     def close(self):
         if self.__conn is not None:
@@ -240,6 +1252,131 @@ class BaseProxy(object):
             self.__conn.close()
 
 
+class RPCProjection(object):
+    """Calls returning only the requested fields of their result"""
+
+    def __init__(self, proxy, fields):
+        self._proxy = proxy
+        self._fields = fields
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            # Python internal stuff
+            raise AttributeError
+
+        f = lambda *args: self._proxy._call_projected(self._fields, name,
+                                                      *args)
+        f.__name__ = name
+        return f
+
+
+class RPCFuture(object):
+    """Result of a call queued in a batch
+
+    It is available once the batch has been sent.
+    """
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self._done = False
+        self._result = None
+        self._error = None
+
+    def _set_response(self, response):
+        if response is None:
+            self._error = JSONRPCError({
+                'code': -345, 'message': 'missing JSON-RPC batch response'})
+        elif response.get('error') is not None:
+            self._error = JSONRPCError(response['error'])
+        elif 'result' not in response:
+            self._error = JSONRPCError({
+                'code': -343, 'message': 'missing JSON-RPC result'})
+        else:
+            self._result = response['result']
+        self._done = True
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        """Return the result of the call, raise if the call failed"""
+        if not self._done:
+            raise ValueError('Batch containing %r not sent yet' %
+                             self.service_name)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class RPCBatch(object):
+    """Collect calls to be sent in a single JSON-RPC batch request
+
+    Every call returns a ``RPCFuture``; the batch is sent when the context
+    exits (or calling ``send()``).
+    """
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            # Python internal stuff
+            raise AttributeError
+
+        def f(*args):
+            future = RPCFuture(name)
+            self._calls.append((name, args, future))
+            return future
+
+        f.__name__ = name
+        return f
+
+    def send(self):
+        calls, self._calls = self._calls, []
+        if not calls:
+            return
+
+        responses = self._proxy._batch_call([(n, a) for n, a, _ in calls])
+        for (_, _, future), response in zip(calls, responses):
+            future._set_response(response)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, stacktrace):
+        if typ is None:
+            self.send()
+        return False
+
+
+class AsyncRPCBatch(RPCBatch):
+    """RPCBatch for asyncio proxies, sent when the ``async with`` block
+    exits (or awaiting ``send()``)
+    """
+
+    async def send(self):
+        calls, self._calls = self._calls, []
+        if not calls:
+            return
+
+        responses = await self._proxy._batch_call(
+            [(n, a) for n, a, _ in calls])
+        for (_, _, future), response in zip(calls, responses):
+            future._set_response(response)
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with asyncio proxies')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, typ, value, stacktrace):
+        if typ is None:
+            await self.send()
+        return False
+
+
 class RawProxy(BaseProxy):
     """Low-level proxy to a bitcoin JSON-RPC service
 
@@ -273,6 +1410,350 @@ class RawProxy(BaseProxy):
         return f
 
 
+class AsyncBaseProxy(object):
+    """Base asyncio JSON-RPC proxy class. Contains only private methods; do
+    not use directly.
+
+    Concurrent calls are sent on different keep-alive connections (at most
+    max_connections), so that they are served in parallel by the node.
+    """
+
+    def __init__(self,
+                 service_url=None,
+                 service_port=None,
+                 elements_conf_file=None,
+                 timeout=DEFAULT_HTTP_TIMEOUT,
+                 max_connections=DEFAULT_ASYNC_MAX_CONNECTIONS,
+                 retry_policy=None,
+                 codec=None,
+                 cache=None,
+                 metrics=None,
+                 transport=None):
+
+        service_url, authpair = _parse_credentials(service_url,
+                                                   service_port,
+                                                   elements_conf_file)
+
+        self.__service_url = service_url
+        self.__url = urlparse.urlparse(service_url)
+
+        if self.__url.scheme not in ('http',):
+            raise ValueError('Unsupported URL scheme %r' % self.__url.scheme)
+
+        if self.__url.port is None:
+            self.__port = httplib.HTTP_PORT
+        else:
+            self.__port = self.__url.port
+        self.__id_count = 0
+
+        if authpair is None:
+            self.__auth_header = None
+        else:
+            authpair = authpair.encode('utf8')
+            self.__auth_header = b"Basic " + base64.b64encode(authpair)
+
+        self.__timeout = timeout
+        self.__max_connections = max_connections
+        # created lazily, it must belong to the running loop
+        self.__semaphore = None
+        # idle (reader, writer) pairs
+        self.__idle = []
+
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.__retry_policy = retry_policy
+
+        if codec is None:
+            codec = get_codec()
+        self.__codec = codec
+
+        if cache is None:
+            cache = RPCCache()
+        self.__cache = cache
+
+        if metrics is None:
+            metrics = RPCMetrics()
+        self.__metrics = metrics
+
+        # RecordTransport, ReplayTransport or None to talk to the node
+        self.__transport = transport
+
+    async def _call(self, service_name, *args):
+        if self.__cache.cacheable(service_name):
+            return await self.__cache.get_async(
+                service_name, args,
+                lambda: self._call_projected(None, service_name, *args))
+        return await self._call_projected(None, service_name, *args)
+
+    def invalidate_cache(self, *service_names):
+        """Forget the cached results of service_names (all if none)"""
+        self.__cache.invalidate(*service_names)
+
+    def projected(self, fields):
+        """Keep only fields of the result, see RawProxy.projected
+
+        The response is read at once, but only the projection is decoded.
+        """
+        return RPCProjection(self, fields)
+
+    async def _call_projected(self, fields, service_name, *args):
+        self.__id_count += 1
+
+        postdata = self.__codec.dumps({'version': '1.1',
+                                       'method': service_name,
+                                       'params': args,
+                                       'id': self.__id_count})
+
+        attempt = 0
+        while True:
+            try:
+                response = await self._request_recorded(service_name,
+                                                        postdata, fields)
+                if response['error'] is not None:
+                    raise JSONRPCError(response['error'])
+                elif 'result' not in response:
+                    raise JSONRPCError({
+                        'code': -343, 'message': 'missing JSON-RPC result'})
+            except Exception as e:
+                if not self.__retry_policy.should_retry([service_name], e,
+                                                        attempt):
+                    raise
+                await asyncio.sleep(self.__retry_policy.delay(attempt))
+                attempt += 1
+            else:
+                self.__retry_policy.succeeded()
+                return response['result']
+
+    @property
+    def metrics(self):
+        """RPCMetrics of the calls sent by this proxy"""
+        return self.__metrics
+
+    def batch(self):
+        """Queue calls and send them in a single request, see RawProxy.batch
+
+        Usage:
+        async with proxy.batch() as b:
+            f1 = b.getnetworkinfo()
+            f2 = b.getblockchaininfo()
+        f1.result(), f2.result()
+        """
+        return AsyncRPCBatch(self)
+
+    async def _batch_call(self, calls):
+        """Send a list of (service_name, args) in a single request, see
+        RawProxy._batch_call
+        """
+        cache = self.__cache
+        generation = cache.generation
+        responses, sent = _batch_pending(cache, calls)
+        if not sent:
+            return responses
+
+        rpc_call_list = []
+        for service_name, args, _ in sent:
+            self.__id_count += 1
+            rpc_call_list.append({'version': '1.1',
+                                  'method': service_name,
+                                  'params': args,
+                                  'id': self.__id_count})
+
+        service_names = [c['method'] for c in rpc_call_list]
+        attempt = 0
+        while True:
+            try:
+                sent_responses = await self._batch(rpc_call_list)
+                _check_batch_responses(sent_responses)
+            except Exception as e:
+                if not self.__retry_policy.should_retry(service_names, e,
+                                                        attempt):
+                    raise
+                await asyncio.sleep(self.__retry_policy.delay(attempt))
+                attempt += 1
+            else:
+                self.__retry_policy.succeeded()
+                break
+
+        return _batch_store(cache, generation, sent,
+                            _responses_by_id(rpc_call_list, sent_responses),
+                            responses)
+
+    async def _batch(self, rpc_call_list):
+        postdata = self.__codec.dumps(list(rpc_call_list))
+        start = time.monotonic()
+        responses, response_size = None, 0
+        try:
+            responses, response_size = await self._request(postdata)
+        finally:
+            self.__metrics.record_batch(
+                rpc_call_list, responses, time.monotonic() - start,
+                len(postdata), response_size)
+        return responses
+
+    async def _request_recorded(self, service_name, postdata, fields=None):
+        start = time.monotonic()
+        response, response_size = None, 0
+        try:
+            response, response_size = await self._request(postdata, fields)
+        finally:
+            self.__metrics.record(
+                service_name, time.monotonic() - start,
+                request_bytes=len(postdata),
+                response_bytes=response_size,
+                error=response is None or response['error'] is not None)
+        return response
+
+    async def _request(self, postdata, fields=None):
+        """Return the response and its size in bytes"""
+        if self.__transport is None:
+            data = await self._request_raw(postdata)
+        else:
+            data = await self.__transport.request_async(postdata,
+                                                        self._request_raw)
+
+        if fields is None:
+            return self.__codec.loads(data), len(data)
+        return _ProjectingParser(io.BytesIO(data),
+                                 self.__codec).response(fields), len(data)
+
+    async def _request_raw(self, postdata):
+        """Send postdata to the node, return the undecoded response"""
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__max_connections)
+
+        async with self.__semaphore:
+            while self.__idle:
+                reader, writer = self.__idle.pop()
+                if reader.at_eof():
+                    writer.close()
+                    continue
+                try:
+                    return await self._send_or_close(reader, writer, postdata)
+                except asyncio.IncompleteReadError as e:
+                    if e.partial:
+                        raise
+                except ConnectionError:
+                    pass
+                # keep-alive connection dropped by the server while idle,
+                # retry once on a new connection
+                break
+
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.__url.hostname, self.__port),
+                self.__timeout)
+            return await self._send_or_close(reader, writer, postdata)
+
+    async def _send_or_close(self, reader, writer, postdata):
+        """_send within the timeout, close the connection if it fails or
+        times out (the cancellation is not an Exception) so that it is
+        neither leaked nor reused
+        """
+        try:
+            return await asyncio.wait_for(
+                self._send(reader, writer, postdata),
+                self.__timeout)
+        except BaseException:
+            writer.close()
+            if (reader, writer) in self.__idle:
+                self.__idle.remove((reader, writer))
+            raise
+
+    async def _send(self, reader, writer, postdata):
+        body = postdata if isinstance(postdata, bytes) else \
+            postdata.encode('utf8')
+        headers = [
+            b'POST ' + (self.__url.path or '/').encode('utf8') + b' HTTP/1.1',
+            b'Host: ' + self.__url.hostname.encode('utf8'),
+            b'User-Agent: ' + DEFAULT_USER_AGENT.encode('utf8'),
+            b'Content-type: application/json',
+            b'Content-Length: ' + str(len(body)).encode('utf8'),
+        ]
+        if self.__auth_header is not None:
+            headers.append(b'Authorization: ' + self.__auth_header)
+
+        writer.write(b'\r\n'.join(headers) + b'\r\n\r\n' + body)
+        await writer.drain()
+
+        status, response_headers, data = await self._read_response(reader)
+
+        if response_headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self.__idle.append((reader, writer))
+
+        if not data:
+            raise JSONRPCError({
+                'code': -342,
+                'message': 'missing HTTP response from server (HTTP %d)' %
+                status})
+        return data
+
+    async def _read_response(self, reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        response_headers = dict()
+        for line in lines[1:]:
+            if ':' in line:
+                k, v = line.split(':', 1)
+                response_headers[k.strip().lower()] = v.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0],
+                           16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(
+                int(response_headers['content-length']))
+        else:
+            data = await reader.read()
+
+        return status, response_headers, data
+
+    async def close(self):
+        while self.__idle:
+            _, writer = self.__idle.pop()
+            writer.close()
+
+
+class AsyncRawProxy(AsyncBaseProxy):
+    """Low-level asyncio proxy to a bitcoin JSON-RPC service
+
+    Same as ``RawProxy``, but every call returns a coroutine:
+
+    info = await proxy.getnetworkinfo()
+    """
+    def __init__(self,
+                 service_url=None,
+                 service_port=None,
+                 elements_conf_file=None,
+                 timeout=DEFAULT_HTTP_TIMEOUT,
+                 **kwargs):
+        super(AsyncRawProxy, self).__init__(
+            service_url=service_url,
+            service_port=service_port,
+            elements_conf_file=elements_conf_file,
+            timeout=timeout,
+            **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('__') and name.endswith('__'):
+            # Python internal stuff
+            raise AttributeError
+
+        async def f(*args):
+            return await self._call(name, *args)
+
+        f.__name__ = name
+        return f
+
+
 __all__ = (
     'JSONRPCError',
     'ForbiddenBySafeModeError',
@@ -283,4 +1764,17 @@ __all__ = (
     'VerifyAlreadyInChainError',
     'InWarmupError',
     'RawProxy',
+    'AsyncRawProxy',
+    'RetryPolicy',
+    'RPCCache',
+    'RPCMetrics',
+    'RecordTransport',
+    'ReplayTransport',
+    'JSONCodec',
+    'OrjsonCodec',
+    'Satoshi',
+    'get_codec',
+    'RPCBatch',
+    'AsyncRPCBatch',
+    'RPCFuture',
 )
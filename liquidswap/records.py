@@ -0,0 +1,77 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from liquidswap.constants import UNSPENT_DETAILS_KEYS
+
+
+class _Record(object):
+    """Immutable parse results of a swap payload
+
+    Records are tuples, so that they can still be unpacked or passed as the
+    arguments of the following phase. The first field, the transaction (or
+    PSET), identifies the swap: records are hashed by it. Mapping fields are
+    read-only copies (MappingProxyType).
+    """
+
+    __slots__ = ()
+
+    def __hash__(self):
+        return hash(self[0])
+
+    def compact(self):
+        """JSON serializable form, see from_compact
+        """
+        return list(self)
+
+    @classmethod
+    def from_compact(cls, data):
+        return cls._make(data)
+
+
+class ParsedProposal(_Record, namedtuple('ParsedProposal', [
+        'tx', 'c_address_p', 'amount_p', 'asset_p', 'fee_p', 'amount_r',
+        'asset_r', 'map_amount_p', 'map_asset_p', 'unspents_details'])):
+    """Result of parse_proposed, unspents_details is a tuple"""
+
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        record = super(ParsedProposal, cls).__new__(cls, *args, **kwargs)
+        return tuple.__new__(cls, record[:-3] + (
+            MappingProxyType(dict(record.map_amount_p)),
+            MappingProxyType(dict(record.map_asset_p)),
+            tuple(MappingProxyType(dict(u))
+                  for u in record.unspents_details)))
+
+    def compact(self):
+        # unspents details as lists of values, in UNSPENT_DETAILS_KEYS order
+        return list(self[:-3]) + [
+            dict(self.map_amount_p), dict(self.map_asset_p),
+            [[u[k] for k in UNSPENT_DETAILS_KEYS]
+             for u in self.unspents_details]]
+
+    @classmethod
+    def from_compact(cls, data):
+        return cls(*data[:-1], [dict(zip(UNSPENT_DETAILS_KEYS, u))
+                                for u in data[-1]])
+
+    def __reduce__(self):
+        # mapping proxies can not be pickled
+        return self.from_compact, (self.compact(),)
+
+
+class ParsedPsetProposal(_Record, namedtuple('ParsedPsetProposal', [
+        'pset', 'c_address_p', 'amount_p', 'asset_p', 'fee_p', 'amount_r',
+        'asset_r'])):
+    """Result of parse_proposed_pset"""
+
+    __slots__ = ()
+
+
+class ParsedAcceptance(_Record, namedtuple('ParsedAcceptance', [
+        'tx', 'amount_p', 'asset_p', 'fee_p', 'amount_r', 'asset_r',
+        'fee_r'])):
+    """Result of parse_accepted and parse_accepted_pset, tx is the PSET for
+    the latter"""
+
+    __slots__ = ()
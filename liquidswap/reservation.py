@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # the store is only locked among the threads of the process
+    fcntl = None
+
+from liquidswap.constants import RESERVATION_TTL
+from liquidswap.exceptions import ReservationStoreError
+
+
+class ReservationStore(object):
+    """Unspents reserved by the outstanding swaps of a wallet
+
+    Reservations are kept in the JSON file at path, keyed by the
+    (unconfidential) address of the wallet party of the swap, so that swaps
+    funded by other processes, or before a restart, do not spend the same
+    unspents.
+    They expire after ttl seconds. If lock_in_node is set, the reserved
+    unspents are also locked in the node with lockunspent, so that they are
+    not spent by other wallet users either.
+
+    Each method loads and saves the file, locked(), which may be nested,
+    keeps the file locked (and loaded) across several calls. If path is
+    None, reservations are only kept in memory, e.g. while a batch of swaps
+    is funded.
+    """
+
+    def __init__(self, path, ttl=RESERVATION_TTL, lock_in_node=False):
+        self.path = path
+        self.ttl = ttl
+        self.lock_in_node = lock_in_node
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+        self._reservations = dict() if path is None else None
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                reservations = json.load(f)
+        except FileNotFoundError:
+            return dict()
+        except ValueError:
+            raise ReservationStoreError('Invalid reservation store: {}'.format(
+                self.path))
+        return {key: {'outpoints': [tuple(o) for o in r['outpoints']],
+                      'expiry': r['expiry']}
+                for key, r in reservations.items()}
+
+    def _save(self):
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as f:
+            json.dump(self._reservations, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def locked(self):
+        """Lock the store, among threads and processes
+        """
+        with self._lock:
+            if self._depth == 0 and self.path is not None:
+                self._file = open('{}.lock'.format(self.path), 'a')
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_EX)
+                self._reservations = self._load()
+                self._dirty = False
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and self.path is not None:
+                    try:
+                        if self._dirty:
+                            self._save()
+                    finally:
+                        self._reservations = None
+                        # closing the file releases the lock
+                        self._file.close()
+                        self._file = None
+
+    def outpoints(self):
+        """Outpoints of all the reservations, expired ones included
+        """
+        with self.locked():
+            return set(o for r in self._reservations.values()
+                       for o in r['outpoints'])
+
+    def reservations(self):
+        """Map each key to its reserved outpoints and expiry time
+        """
+        with self.locked():
+            return {key: dict(r) for key, r in self._reservations.items()}
+
+    def reserve(self, key, outpoints, ttl=None):
+        """Reserve outpoints, (txid, vout) tuples, for the proposal key
+        """
+        outpoints = [tuple(o) for o in outpoints]
+        with self.locked():
+            logging.debug('Reserving unspents for {}: {}'.format(key,
+                                                                 outpoints))
+            self._reservations[key] = {
+                'outpoints': outpoints,
+                'expiry': time.time() + (self.ttl if ttl is None else ttl),
+            }
+            self._dirty = True
+
+    def _pop(self, keys):
+        released = list()
+        for key in keys:
+            logging.debug('Releasing unspents of {}'.format(key))
+            released += self._reservations.pop(key)['outpoints']
+            self._dirty = True
+        return released
+
+    def release(self, key):
+        """Release the reservation of key, return its outpoints
+        """
+        with self.locked():
+            return self._pop([key] if key in self._reservations else [])
+
+    def release_outpoints(self, outpoints):
+        """Release the reservations spending any of outpoints, e.g. once the
+        swap transaction is broadcast, return their outpoints
+        """
+        outpoints = set(tuple(o) for o in outpoints)
+        with self.locked():
+            return self._pop([key for key, r in self._reservations.items()
+                              if outpoints.intersection(r['outpoints'])])
+
+    def expire(self, now=None):
+        """Release the expired reservations, return their outpoints
+        """
+        now = time.time() if now is None else now
+        with self.locked():
+            return self._pop([key for key, r in self._reservations.items()
+                              if r['expiry'] <= now])
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from liquidswap.constants import (
+    SESSION_PARSED,
+    SESSION_STATES,
+)
+from liquidswap.exceptions import UnexpectedValueError
+
+
+def payload_hash(payload):
+    """Hash of a decoded payload, independent of its encoding
+    """
+    data = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class SessionStore(object):
+    """State and parsed results of the swaps seen by a wallet
+
+    Swaps are kept in the SQLite database at path (':memory:' for the
+    process only), keyed by payload_hash, with their state (see
+    SESSION_STATES), the results of parsing the payload and the result of
+    the last phase run on it (e.g. the acceptance). Results depend on the
+    wallet, use a store per wallet.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS swaps ('
+                'hash TEXT PRIMARY KEY, state TEXT NOT NULL, parsed TEXT, '
+                'result TEXT, updated REAL NOT NULL)')
+
+    def close(self):
+        self._db.close()
+
+    def get(self, payload):
+        """Return the state, parsed results and result of payload, None if
+        the swap is unknown
+        """
+        with self._lock, closing(self._db.cursor()) as cursor:
+            cursor.execute('SELECT state, parsed, result FROM swaps '
+                           'WHERE hash = ?', (payload_hash(payload),))
+            row = cursor.fetchone()
+        if row is None:
+            return None, None, None
+        state, parsed, result = row
+        return (state,
+                None if parsed is None else tuple(json.loads(parsed)),
+                None if result is None else json.loads(result))
+
+    def save(self, payload, state, parsed=None, result=None):
+        """Set the state of payload, and its parsed results or result if
+        given
+        """
+        if state not in SESSION_STATES:
+            raise UnexpectedValueError('Unknown swap state: {}'.format(state))
+        key = payload_hash(payload)
+        parsed = None if parsed is None else json.dumps(parsed)
+        result = None if result is None else json.dumps(result)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR IGNORE INTO swaps (hash, state, updated) '
+                'VALUES (?, ?, ?)', (key, state, time.time()))
+            self._db.execute(
+                'UPDATE swaps SET state = ?, parsed = COALESCE(?, parsed), '
+                'result = COALESCE(?, result), updated = ? WHERE hash = ?',
+                (state, parsed, result, time.time(), key))
+
+    def parse(self, payload, parse):
+        """Parsed results of payload, parse(payload) is only called if they
+        are not stored yet
+        """
+        state, parsed, _ = self.get(payload)
+        if parsed is None:
+            parsed = parse(payload)
+            # a later state is kept
+            self.save(payload, state or SESSION_PARSED, parsed=parsed)
+        return parsed
@@ -1,6 +1,11 @@
+import asyncio
 import logging
 import random
-import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from liquidswap.exceptions import (
     SameAssetError,
@@ -12,37 +17,219 @@ from liquidswap.exceptions import (
     UnblindError,
     UnsignedTransactionError,
     InvalidTransactionError,
+    DecodeMismatchError,
 )
 from liquidswap.constants import (
     NLOCKTIME,
     IS_REPLACEABLE,
     DUMMY_ADDRESS,
     DUMMY_ADDRESS_CONFIDENTIAL,
+    DECODER_NODE,
+    DECODER_LOCAL,
+    DECODER_CHECK,
+    DECODERS,
+    PROPOSED_KEYS,
+    ACCEPTED_KEYS,
+    PROPOSED_PSET_KEYS,
+    ACCEPTED_PSET_KEYS,
+    UNSPENT_DETAILS_KEYS,
+    SESSION_ACCEPTED,
+    SESSION_FINALIZED,
+    SESSION_BROADCAST,
+)
+from liquidswap.liquidrpc import (
+    InvalidAddressOrKeyError,
+    InvalidParameterError,
+)
+from liquidswap.reservation import ReservationStore
+from liquidswap.session import payload_hash
+from liquidswap.records import (
+    ParsedProposal,
+    ParsedPsetProposal,
+    ParsedAcceptance,
+)
+from liquidswap import transaction
+from liquidswap.address import (
+    parse_address,
+    confidential_address,
+    script_type,
 )
 from liquidswap.util import (
     btc2sat,
     sat2btc,
     values2btc,
-    is_mine,
     sort_dict,
     get_chain_index,
+    get_output_address,
+    check_pset_version,
+    get_status,
+    check_not_mine,
 )
 
 
 # TODO: investigate cases when an output have more than one address
 #       (currently code may behave unexpectedly)
 
+# fields of the (potentially large) results actually used, the rest is
+# dropped while the response is parsed
+UNSPENT_FIELDS = {k: None for k in UNSPENT_DETAILS_KEYS + ['scriptPubKey']}
 
-def propose(amount_p, asset_p,
-            amount_r, asset_r,
-            connection,
-            fee_rate=None):
-    """Propose a swap
+# listunspent confirmations range, unconfirmed (e.g. change) unspents may be
+# selected by fundrawtransaction
+UNSPENT_MINCONF = 0
+UNSPENT_MAXCONF = 9999999
 
-    Proposer (p) sends amount_p of asset_p.
-    Receiver (r) is asked to send amount_r of asset_r.
+# proposals accepted concurrently by accept_many, as many as the default
+# number of node RPC threads
+ACCEPT_WORKERS = 4
+
+# seconds the getaddressinfo results are cached for by AddressResolver,
+# whether the wallet owns an address may change (e.g. once it is imported)
+ADDRESS_INFO_TTL = 60
+
+
+class AddressResolver(object):
+    """Resolve addresses with getaddressinfo, caching them for ttl seconds
+
+    The addresses missing from the cache (or expired) are looked up in a
+    single batch. Results are cached under the queried, confidential and
+    unconfidential address: only the fields not depending on which one was
+    queried (confidential, unconfidential, ismine) are meant to be read. The
+    cache may be filled by concurrent phases, entries are only ever replaced.
+    """
+
+    def __init__(self, ttl=ADDRESS_INFO_TTL):
+        self.ttl = ttl
+        # address -> (expiry, info)
+        self._infos = dict()
+
+    def _missing(self, addresses):
+        now = time.monotonic()
+        return sorted(set(a for a in addresses
+                          if a not in self._infos or
+                          self._infos[a][0] <= now))
+
+    def _store(self, futures):
+        expiry = time.monotonic() + self.ttl
+        for address, future in futures.items():
+            try:
+                info = future.result()
+            except InvalidAddressOrKeyError:
+                raise InvalidAddressError('Invalid address: {}'.format(
+                    address))
+            for key in (address, info.get('confidential'),
+                        info.get('unconfidential')):
+                if key:
+                    self._infos[key] = (expiry, info)
+
+    def _results(self, addresses):
+        # copies, the cache is shared by the phases using the connection
+        return {address: dict(self._infos[address][1])
+                for address in addresses}
+
+    def resolve(self, addresses, connection):
+        """Map each address to its getaddressinfo result
+
+        Raise InvalidAddressError if any address is not valid.
+        """
+        addresses = list(addresses)
+        missing = self._missing(addresses)
+        if missing:
+            with connection.batch() as batch:
+                futures = {a: batch.getaddressinfo(a) for a in missing}
+            self._store(futures)
+        return self._results(addresses)
+
+    async def resolve_async(self, addresses, connection):
+        """Same as resolve, with an asyncio connection"""
+        addresses = list(addresses)
+        missing = self._missing(addresses)
+        if missing:
+            async with connection.batch() as batch:
+                futures = {a: batch.getaddressinfo(a) for a in missing}
+            self._store(futures)
+        return self._results(addresses)
+
+
+# connection -> AddressResolver, shared as long as the connection lives, its
+# entries expire
+_resolvers = weakref.WeakKeyDictionary()
+_resolvers_lock = threading.Lock()
+
+
+def get_address_resolver(connection):
+    """AddressResolver of connection, shared by all the swap phases
     """
+    with _resolvers_lock:
+        resolver = _resolvers.get(connection)
+        if resolver is None:
+            resolver = _resolvers[connection] = AddressResolver()
+        return resolver
 
+
+def _decoded_fields(dtx):
+    """Fields of a decoded transaction read by the swap functions"""
+    return {
+        'txid': dtx['txid'],
+        'vsize': dtx['vsize'],
+        'vin': [(i.get('txid'), i.get('vout'), i.get('sequence'))
+                for i in dtx['vin']],
+        'vout': [(btc2sat(o['value']) if 'value' in o else None,
+                  o.get('asset'), o.get('valuecommitment'),
+                  o.get('assetcommitment'), o['scriptPubKey']['type'],
+                  get_output_address(o))
+                 for o in dtx['vout']],
+    }
+
+
+def _check_decoded(local, node):
+    """Raise if the local decoder disagrees with the node"""
+    local, node = _decoded_fields(local), _decoded_fields(node)
+    for field in node:
+        if local[field] != node[field]:
+            raise DecodeMismatchError(
+                'Local and node decoded transactions differ ({}): {}, '
+                '{}'.format(field, local[field], node[field]))
+
+
+def _queue_decode(batch, tx, decoder):
+    """Queue in batch the calls needed to decode tx with decoder
+
+    Return a function returning the decoded transaction once the batch is
+    sent. The local decoder only needs the (cached) chain and version of the
+    node, the check decoder decodes with both and compares the results.
+    """
+    if decoder not in DECODERS:
+        raise UnexpectedValueError('Unknown decoder: {}'.format(decoder))
+
+    if decoder != DECODER_LOCAL:
+        node_dtx = batch.decoderawtransaction(tx)
+    if decoder != DECODER_NODE:
+        blockchain_info = batch.getblockchaininfo()
+        network_info = batch.getnetworkinfo()
+
+    def decoded():
+        if decoder == DECODER_NODE:
+            return node_dtx.result()
+        dtx = transaction.decode(
+            tx, get_chain_index(blockchain_info.result().get('chain')),
+            network_info.result()['version'])
+        if decoder == DECODER_CHECK:
+            _check_decoded(dtx, node_dtx.result())
+        return dtx
+
+    return decoded
+
+
+def decode_transaction(tx, connection, decoder=DECODER_NODE):
+    """Decode tx with decoder (node, local or check)
+    """
+    with connection.batch() as batch:
+        decoded = _queue_decode(batch, tx, decoder)
+    return decoded()
+
+
+def _check_proposal_values(amount_p, asset_p, amount_r, asset_r, fee_rate):
     logging.info('Proposing a swap [1/3]')
     logging.info('Send {} (sat) of asset {}'.format(amount_p, asset_p))
     logging.info('Receive {} (sat) of asset {}'.format(amount_r, asset_r))
@@ -55,108 +242,331 @@ def propose(amount_p, asset_p,
         raise SameAssetError('Swaps between the same asset are currently not '
                              'supported.')
 
-    network = get_chain_index(connection.getblockchaininfo().get('chain'))
 
-    c_address_p = connection.getnewaddress()
-    u_address_p = connection.getaddressinfo(c_address_p)['unconfidential']
-    elements_version = connection.getnetworkinfo()['version']
+def _create_transaction(inputs, map_amount, map_asset, network):
+    """Unsigned transaction, as createrawtransaction would return it,
+    amounts in map_amount are in sat
+    """
+    return transaction.create(inputs, map_amount, map_asset, network,
+                              NLOCKTIME, IS_REPLACEABLE)
+
 
+def _createrawtransaction_args(inputs, map_amount, map_asset,
+                               elements_version):
     if elements_version < 210000:
-        txu = connection.createrawtransaction(
-            [],
-            {DUMMY_ADDRESS_CONFIDENTIAL[network]: sat2btc(amount_p)},
-            NLOCKTIME,
-            IS_REPLACEABLE,
-            {DUMMY_ADDRESS_CONFIDENTIAL[network]: asset_p}
-        )
+        return (inputs, values2btc(map_amount, None), NLOCKTIME,
+                IS_REPLACEABLE, map_asset)
     else:
-        txu = connection.createrawtransaction(
-            [],
-            [{DUMMY_ADDRESS_CONFIDENTIAL[network]: sat2btc(amount_p), 'asset': asset_p}],
-            NLOCKTIME,
-            IS_REPLACEABLE
-        )
+        return (inputs, values2btc(map_amount, map_asset), NLOCKTIME,
+                IS_REPLACEABLE)
 
-    # FIXME: consider locking unspents.
-    details = {
-        # 'lockUnspents': False,
-    }
+
+def _check_created_tx(tx, node_tx):
+    if tx != node_tx:
+        raise DecodeMismatchError(
+            'Local and node created transactions differ: {}, {}'.format(
+                tx, node_tx))
+
+
+def _check_created(tx, inputs, map_amount, map_asset, connection, decoder):
+    """With the check decoder, raise if createrawtransaction does not build
+    tx (see _create_transaction) from the same arguments
+    """
+    if decoder != DECODER_CHECK:
+        return
+    _check_created_tx(tx, connection.createrawtransaction(
+        *_createrawtransaction_args(inputs, map_amount, map_asset,
+                                    connection.getnetworkinfo()['version'])))
+
+
+async def _check_created_async(tx, inputs, map_amount, map_asset,
+                               connection, decoder):
+    """See _check_created"""
+    if decoder != DECODER_CHECK:
+        return
+    network_info = await connection.getnetworkinfo()
+    _check_created_tx(tx, await connection.createrawtransaction(
+        *_createrawtransaction_args(inputs, map_amount, map_asset,
+                                    network_info['version'])))
+
+
+def _fund_details(fee_rate, lock_unspents=False):
+    # unspents of single proposals are only locked by reservations, see
+    # _reserving
+    details = dict()
+    if lock_unspents:
+        details.update({'lockUnspents': True})
     if fee_rate is not None:
         details.update({'feeRate': fee_rate})
+    return details
 
-    logging.debug('Selecting inputs to fund swap transaction (proposer)')
-    txf = connection.fundrawtransaction(
-        txu,
-        details
-    )['hex']
 
-    inputs = connection.decoderawtransaction(txf)['vin']
-    outputs = connection.decoderawtransaction(txf)['vout']
+def _outpoint(item):
+    """(txid, vout) of an input or an unspent
+    """
+    return item['txid'], item['vout']
+
+
+def _index_unspents(unspents):
+    """Index unspents (or unspents details) by outpoint
+    """
+    return {_outpoint(unspent): unspent for unspent in unspents}
+
+
+def _lockunspent_args(outpoints):
+    """(txid, vout) outpoints, as lockunspent takes them
+    """
+    return [{'txid': txid, 'vout': vout} for txid, vout in outpoints]
+
+
+def _node_locked(connection):
+    """Outpoints locked in the node
+    """
+    return set(map(_outpoint, connection.listlockunspent()))
+
+
+def _spent(outpoints, connection):
+    """Outpoints already spent, including by mempool transactions
+
+    lockunspent rejects them, whether locking or unlocking.
+    """
+    outpoints = sorted(outpoints)
+    with connection.batch() as batch:
+        txouts = [batch.gettxout(txid, vout, True) for txid, vout in outpoints]
+    return set(outpoint for outpoint, txout in zip(outpoints, txouts)
+               if txout.result() is None)
+
+
+def _lockunspent(unlock, outpoints, connection):
+    """(Un)lock outpoints, but the ones spent meanwhile (e.g. by a swap
+    transaction sent by the partner), return the (un)locked ones
+    """
+    outpoints = set(outpoints)
+    while outpoints:
+        try:
+            connection.lockunspent(unlock,
+                                   _lockunspent_args(sorted(outpoints)))
+            break
+        except InvalidParameterError:
+            spent = _spent(outpoints, connection)
+            if not spent:
+                raise
+            outpoints -= spent
+    return sorted(outpoints)
+
+
+def _exclude_reserved(reservations, connection):
+    """Lock in the node the reserved unspents it has not locked, so that the
+    wallet does not select them when funding
+
+    The expired reservations are released, as well as the ones with a spent
+    unspent (e.g. by a swap transaction sent by the partner, or outside of
+    the tool), and their unspents unlocked if they were locked in the node.
+    Return the outpoints locked here.
+    """
+    released = set(reservations.expire())
+    spent = _spent(released.union(reservations.outpoints()), connection)
+    released.update(reservations.release_outpoints(spent))
+    reserved = reservations.outpoints()
+    node_locked = _node_locked(connection)
+    unlock = sorted(node_locked.intersection(released) - reserved - spent) \
+        if reservations.lock_in_node else []
+    _lockunspent(True, unlock, connection)
+    return _lockunspent(False, reserved - node_locked, connection)
+
+
+@contextmanager
+def _reserving(reservations, connection):
+    """Fund within the context without selecting reserved unspents
+
+    Yield a function reserving outpoints for a proposal (key). Reserved
+    unspents are kept locked in the node if reservations.lock_in_node,
+    otherwise they are only locked while in the context. If reservations is
+    None, nothing is excluded nor reserved.
+    """
+    if reservations is None:
+        yield lambda key, outpoints: None
+        return
+
+    with reservations.locked():
+        excluded = _exclude_reserved(reservations, connection)
+        reserved = list()
+
+        def reserve(key, outpoints):
+            outpoints = list(outpoints)
+            reservations.reserve(key, outpoints)
+            reserved.extend(outpoints)
+
+        try:
+            yield reserve
+        finally:
+            if reservations.lock_in_node:
+                _lockunspent(False, reserved, connection)
+            else:
+                _lockunspent(True, excluded, connection)
+
+
+def _txouts_addresses(txouts):
+    """Sorted, distinct addresses of the gettxout results
+    """
+    addresses = set(get_output_address(txout) for txout in txouts
+                    if txout is not None)
+    addresses.discard(None)
+    return sorted(addresses)
+
 
-    # collect details (keys) for each input
-    keys = ['txid', 'vout', 'amount', 'asset', 'amountblinder', 'assetblinder']
-    unspents = connection.listunspent()
+def _listunspent_args(addresses):
+    return UNSPENT_MINCONF, UNSPENT_MAXCONF, addresses
+
+
+def _list_unspents(inputs, connection):
+    """Wallet unspents spent by inputs, indexed by outpoint
+
+    Instead of listing the whole wallet, the addresses of the spent outputs
+    are looked up with gettxout and only the unspents at those addresses are
+    listed.
+    """
+    with connection.batch() as batch:
+        txouts = [batch.gettxout(txid, vout, True)
+                  for txid, vout in map(_outpoint, inputs)]
+
+    addresses = _txouts_addresses(txout.result() for txout in txouts)
+    if not addresses:
+        return dict()
+    return _index_unspents(connection.projected(UNSPENT_FIELDS).listunspent(
+        *_listunspent_args(addresses)))
+
+
+def _list_reserved_unspents(inputs, connection, reservations):
+    """Same as _list_unspents, including the reserved unspents locked in the
+    node, which listunspent does not list
+
+    Reserved unspents are also locked in the node while another proposal is
+    funded (see _reserving), the reservations lock waits for it.
+    """
+    if reservations is None:
+        return _list_unspents(inputs, connection)
+
+    with reservations.locked():
+        if not reservations.lock_in_node:
+            return _list_unspents(inputs, connection)
+        unlocked = sorted(_node_locked(connection).intersection(
+            map(_outpoint, inputs), reservations.outpoints()))
+        if unlocked:
+            connection.lockunspent(True, _lockunspent_args(unlocked))
+        try:
+            return _list_unspents(inputs, connection)
+        finally:
+            if unlocked:
+                connection.lockunspent(False, _lockunspent_args(unlocked))
+
+
+def release_reservation(u_address_p, connection, reservations):
+    """Release the unspents reserved by the proposal of u_address_p, e.g.
+    once it is withdrawn, return their outpoints
+    """
+    with reservations.locked():
+        released = reservations.release(u_address_p)
+        if reservations.lock_in_node:
+            # unspents shared with other reservations (aggregate legs) stay
+            # locked until these are released too
+            unlocked = set(released) - reservations.outpoints()
+            _lockunspent(True, _node_locked(connection).intersection(unlocked),
+                         connection)
+    return released
+
+
+def _reserve_legs(reserve, c_addresses_r, outpoints, network):
+    """Reserve outpoints funding an aggregate under the receiver address of
+    each leg, so that each leg releases or expires on its own
+    """
+    outpoints = list(outpoints)
+    for c_address_r in c_addresses_r:
+        reserve(_unconfidential_address(c_address_r, network), outpoints)
+
+
+def _release_spent(tx, reservations):
+    """Release the reservations of the unspents spent by tx (hex)
+
+    Spent unspents can not be selected anyway, their node locks are left.
+    """
+    if reservations is not None:
+        reservations.release_outpoints(map(_outpoint, transaction.deserialize(
+            bytes.fromhex(tx))['vin']))
+
+
+def _collect_unspents_details(inputs, unspents):
+    """Collect details (keys) of the unspents spent by inputs
+
+    unspents are indexed by outpoint.
+    """
     unspents_details = list()
     for input_ in inputs:
-        for unspent in unspents:
-            if (input_['txid'] == unspent['txid'] and
-                input_['vout'] == unspent['vout']):
-                unspent['amount'] = btc2sat(unspent.pop('amount'))
-                unspents_details.append({k: unspent[k] for k in keys})
+        unspent = unspents.get(_outpoint(input_))
+        if unspent is not None:
+            unspent_details = {k: unspent[k] for k in UNSPENT_DETAILS_KEYS}
+            unspent_details['amount'] = btc2sat(unspent['amount'])
+            unspents_details.append(unspent_details)
+    return unspents_details
 
-    if len(inputs) != len(unspents_details):
-        raise MissingValueError('Unable to collect unspent details')
 
-    # construct maps for amount and asset to feed (again) createrawtransaction
+def _map_outputs(outputs, map_confidential):
+    """Construct maps for amount and asset to build the transaction
+
+    Outputs are keyed with the address they are mapped to in
+    map_confidential, the fee output (if any) with 'fee'.
+    """
     map_amount = dict()
     map_asset = dict()
 
-    # map unconfidential addresses to confidential addresses
-    map_confidential = dict()
-
     for output in outputs:
-        u_address = None
-        if 'addresses' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['addresses'][0]
-        elif 'address' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['address']
+        u_address = get_output_address(output)
 
         if u_address is not None:
-            if u_address == DUMMY_ADDRESS[network]:
-                key = u_address
-            else:
-                c_address = connection.getaddressinfo(
-                    u_address)['confidential']
-                map_confidential.update({u_address: c_address})
-                key = c_address
-
+            key = map_confidential[u_address]
             map_amount.update({key: btc2sat(output['value'])})
             map_asset.update({key: output['asset']})
 
         elif output['scriptPubKey']['type'] == 'fee':
             map_amount.update({'fee': btc2sat(output['value'])})
+            map_asset.update({'fee': output['asset']})
+
+    return map_amount, map_asset
+
+
+def _output_addresses(outputs, *excluded):
+    """Distinct (unconfidential) addresses of outputs, but the excluded ones
+    """
+    u_addresses = list()
+    for u_address in map(get_output_address, outputs):
+        if u_address not in (None,) + excluded and \
+                u_address not in u_addresses:
+            u_addresses.append(u_address)
+    return u_addresses
+
+
+def _finish_proposal(inputs, outputs, unspents_details, c_address_p,
+                     u_address_p, amount_r, asset_r, map_confidential,
+                     network):
+    """Complete the proposal maps given the funded proposer transaction
+
+    Return map_amount, map_asset and map_confidential.
+    """
+    if len(inputs) != len(unspents_details):
+        raise MissingValueError('Unable to collect unspent details')
+
+    map_amount, map_asset = _map_outputs(
+        outputs,
+        {**map_confidential, DUMMY_ADDRESS[network]: DUMMY_ADDRESS[network]})
 
     # add asset and amount to receive
     map_amount.update({c_address_p: amount_r})
     map_asset.update({c_address_p: asset_r})
-    map_confidential.update({u_address_p: c_address_p})
+    map_confidential = {**map_confidential, u_address_p: c_address_p}
+    return map_amount, map_asset, map_confidential
 
-    if elements_version < 210000:
-        tx = connection.createrawtransaction(
-            inputs,
-            values2btc(map_amount, None),
-            NLOCKTIME,
-            IS_REPLACEABLE,
-            map_asset
-        )
-    else:
-        tx = connection.createrawtransaction(
-            inputs,
-            values2btc(map_amount, map_asset),
-            NLOCKTIME,
-            IS_REPLACEABLE
-        )
 
+def _proposal(tx, u_address_p, map_confidential, unspents_details):
     logging.debug('Proposer address: {}'.format(u_address_p))
     logging.debug('Address map: {}'.format(map_confidential))
     logging.debug('Unspents_details: {}'.format(unspents_details))
@@ -168,33 +578,245 @@ def propose(amount_p, asset_p,
     }
 
 
-def parse_proposed(tx,
-                   u_address_p,
-                   map_confidential,
-                   unspents_details,
-                   connection):
-    """Parse a proposed swap
+def _funded_proposal(dtxf, c_address_p, amount_r, asset_r, unspents,
+                     addresses_info, network):
+    """Proposal given the decoded transaction funding the dummy address
 
-    Receiver checks correctness of proposal and deduce its details.
+    unspents include the ones spent by dtxf, indexed by outpoint,
+    addresses_info the getaddressinfo results of the output addresses and of
+    the proposer address. Return the proposal and the inputs and maps its
+    transaction is created from, see _check_created.
     """
+    inputs = dtxf['vin']
+    outputs = dtxf['vout']
+    unspents_details = _collect_unspents_details(inputs, unspents)
 
-    logging.info('Parsing swap proposal')
-    logging.debug('Proposer address: {}'.format(u_address_p))
-    logging.debug('Address map: {}'.format(map_confidential))
-    logging.debug('Unspents_details: {}'.format(unspents_details))
+    # map unconfidential addresses to confidential addresses
+    u_address_p = addresses_info[c_address_p]['unconfidential']
+    map_confidential = {u_address: addresses_info[u_address]['confidential']
+                        for u_address in _output_addresses(
+                            outputs, DUMMY_ADDRESS[network])}
 
-    network = get_chain_index(connection.getblockchaininfo().get('chain'))
+    map_amount, map_asset, map_confidential = _finish_proposal(
+        inputs, outputs, unspents_details, c_address_p, u_address_p,
+        amount_r, asset_r, map_confidential, network)
 
-    is_proposer = is_mine(u_address_p, connection)
-    if is_proposer:
-        logging.info('Parsing own proposal')
+    tx = _create_transaction(inputs, map_amount, map_asset, network)
 
-    dtx = connection.decoderawtransaction(tx)
-    logging.debug('Decoded proposer transaction: {}'.format(dtx))
-    outputs = dtx['vout']
+    return (_proposal(tx, u_address_p, map_confidential, unspents_details),
+            (inputs, map_amount, map_asset))
+
+
+def propose(amount_p, asset_p,
+            amount_r, asset_r,
+            connection,
+            fee_rate=None,
+            reservations=None,
+            pset=False,
+            decoder=DECODER_NODE):
+    """Propose a swap
+
+    Proposer (p) sends amount_p of asset_p.
+    Receiver (r) is asked to send amount_r of asset_r.
+    If pset is set, the swap is proposed with a PSET (experimental, see
+    parse_proposed_pset), the node must support it.
+    With the check decoder, the swap transaction built locally is compared
+    with the createrawtransaction one.
+    If reservations (a ReservationStore) is set, the unspents reserved by
+    the outstanding proposals are not selected, and the selected ones are
+    reserved under the proposer address.
+    """
+
+    _check_proposal_values(amount_p, asset_p, amount_r, asset_r, fee_rate)
+
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        network_info = batch.getnetworkinfo()
+        new_address = batch.getnewaddress()
+
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    c_address_p = new_address.result()
+
+    if pset:
+        check_pset_version(connection, network_info.result())
+        return _propose_pset(amount_p, asset_p, amount_r, asset_r,
+                             c_address_p, network, connection, fee_rate,
+                             reservations)
+
+    txu = _create_transaction(
+        [],
+        {DUMMY_ADDRESS_CONFIDENTIAL[network]: amount_p},
+        {DUMMY_ADDRESS_CONFIDENTIAL[network]: asset_p},
+        network)
+
+    with _reserving(reservations, connection) as reserve:
+        logging.debug('Selecting inputs to fund swap transaction (proposer)')
+        txf = connection.fundrawtransaction(
+            txu,
+            _fund_details(fee_rate)
+        )['hex']
+
+        dtxf = connection.decoderawtransaction(txf)
+        # listed before the reserved unspents are locked
+        unspents = _list_unspents(dtxf['vin'], connection)
+        reserve(_unconfidential_address(c_address_p, network),
+                map(_outpoint, dtxf['vin']))
+
+    # resolve all the (non dummy) output addresses and the proposer address
+    # at once
+    addresses_info = get_address_resolver(connection).resolve(
+        _output_addresses(dtxf['vout'], DUMMY_ADDRESS[network]) +
+        [c_address_p], connection)
+
+    proposal, created = _funded_proposal(dtxf, c_address_p, amount_r,
+                                         asset_r, unspents, addresses_info,
+                                         network)
+    _check_created(proposal['tx'], *created, connection, decoder)
+    return proposal
+
+
+def _fund_legs(legs, network, connection, fee_rate, locked):
+    """Fund the dummy address of each leg, return the decoded transactions
+
+    The funded unspents are locked, and their outpoints appended to locked
+    (a list per leg), so that the following legs select other ones.
+    """
+    dtxs = list()
+    for amount_p, asset_p, _, _ in legs:
+        txu = _create_transaction(
+            [],
+            {DUMMY_ADDRESS_CONFIDENTIAL[network]: amount_p},
+            {DUMMY_ADDRESS_CONFIDENTIAL[network]: asset_p},
+            network)
+        txf = connection.fundrawtransaction(
+            txu, _fund_details(fee_rate, lock_unspents=True))['hex']
+        dtxf = connection.decoderawtransaction(txf)
+        locked.append(list(map(_outpoint, dtxf['vin'])))
+        dtxs.append(dtxf)
+    return dtxs
+
+
+def _propose_legs(legs, c_addresses_p, network, connection, fee_rate,
+                  locked, decoder):
+    """Propose the legs without PSET, see propose_many
+    """
+    # the wallet unspents are listed once, before any of them is locked
+    unspents = _index_unspents(
+        connection.projected(UNSPENT_FIELDS).listunspent(UNSPENT_MINCONF,
+                                                         UNSPENT_MAXCONF))
+
+    logging.debug('Selecting inputs to fund {} swap transactions '
+                  '(proposer)'.format(len(legs)))
+    dtxs = _fund_legs(legs, network, connection, fee_rate, locked)
+
+    u_addresses = list()
+    for dtxf in dtxs:
+        u_addresses += _output_addresses(dtxf['vout'], DUMMY_ADDRESS[network])
+    addresses_info = get_address_resolver(connection).resolve(
+        u_addresses + c_addresses_p, connection)
+
+    proposals = list()
+    for dtxf, c_address_p, (_, _, amount_r, asset_r) in zip(
+            dtxs, c_addresses_p, legs):
+        proposal, created = _funded_proposal(dtxf, c_address_p, amount_r,
+                                             asset_r, unspents,
+                                             addresses_info, network)
+        _check_created(proposal['tx'], *created, connection, decoder)
+        proposals.append(proposal)
+    return proposals
+
+
+def _propose_legs_pset(legs, c_addresses_p, network, connection, fee_rate,
+                       locked):
+    """Propose the legs with PSETs, see propose_many
+    """
+    logging.debug('Selecting inputs to fund {} swap PSETs (proposer)'.format(
+        len(legs)))
+    dpsets = list()
+    for amount_p, asset_p, _, _ in legs:
+        funded = connection.walletcreatefundedpsbt(*_fund_pset_args(
+            amount_p, asset_p, network, fee_rate, lock_unspents=True))
+        dpset = connection.decodepsbt(funded['psbt'])
+        locked.append(list(map(_outpoint, _pset_inputs(dpset))))
+        dpsets.append(dpset)
+
+    args = [_proposer_pset_args(dpset, c_address_p, amount_r, asset_r,
+                                network)
+            for dpset, c_address_p, (_, _, amount_r, asset_r)
+            in zip(dpsets, c_addresses_p, legs)]
+
+    logging.debug('Creating and blinding swap PSETs (proposer)')
+    with connection.batch() as batch:
+        psets = [batch.createpsbt(_pset_inputs(dpset), outputs, NLOCKTIME,
+                                  IS_REPLACEABLE)
+                 for dpset, (outputs, _) in zip(dpsets, args)]
+    with connection.batch() as batch:
+        processed = [batch.walletprocesspsbt(pset.result(), False)
+                     for pset in psets]
+
+    return [_pset_proposal(pset.result()['psbt'],
+                           _unconfidential_address(c_address_p, network),
+                           fee_p)
+            for pset, c_address_p, (_, fee_p)
+            in zip(processed, c_addresses_p, args)]
+
+
+def propose_many(legs, connection, fee_rate=None, reservations=None,
+                 pset=False, decoder=DECODER_NODE):
+    """Propose several swaps (legs) at once, e.g. a price ladder
+
+    legs are (amount_p, asset_p, amount_r, asset_r) tuples, see propose
+    (and for pset and decoder).
+    The node metadata and the wallet unspents are fetched once for all the
+    legs, and no two legs spend the same unspent: the unspents funding a leg
+    stay locked until all the legs are funded. Each leg is reserved as a
+    single proposal, see propose. Return a proposal per leg.
+    """
 
-    # Deduce details of the swap (amount_p,r, asset_p,r) from the tx
-    # Construct maps to feed createrawtransaction
+    legs = [tuple(leg) for leg in legs]
+    for leg in legs:
+        _check_proposal_values(*leg, fee_rate)
+
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        network_info = batch.getnetworkinfo()
+        new_addresses = [batch.getnewaddress() for _ in legs]
+
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    c_addresses_p = [new_address.result() for new_address in new_addresses]
+
+    if pset:
+        check_pset_version(connection, network_info.result())
+
+    locked = list()
+    with _reserving(reservations, connection) as reserve:
+        try:
+            if pset:
+                proposals = _propose_legs_pset(legs, c_addresses_p, network,
+                                               connection, fee_rate, locked)
+            else:
+                proposals = _propose_legs(legs, c_addresses_p, network,
+                                          connection, fee_rate, locked,
+                                          decoder)
+        finally:
+            # the unspents only need to be distinct among the legs, the
+            # reserved ones are locked again if the reservations require it
+            outpoints = [o for outpoints in locked for o in outpoints]
+            if outpoints:
+                connection.lockunspent(True, _lockunspent_args(outpoints))
+
+        for c_address_p, outpoints in zip(c_addresses_p, locked):
+            reserve(_unconfidential_address(c_address_p, network), outpoints)
+    return proposals
+
+
+def _parse_proposed_outputs(outputs, u_address_p, map_confidential, network):
+    """Deduce details of the swap (amount_p,r, asset_p,r) from the tx outputs
+
+    Return the details, the maps to build the transaction and the
+    confidential addresses (with their unconfidential counterpart) to be
+    checked.
+    """
 
     amount_p = amount_r = fee_p = 0
     asset_p = asset_r = ''
@@ -202,12 +824,10 @@ def parse_proposed(tx,
     map_amount_p = dict()
     map_asset_p = dict()
 
+    to_check = dict()
+
     for output in outputs:
-        u_address = None
-        if 'addresses' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['addresses'][0]
-        elif 'address' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['address']
+        u_address = get_output_address(output)
 
         if u_address is not None:
             if u_address == DUMMY_ADDRESS[network]:
@@ -235,16 +855,7 @@ def parse_proposed(tx,
             if not c_address:
                 raise MissingValueError('Missing address in map_confidential')
 
-            if not connection.validateaddress(c_address)['isvalid']:
-                raise InvalidAddressError('Invalid address: {}'.format(
-                    c_address))
-
-            if u_address != connection.getaddressinfo(
-                c_address)['unconfidential']:
-                msg = 'Unmatching confidential-unconfidential address: {}, ' \
-                      '{}'.format(c_address, u_address)
-                raise UnexpectedValueError(msg)
-
+            to_check.update({c_address: u_address})
             map_amount_p.update({c_address: btc2sat(output['value'])})
             map_asset_p.update({c_address: output['asset']})
 
@@ -259,195 +870,146 @@ def parse_proposed(tx,
     elif fee_p == 0:
         raise MissingValueError('Missing fee')
 
-    c_address_p = map_confidential[u_address_p]
-
     logging.debug('Proposer map amount: {}'.format(map_amount_p))
     logging.debug('Proposer map asset: {}'.format(map_asset_p))
 
-    return (tx,
-            c_address_p, amount_p, asset_p, fee_p,
-            amount_r, asset_r, map_amount_p, map_asset_p,
-            unspents_details)
+    return (amount_p, asset_p, fee_p, amount_r, asset_r,
+            map_amount_p, map_asset_p, to_check)
 
 
-def accept(tx_p,
-           c_address_p, amount_p, asset_p, fee_p,
-           amount_r, asset_r,
-           map_amount_p, map_asset_p, unspents_details_p,
-           connection,
-           fee_rate=None):
-    """Accept a (parsed) swap proposal
-
-    Fund, blind and sign the transaction. Should be used with outputs from
-    parse_proposed.
+def _check_unconfidential_addresses(to_check, network):
+    """Raise if confidential and unconfidential addresses do not match
     """
+    for c_address, u_address in to_check.items():
+        try:
+            unconfidential, _ = parse_address(c_address, network)
+        except ValueError:
+            raise InvalidAddressError('Invalid address: {}'.format(
+                c_address))
+        if u_address != unconfidential:
+            msg = 'Unmatching confidential-unconfidential address: {}, ' \
+                  '{}'.format(c_address, u_address)
+            raise UnexpectedValueError(msg)
 
-    logging.info('Accepting swap proposal [2/3]')
 
-    c_address_r = connection.getnewaddress()
-    u_address_r = connection.validateaddress(c_address_r)['unconfidential']
-    u_address_p = connection.validateaddress(c_address_p)['unconfidential']
-    elements_version = connection.getnetworkinfo()['version']
-    logging.debug('Receiver address: {}'.format(u_address_r))
+def parse_proposed(tx,
+                   u_address_p,
+                   map_confidential,
+                   unspents_details,
+                   connection,
+                   decoder=DECODER_NODE):
+    """Parse a proposed swap
+
+    Receiver checks correctness of proposal and deduce its details.
+    decoder selects how transactions are decoded, see decode_transaction.
+    """
+
+    logging.info('Parsing swap proposal')
     logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Address map: {}'.format(map_confidential))
+    logging.debug('Unspents_details: {}'.format(unspents_details))
 
-    if elements_version < 210000:
-        txu = connection.createrawtransaction(
-            [],
-            {c_address_p: sat2btc(amount_r)},
-            NLOCKTIME,
-            IS_REPLACEABLE,
-            {c_address_p: asset_r}
-        )
-    else:
-        txu = connection.createrawtransaction(
-            [],
-            [{c_address_p: sat2btc(amount_r), 'asset': asset_r}],
-            NLOCKTIME,
-            IS_REPLACEABLE
-        )
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        decoded = _queue_decode(batch, tx, decoder)
 
-    details = {
-        # 'lockUnspents': False,
-    }
-    if fee_rate is not None:
-        details.update({'feeRate': fee_rate})
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    dtx = decoded()
+    logging.debug('Decoded proposer transaction: {}'.format(dtx))
 
-    logging.debug('Selecting inputs to fund swap transaction (receiver)')
-    tx_r = connection.fundrawtransaction(
-        txu,
-        details,
-    )['hex']
-    inputs_r = connection.decoderawtransaction(tx_r)['vin']
-    outputs_r = connection.decoderawtransaction(tx_r)['vout']
-
-    # collect details (keys) for each input
-    keys = ['txid', 'vout', 'amount', 'asset', 'amountblinder', 'assetblinder']
-    unspents_r = connection.listunspent()
-    unspents_details_r = list()
-    for input_ in inputs_r:
-        for unspent in unspents_r:
-            if (input_['txid'] == unspent['txid'] and
-                input_['vout'] == unspent['vout']):
-                unspent['amount'] = btc2sat(unspent.pop('amount'))
-                unspents_details_r.append({k: unspent[k] for k in keys})
-
-    unspents_details = unspents_details_p + unspents_details_r
-
-    # deduce fees and maps for outputs and amounts from tx_r
-    map_amount_r = dict()
-    map_asset_r = dict()
-
-    for output in outputs_r:
-        u_address = None
-        if 'addresses' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['addresses'][0]
-        elif 'address' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['address']
+    (amount_p, asset_p, fee_p, amount_r, asset_r, map_amount_p, map_asset_p,
+     to_check) = _parse_proposed_outputs(dtx['vout'], u_address_p,
+                                         map_confidential, network)
 
-        if u_address is not None:
-            if u_address == u_address_p:
-                c_address = c_address_p
-            else:
-                c_address = connection.getaddressinfo(
-                    u_address)['confidential']
+    _check_unconfidential_addresses(to_check, network)
 
-            map_amount_r.update({c_address: btc2sat(output['value'])})
-            map_asset_r.update({c_address: output['asset']})
+    addresses_info = get_address_resolver(connection).resolve(
+        [u_address_p], connection)
+    if addresses_info[u_address_p]['ismine']:
+        logging.info('Parsing own proposal')
 
-        elif output['scriptPubKey']['type'] == 'fee':
-            # map_amount_r is updated later with the cumulative fee
-            fee_r = btc2sat(output['value'])
+    c_address_p = map_confidential[u_address_p]
 
-    # proposer maps do not include the dummy address
-    map_amount_p.update({c_address_r: amount_p})
-    map_asset_p.update({c_address_r: asset_p})
+    return ParsedProposal(tx,
+                          c_address_p, amount_p, asset_p, fee_p,
+                          amount_r, asset_r, map_amount_p, map_asset_p,
+                          unspents_details)
 
-    # join inputs and outputs from p and r
-    inputs_p = connection.decoderawtransaction(tx_p)['vin']
 
-    inputs = inputs_p + inputs_r
-    random.seed(os.urandom(32))
-    random.shuffle(inputs)
+def _swap_maps(map_amount_p, map_asset_p, map_amount_r, map_asset_r,
+               c_address_r, amount_p, asset_p, fee):
+    """Join proposer and receiver maps
 
+    Proposer maps do not include the dummy address, it is replaced by the
+    receiver address.
+    """
     map_amount = dict()
     map_asset = dict()
 
     map_amount.update(map_amount_p)
+    map_amount.update({c_address_r: amount_p})
     map_amount.update(map_amount_r)
-    map_amount.update({'fee': fee_p + fee_r})
+    map_amount.update({'fee': fee})
 
     map_asset.update(map_asset_p)
+    map_asset.update({c_address_r: asset_p})
     map_asset.update(map_asset_r)
 
-    logging.debug('Creating swap transaction')
-    # createrawtransaction with the inputs from the 2 transactions
-    if elements_version < 210000:
-        tx = connection.createrawtransaction(
-            inputs,
-            sort_dict(values2btc(map_amount, None)),
-            NLOCKTIME,
-            IS_REPLACEABLE,
-            sort_dict(map_asset)
-        )
-    else:
-        tx = connection.createrawtransaction(
-            inputs,
-            values2btc(sort_dict(map_amount), map_asset),
-            NLOCKTIME,
-            IS_REPLACEABLE
-        )
+    return sort_dict(map_amount), sort_dict(map_asset)
+
+
+def _shuffle_inputs(inputs_p, inputs_r):
+    """Inputs of both parties in random order
+
+    A CSPRNG is used for each call, the state of the global random module is
+    neither read nor reseeded, so that concurrent swaps do not interfere.
+    """
+    inputs = list(inputs_p) + list(inputs_r)
+    random.SystemRandom().shuffle(inputs)
+    return inputs
 
-    # inputs may be reordered by createrawtransaction
-    inputs = connection.decoderawtransaction(tx)['vin']
 
-    # pack blinders, assetblinders, assets and amounts
+def _pack_blinding_data(inputs, unspents_details):
+    """Pack blinders, assetblinders, assets and amounts in the inputs order
+    """
     amountblinders = list()
     assetblinders = list()
     assets = list()
     amounts = list()
 
+    unspents_details = _index_unspents(unspents_details)
     for input_ in inputs:
-        for unspent_details in unspents_details:
-            if (input_['txid'] == unspent_details['txid'] and
-                input_['vout'] == unspent_details['vout']):
-                amountblinders.append(unspent_details['amountblinder'])
-                assetblinders.append(unspent_details['assetblinder'])
-                assets.append(unspent_details['asset'])
-                amounts.append(unspent_details['amount'])
+        unspent_details = unspents_details.get(_outpoint(input_))
+        if unspent_details is not None:
+            amountblinders.append(unspent_details['amountblinder'])
+            assetblinders.append(unspent_details['assetblinder'])
+            assets.append(unspent_details['asset'])
+            amounts.append(unspent_details['amount'])
 
     if len(inputs) != len(amounts):
         raise MissingValueError('Missing data in unspent details')
 
-    logging.debug('Blinding swap transaction')
-    # blind transaction
-    btx = connection.rawblindrawtransaction(
-        tx,
-        amountblinders,
-        [sat2btc(v) for v in amounts],
-        assets,
-        assetblinders
-    )
+    return amountblinders, [sat2btc(v) for v in amounts], assets, assetblinders
 
-    logging.debug('Signing swap transaction (receiver inputs)')
-    # sign transaction
-    stx = connection.signrawtransactionwithwallet(btx)['hex']
 
-    logging.debug('Dumping blinding keys (so that the swap partner can fully '
-                  'unblind the transaction)')
-    # dump bliding private keys
-    blinding_keys = dict()
-    for c_address in map_amount:
-        if (c_address != 'fee' and
-            connection.getaddressinfo(c_address)['ismine']):
-            blinding_key = connection.dumpblindingkey(c_address)
-            blinding_keys.update({c_address: blinding_key})
-
-    min_relay_fee = connection.getnetworkinfo()['relayfee']
-    dtx = connection.decoderawtransaction(stx)
-    # TODO: estimate impact of missing signatures
-    estimated_vsize_vb = dtx['vsize']
-    estimated_fee_rate = (fee_p + fee_r) * 10**-5 / estimated_vsize_vb
+def _estimate_vsize(tx, inputs, unspents):
+    """Estimate the vsize of tx once blinded and signed by both parties
+
+    The type of the spent outputs is known for the wallet unspents only,
+    the others are assumed to be of the wallet default type.
+    """
+    spent_types = []
+    for input_ in inputs:
+        unspent = unspents.get(_outpoint(input_))
+        spent_types.append(
+            None if unspent is None or 'scriptPubKey' not in unspent
+            else script_type(bytes.fromhex(unspent['scriptPubKey'])))
+    return transaction.estimate_vsize(
+        transaction.deserialize(bytes.fromhex(tx)), spent_types)
+
+
+def _check_fee_rate(fee, vsize, min_relay_fee):
+    estimated_fee_rate = fee * 10**-5 / vsize
 
     if estimated_fee_rate < min_relay_fee:
         msg = 'Fee rate too low: please specify an higher fee rate or reject' \
@@ -455,6 +1017,8 @@ def accept(tx_p,
                                                        min_relay_fee)
         raise FeeRateError(msg)
 
+
+def _acceptance(stx, blinding_keys, u_address_p, u_address_r):
     logging.debug('Blinding keys: {}'.format(blinding_keys))
     return {
         'tx': stx,
@@ -464,29 +1028,121 @@ def accept(tx_p,
     }
 
 
-def parse_accepted(signed_tx,
-                   blinding_keys,
-                   u_address_p,
-                   u_address_r,
-                   connection):
-    """Parse an accepted swap proposal
+def accept(tx_p,
+           c_address_p, amount_p, asset_p, fee_p,
+           amount_r, asset_r,
+           map_amount_p, map_asset_p, unspents_details_p,
+           connection,
+           fee_rate=None,
+           decoder=DECODER_NODE,
+           reservations=None):
+    """Accept a (parsed) swap proposal
 
-    Proposer checks correctness of the accepted proposal and deduce its
-    details.
+    Fund, blind and sign the transaction. Should be used with outputs from
+    parse_proposed. If reservations is set, the receiver unspents are
+    reserved under the receiver address, see propose.
     """
 
-    logging.info('Parsing accepted swap proposal')
-    logging.debug('Blinding keys: {}'.format(blinding_keys))
-    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.info('Accepting swap proposal [2/3]')
+
+    resolver = get_address_resolver(connection)
+
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        new_address = batch.getnewaddress()
+        network_info = batch.getnetworkinfo()
+        decoded_p = _queue_decode(batch, tx_p, decoder)
+
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    c_address_r = new_address.result()
+    network_info = network_info.result()
+
+    txu = _create_transaction(
+        [], {c_address_p: amount_r}, {c_address_p: asset_r}, network)
+
+    with _reserving(reservations, connection) as reserve:
+        logging.debug('Selecting inputs to fund swap transaction (receiver)')
+        tx_r = connection.fundrawtransaction(
+            txu,
+            _fund_details(fee_rate),
+        )['hex']
+
+        dtx_r = decode_transaction(tx_r, connection, decoder)
+
+        inputs_r = dtx_r['vin']
+        outputs_r = dtx_r['vout']
+        unspents_r = _list_unspents(inputs_r, connection)
+        reserve(_unconfidential_address(c_address_r, network),
+                map(_outpoint, inputs_r))
+    unspents_details = list(unspents_details_p)
+    unspents_details += _collect_unspents_details(inputs_r, unspents_r)
+
+    # deduce fees and maps for outputs and amounts from tx_r, resolve all the
+    # receiver output addresses and the parties addresses at once
+    u_addresses = _output_addresses(outputs_r)
+    addresses_info = resolver.resolve(
+        u_addresses + [c_address_p, c_address_r], connection)
+
+    u_address_p = addresses_info[c_address_p]['unconfidential']
+    u_address_r = addresses_info[c_address_r]['unconfidential']
     logging.debug('Receiver address: {}'.format(u_address_r))
+    logging.debug('Proposer address: {}'.format(u_address_p))
+
+    map_confidential_r = {u_address: addresses_info[u_address]['confidential']
+                          for u_address in u_addresses
+                          if u_address != u_address_p}
+    map_confidential_r.update({u_address_p: c_address_p})
+    map_amount_r, map_asset_r = _map_outputs(outputs_r, map_confidential_r)
+    # map_amount is updated later with the cumulative fee
+    fee_r = map_amount_r.pop('fee')
+
+    # join inputs and outputs from p and r
+    inputs = _shuffle_inputs(decoded_p()['vin'], inputs_r)
+    map_amount, map_asset = _swap_maps(
+        map_amount_p, map_asset_p, map_amount_r, map_asset_r,
+        c_address_r, amount_p, asset_p, fee_p + fee_r)
+
+    logging.debug('Creating swap transaction')
+    # with the inputs from the 2 transactions, in order
+    tx = _create_transaction(inputs, map_amount, map_asset, network)
+    _check_created(tx, inputs, map_amount, map_asset, connection, decoder)
+
+    # reject a low fee rate before blinding and signing
+    _check_fee_rate(fee_p + fee_r, _estimate_vsize(tx, inputs, unspents_r),
+                    network_info['relayfee'])
+
+    logging.debug('Blinding swap transaction')
+    # blind transaction
+    btx = connection.rawblindrawtransaction(
+        tx, *_pack_blinding_data(inputs, unspents_details))
+
+    logging.debug('Signing swap transaction (receiver inputs)')
+    # sign transaction
+    stx = connection.signrawtransactionwithwallet(btx)['hex']
+
+    logging.debug('Dumping blinding keys (so that the swap partner can fully '
+                  'unblind the transaction)')
+    # dump bliding private keys, output addresses are already resolved
+    addresses_info = resolver.resolve(
+        [c_address for c_address in map_amount if c_address != 'fee'],
+        connection)
 
+    with connection.batch() as batch:
+        dumped_keys = {c_address: batch.dumpblindingkey(c_address)
+                       for c_address, info in addresses_info.items()
+                       if info['ismine']}
+
+    blinding_keys = {c_address: blinding_key.result()
+                     for c_address, blinding_key in dumped_keys.items()}
+
+    return _acceptance(stx, blinding_keys, u_address_p, u_address_r)
+
+
+def _check_parties(is_proposer, is_receiver, u_address_p, u_address_r):
     # There should be a way for the proposer to recognize his proposal, e.g.
     # proposer sends his proposal signed, receiver includes it in what he sends
     # back, proposer verify that signed tx actually includes what he proposed
 
-    is_proposer = is_mine(u_address_p, connection)
-    is_receiver = is_mine(u_address_r, connection)
-
     if is_receiver:
         # FIXME: once this will be implemented, the case where the node owns
         # both addresses must be handled
@@ -498,50 +1154,49 @@ def parse_accepted(signed_tx,
                                    'by the wallet'.format(u_address_p,
                                                           u_address_r))
 
-    amount_p = amount_r = 0
-    asset_p = asset_r = ''
 
-    logging.debug('Importing blinding keys')
-    # import blinding keys to fully unblind the transaction
-    for c_address, blinding_key in blinding_keys.items():
-        connection.importblindingkey(c_address, blinding_key)
+def _check_accepted(decoded_tx, unspents, addresses_mine,
+                    u_address_p, u_address_r, aggregated=False):
+    """Check the (unblinded) accepted transaction from the proposer side
 
-    logging.debug('Unblinding transaction to analyze it')
-    unblinded_tx = connection.unblindrawtransaction(signed_tx)['hex']
-    decoded_tx = connection.decoderawtransaction(unblinded_tx)
-    logging.debug('Decoded unblinded transaction: {}'.format(decoded_tx))
+    unspents are the proposer wallet unspents indexed by outpoint,
+    addresses_mine maps each output address to whether it is owned by the
+    proposer wallet. If aggregated, the outputs of the other swaps of the
+    aggregated transaction (see aggregate) may be left blinded.
+    Return the swap details.
+    """
+
+    amount_p = amount_r = 0
+    asset_p = asset_r = ''
 
     if decoded_tx['locktime'] != NLOCKTIME:
         msg = 'Unexpected nLocktime value: expected {}, found {}'.format(
-            decoded_tx['nlocktime'], NLOCKTIME)
+            NLOCKTIME, decoded_tx['locktime'])
         raise UnexpectedValueError(msg)
 
     # TODO: the same thing should happen for IS_REPLACEABLE
 
     # deduce tx inputs owned by receiver
-    receiver_unspents = connection.listunspent()
     amounts_in = dict()
     for input_ in decoded_tx['vin']:
-        for unspent in receiver_unspents:
-            if (input_['txid'] == unspent['txid'] and
-                input_['vout'] == unspent['vout']):
-                asset = unspent['asset']
-                amount = btc2sat(unspent['amount'])
+        unspent = unspents.get(_outpoint(input_))
+        if unspent is not None:
+            asset = unspent['asset']
+            amount = btc2sat(unspent['amount'])
 
-                amounts_in.update({asset: amounts_in.get(asset, 0) + amount})
-                break
+            amounts_in.update({asset: amounts_in.get(asset, 0) + amount})
 
     # deduce tx outputs owned by receiver
     amounts_out = dict()
     for output in decoded_tx['vout']:
-        if 'value' not in output:
-            raise UnblindError('Transaction is not fully unblinded')
+        u_address = get_output_address(output)
 
-        u_address = None
-        if 'addresses' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['addresses'][0]
-        elif 'address' in output['scriptPubKey']:
-            u_address = output['scriptPubKey']['address']
+        if 'value' not in output:
+            if not aggregated or u_address is None or \
+                    u_address in (u_address_p, u_address_r) or \
+                    addresses_mine[u_address]:
+                raise UnblindError('Transaction is not fully unblinded')
+            continue
 
         if u_address is not None:
             amount = btc2sat(output['value'])
@@ -560,7 +1215,7 @@ def parse_accepted(signed_tx,
                 amount_r = amount
                 asset_r = asset
 
-            if connection.getaddressinfo(u_address)['ismine']:
+            if addresses_mine[u_address]:
                 amounts_out.update({asset: amounts_out.get(asset, 0) + amount})
 
         elif output['scriptPubKey']['type'] == 'fee':
@@ -615,15 +1270,68 @@ def parse_accepted(signed_tx,
         amount_p, asset_p, fee_p))
     logging.debug('Receiver: amount {} (sat), asset {}, fee {} (sat)'.format(
         amount_r, asset_r, fee_r))
-    return (signed_tx,
-            amount_p, asset_p, fee_p,
-            amount_r, asset_r, fee_r)
+    return amount_p, asset_p, fee_p, amount_r, asset_r, fee_r
 
 
-def finalize(pstx, connection, broadcast=False):
+def parse_accepted(signed_tx,
+                   blinding_keys,
+                   u_address_p,
+                   u_address_r,
+                   connection,
+                   decoder=DECODER_NODE,
+                   reservations=None,
+                   aggregated=False):
+    """Parse an accepted swap proposal
+
+    Proposer checks correctness of the accepted proposal and deduce its
+    details. reservations are needed if the proposal unspents are reserved
+    and locked in the node. aggregated must be set for a swap accepted in an
+    aggregated transaction (see aggregate).
+    """
+
+    logging.info('Parsing accepted swap proposal')
+    logging.debug('Blinding keys: {}'.format(blinding_keys))
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Receiver address: {}'.format(u_address_r))
+
+    resolver = get_address_resolver(connection)
+    parties_info = resolver.resolve([u_address_p, u_address_r], connection)
+    _check_parties(parties_info[u_address_p]['ismine'],
+                   parties_info[u_address_r]['ismine'],
+                   u_address_p, u_address_r)
+
+    logging.debug('Importing blinding keys')
+    # import blinding keys to fully unblind the transaction
+    for c_address, blinding_key in blinding_keys.items():
+        connection.importblindingkey(c_address, blinding_key)
+
+    logging.debug('Unblinding transaction to analyze it')
+    unblinded_tx = connection.unblindrawtransaction(signed_tx)['hex']
+    decoded_tx = decode_transaction(unblinded_tx, connection, decoder)
+    logging.debug('Decoded unblinded transaction: {}'.format(decoded_tx))
+
+    unspents = _list_reserved_unspents(decoded_tx['vin'], connection,
+                                       reservations)
+    addresses_info = resolver.resolve(
+        _output_addresses(decoded_tx['vout']), connection)
+
+    addresses_mine = {u_address: info['ismine']
+                      for u_address, info in addresses_info.items()}
+
+    return ParsedAcceptance(signed_tx, *_check_accepted(
+        decoded_tx, unspents, addresses_mine, u_address_p, u_address_r,
+        aggregated))
+
+
+def finalize(pstx, connection, broadcast=False, reservations=None,
+             partial=False):
     """Sign and send an accepted proposal
 
-    Should be used only after parse_accepted.
+    Should be used only after parse_accepted (with aggregated if partial).
+    Once broadcast, the reservation of the proposal, if any, is released.
+    If partial, the transaction is an aggregated one (see aggregate): it is
+    only signed for the proposer inputs and returned, to be combined with
+    the parts signed by the other proposers (see combine).
     """
 
     logging.info('Finalizing swap [3/3]')
@@ -631,13 +1339,21 @@ def finalize(pstx, connection, broadcast=False):
     # sign the remaining inputs
     ret = connection.signrawtransactionwithwallet(pstx)
 
+    if partial:
+        return ret['hex']
+
     if not ret['complete']:
         raise UnsignedTransactionError('Transaction has some unsigned inputs')
 
-    tx = ret['hex']
+    return _send_transaction(ret['hex'], connection, broadcast, reservations)
+
+
+def _send_transaction(tx, connection, broadcast, reservations=None):
     if broadcast:
         logging.info('Broadcasting transaction')
-        return connection.sendrawtransaction(tx)
+        txid = connection.sendrawtransaction(tx)
+        _release_spent(tx, reservations)
+        return txid
     else:
         logging.info('Testing transaction against mempool')
         if not connection.testmempoolaccept([tx])[0]['allowed']:
@@ -645,3 +1361,1255 @@ def finalize(pstx, connection, broadcast=False):
                                           'allowed by mempool')
 
         return tx
+
+
+# PSET versions: the parties exchange a PSET (partially signed Elements
+# transaction), it reveals the values of the inputs and outputs, each party
+# blinds its own outputs. Neither the unspents blinders nor the blinding keys
+# are sent to the other party.
+
+def _pset_fund_details(fee_rate, lock_unspents=False):
+    return dict(_fund_details(fee_rate, lock_unspents),
+                replaceable=IS_REPLACEABLE)
+
+
+def _pset_inputs(dpset):
+    """Inputs of a decoded PSET, as createpsbt takes them
+    """
+    return [{'txid': i['previous_txid'], 'vout': i['previous_vout'],
+             'sequence': i['sequence']} for i in dpset['inputs']]
+
+
+def _pset_spent_types(dpset):
+    """Types of the outputs spent by a decoded PSET, None if unknown
+    """
+    return [script_type(bytes.fromhex(
+                i['witness_utxo']['scriptPubKey']['hex']))
+            if 'witness_utxo' in i else None for i in dpset['inputs']]
+
+
+def _pset_output_address(output, network):
+    """Address of a decoded PSET output, confidential if it has a blinding
+    key, None for the fee output
+    """
+    u_address = output['script'].get('address')
+    pubkey = output.get('blinding_pubkey')
+    if u_address is None or not pubkey:
+        return u_address
+    try:
+        return confidential_address(u_address, bytes.fromhex(pubkey),
+                                    network)
+    except ValueError:
+        raise InvalidAddressError('Invalid address: {}, {}'.format(
+            u_address, pubkey))
+
+
+def _pset_outputs(dpset, network):
+    """(address, amount, asset) of the outputs of a decoded PSET, the address
+    of the fee output is 'fee'
+    """
+    outputs = list()
+    for output in dpset['outputs']:
+        if 'amount' not in output or 'asset' not in output:
+            raise UnblindError('PSET output values are not revealed')
+        key = 'fee' if output['script']['type'] == 'fee' else \
+            _pset_output_address(output, network)
+        outputs.append((key, btc2sat(output['amount']), output['asset']))
+    return outputs
+
+
+def _funded_pset_outputs(dpset, excluded, network):
+    """Split the outputs of a decoded funded PSET in the fee output and the
+    others, but the ones to the excluded (unconfidential) addresses
+    """
+    outputs = list()
+    fee_outputs = list()
+    for output, decoded in zip(_pset_outputs(dpset, network),
+                               dpset['outputs']):
+        if output[0] == 'fee':
+            fee_outputs.append(output)
+        elif decoded['script'].get('address') not in excluded:
+            outputs.append(output)
+    if len(fee_outputs) != 1:
+        raise MissingValueError('Missing fee')
+    return outputs, fee_outputs[0]
+
+
+def _createpsbt_outputs(outputs):
+    """createpsbt outputs of (address, amount, asset)
+
+    No blinder index is set: it is the position of an input, which joinpsbts
+    shuffles. The confidential outputs are blinded by the wallet processing
+    the PSET (walletprocesspsbt), which owns their inputs.
+    """
+    return [{address: sat2btc(amount), 'asset': asset}
+            for address, amount, asset in outputs]
+
+
+def _estimate_pset_vsize(dpsets, outputs, network):
+    """Estimate the vsize of the transaction with the inputs of the decoded
+    PSETs and outputs, once blinded and signed
+    """
+    inputs = list()
+    spent_types = list()
+    for dpset in dpsets:
+        inputs.extend(_pset_inputs(dpset))
+        spent_types.extend(_pset_spent_types(dpset))
+    tx = _create_transaction(
+        inputs, {address: amount for address, amount, _ in outputs},
+        {address: asset for address, _, asset in outputs}, network)
+    return transaction.estimate_vsize(
+        transaction.deserialize(bytes.fromhex(tx)), spent_types)
+
+
+def _unconfidential_address(address, network):
+    try:
+        return parse_address(address, network)[0]
+    except ValueError:
+        raise InvalidAddressError('Invalid address: {}'.format(address))
+
+
+def _pset_proposal(pset, u_address_p, fee_p):
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Proposer fee: {} (sat)'.format(fee_p))
+    return {
+        'pset': pset,
+        'u_address_p': u_address_p,
+        'fee_p': fee_p,
+    }
+
+
+def _proposer_pset_args(dpset, c_address_p, amount_r, asset_r, network):
+    """createpsbt outputs of the proposer PSET and the proposer fee, given
+    the PSET funding the dummy address
+
+    The dummy output is replaced by the proposer output, the fee output is
+    dropped: the receiver adds the output receiving amount_p and the fee.
+    """
+    outputs, (_, fee_p, _) = _funded_pset_outputs(
+        dpset, [DUMMY_ADDRESS[network]], network)
+    outputs.append((c_address_p, amount_r, asset_r))
+    return _createpsbt_outputs(outputs), fee_p
+
+
+def _fund_pset_args(amount_p, asset_p, network, fee_rate,
+                    lock_unspents=False):
+    """walletcreatefundedpsbt arguments funding the dummy address
+    """
+    return ([],
+            _createpsbt_outputs(
+                [(DUMMY_ADDRESS_CONFIDENTIAL[network], amount_p, asset_p)]),
+            NLOCKTIME,
+            _pset_fund_details(fee_rate, lock_unspents))
+
+
+def _propose_pset(amount_p, asset_p, amount_r, asset_r, c_address_p, network,
+                  connection, fee_rate, reservations=None):
+    """Propose a swap with a PSET, see propose
+    """
+    with _reserving(reservations, connection) as reserve:
+        logging.debug('Selecting inputs to fund swap PSET (proposer)')
+        funded = connection.walletcreatefundedpsbt(
+            *_fund_pset_args(amount_p, asset_p, network, fee_rate))
+
+        dpset = connection.decodepsbt(funded['psbt'])
+        reserve(_unconfidential_address(c_address_p, network),
+                map(_outpoint, _pset_inputs(dpset)))
+    outputs, fee_p = _proposer_pset_args(dpset, c_address_p, amount_r,
+                                         asset_r, network)
+
+    logging.debug('Creating swap PSET (proposer)')
+    pset = connection.createpsbt(_pset_inputs(dpset), outputs, NLOCKTIME,
+                                 IS_REPLACEABLE)
+
+    logging.debug('Blinding proposer outputs')
+    # revealing the values of the inputs, without signing
+    pset = connection.walletprocesspsbt(pset, False)['psbt']
+
+    return _pset_proposal(pset, _unconfidential_address(c_address_p, network),
+                          fee_p)
+
+
+def _parse_proposed_pset(dpset, u_address_p, fee_p, fee_asset, network):
+    """Deduce details of the swap from the values revealed in the PSET
+
+    The proposer sends what its inputs have in excess, but the fee.
+    Return amount_p, asset_p, amount_r, asset_r and the proposer address.
+    """
+    if not isinstance(fee_p, int) or fee_p <= 0:
+        raise MissingValueError('Missing fee')
+
+    amount_r = 0
+    asset_r = ''
+    c_address_p = None
+    balance = {fee_asset: -fee_p}
+
+    for input_ in dpset['inputs']:
+        if 'explicit_value' not in input_ or 'explicit_asset' not in input_:
+            raise UnblindError('Proposer input values are not revealed')
+        asset = input_['explicit_asset']
+        balance[asset] = balance.get(asset, 0) + btc2sat(
+            input_['explicit_value'])
+
+    for (address, amount, asset), output in zip(_pset_outputs(dpset, network),
+                                                dpset['outputs']):
+        if address == 'fee':
+            raise UnexpectedValueError('Unexpected fee output in proposal')
+        if output['script'].get('address') == u_address_p:
+            if asset_r:
+                raise UnexpectedValueError('Found more than one proposer '
+                                           'address')
+            amount_r = amount
+            asset_r = asset
+            c_address_p = address
+        else:
+            balance[asset] = balance.get(asset, 0) - amount
+
+    if amount_r == 0 or asset_r == '':
+        raise MissingValueError('Missing proposer address in the transaction')
+
+    sent = {asset: amount for asset, amount in balance.items() if amount}
+    if len(sent) != 1 or min(sent.values()) < 0:
+        raise UnexpectedValueError('Unexpected proposer balance: {}'.format(
+            sent))
+    (asset_p, amount_p), = sent.items()
+
+    logging.debug('Proposer: amount {} (sat), asset {}'.format(amount_p,
+                                                               asset_p))
+    logging.debug('Receiver: amount {} (sat), asset {}'.format(amount_r,
+                                                               asset_r))
+    return amount_p, asset_p, amount_r, asset_r, c_address_p
+
+
+def parse_proposed_pset(pset, u_address_p, fee_p, connection):
+    """Parse a swap proposed with a PSET
+
+    Receiver checks correctness of proposal and deduce its details.
+    """
+
+    logging.info('Parsing swap proposal')
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Proposer fee: {} (sat)'.format(fee_p))
+
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        network_info = batch.getnetworkinfo()
+        sidechain_info = batch.getsidechaininfo()
+        decoded = batch.decodepsbt(pset)
+
+    check_pset_version(connection, network_info.result())
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    dpset = decoded.result()
+    logging.debug('Decoded proposer PSET: {}'.format(dpset))
+
+    amount_p, asset_p, amount_r, asset_r, c_address_p = _parse_proposed_pset(
+        dpset, u_address_p, fee_p, sidechain_info.result()['pegged_asset'],
+        network)
+
+    addresses_info = get_address_resolver(connection).resolve(
+        [u_address_p], connection)
+    if addresses_info[u_address_p]['ismine']:
+        logging.info('Parsing own proposal')
+
+    return ParsedPsetProposal(pset,
+                              c_address_p, amount_p, asset_p, fee_p,
+                              amount_r, asset_r)
+
+
+def _pset_acceptance(pset, u_address_p, u_address_r):
+    logging.debug('Receiver address: {}'.format(u_address_r))
+    return {
+        'pset': pset,
+        'u_address_p': u_address_p,
+        'u_address_r': u_address_r,
+    }
+
+
+def _aggregate_pset_args(dpsets_p, dpset_r, legs, relay_fee, network):
+    """createpsbt outputs of the receiver PSET, given the proposer PSETs and
+    the PSET funding the proposer outputs
+
+    legs are (c_address_p, c_address_r, amount_p, asset_p, fee_p) tuples, a
+    tuple per proposer PSET. The proposer outputs are already in the
+    proposer PSETs, the fee output pays for all the parties. Raise if the fee
+    rate of the joined transaction is too low.
+    """
+    outputs_r, (_, fee_r, fee_asset) = _funded_pset_outputs(
+        dpset_r, [_unconfidential_address(leg[0], network) for leg in legs],
+        network)
+    outputs_r += [(c_address_r, amount_p, asset_p)
+                  for _, c_address_r, amount_p, asset_p, _ in legs]
+    fee = fee_r + sum(leg[4] for leg in legs)
+    outputs_r.append(('fee', fee, fee_asset))
+
+    # reject a low fee rate before blinding and signing
+    outputs = list()
+    for dpset_p in dpsets_p:
+        outputs += _pset_outputs(dpset_p, network)
+    _check_fee_rate(fee, _estimate_pset_vsize(
+        dpsets_p + [dpset_r], outputs + outputs_r, network), relay_fee)
+    return _createpsbt_outputs(outputs_r)
+
+
+def _receiver_pset_args(dpset_p, dpset_r, c_address_p, c_address_r,
+                        amount_p, asset_p, fee_p, relay_fee, network):
+    """createpsbt outputs of the receiver PSET, given the proposer PSET and
+    the PSET funding the proposer output, see _aggregate_pset_args
+    """
+    return _aggregate_pset_args(
+        [dpset_p], dpset_r,
+        [(c_address_p, c_address_r, amount_p, asset_p, fee_p)], relay_fee,
+        network)
+
+
+def accept_pset(pset_p,
+                c_address_p, amount_p, asset_p, fee_p,
+                amount_r, asset_r,
+                connection,
+                fee_rate=None,
+                reservations=None):
+    """Accept a (parsed) swap proposal made with a PSET
+
+    Fund the receiver side, join it to the proposer PSET, blind the receiver
+    outputs and sign. Should be used with outputs from parse_proposed_pset,
+    see accept for reservations.
+    """
+
+    logging.info('Accepting swap proposal [2/3]')
+
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        new_address = batch.getnewaddress()
+        network_info = batch.getnetworkinfo()
+        decoded_p = batch.decodepsbt(pset_p)
+
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    c_address_r = new_address.result()
+
+    with _reserving(reservations, connection) as reserve:
+        logging.debug('Selecting inputs to fund swap PSET (receiver)')
+        funded = connection.walletcreatefundedpsbt(
+            [],
+            _createpsbt_outputs([(c_address_p, amount_r, asset_r)]),
+            NLOCKTIME, _pset_fund_details(fee_rate))
+
+        dpset_r = connection.decodepsbt(funded['psbt'])
+        reserve(_unconfidential_address(c_address_r, network),
+                map(_outpoint, _pset_inputs(dpset_r)))
+
+    outputs_r = _receiver_pset_args(
+        decoded_p.result(), dpset_r, c_address_p, c_address_r, amount_p,
+        asset_p, fee_p, network_info.result()['relayfee'], network)
+
+    logging.debug('Creating swap PSET (receiver)')
+    pset_r = connection.createpsbt(_pset_inputs(dpset_r), outputs_r,
+                                   NLOCKTIME, IS_REPLACEABLE)
+    # inputs and outputs are shuffled
+    pset = connection.joinpsbts([pset_p, pset_r])
+
+    logging.debug('Blinding and signing swap transaction (receiver inputs)')
+    pset = connection.walletprocesspsbt(pset)['psbt']
+
+    return _pset_acceptance(pset,
+                            _unconfidential_address(c_address_p, network),
+                            _unconfidential_address(c_address_r, network))
+
+
+def _pset_decoded_tx(dpset):
+    """Fields of a decoded transaction read by _check_accepted, from a
+    decoded PSET
+    """
+    vout = list()
+    for output in dpset['outputs']:
+        decoded = {'scriptPubKey': output['script']}
+        if 'amount' in output:
+            decoded.update({'value': output['amount'],
+                            'asset': output['asset']})
+        vout.append(decoded)
+    return {
+        # an unset locktime is 0
+        'locktime': dpset['global'].get('fallback_locktime', 0),
+        'vin': [{'txid': i['previous_txid'], 'vout': i['previous_vout']}
+                for i in dpset['inputs']],
+        'vout': vout,
+    }
+
+
+def parse_accepted_pset(pset,
+                        u_address_p,
+                        u_address_r,
+                        connection,
+                        reservations=None,
+                        aggregated=False):
+    """Parse a swap proposal accepted with a PSET
+
+    Proposer checks correctness of the accepted proposal and deduce its
+    details, the PSET reveals the values of all the outputs. See
+    parse_accepted for reservations and aggregated.
+    """
+
+    logging.info('Parsing accepted swap proposal')
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Receiver address: {}'.format(u_address_r))
+
+    resolver = get_address_resolver(connection)
+    parties_info = resolver.resolve([u_address_p, u_address_r], connection)
+    _check_parties(parties_info[u_address_p]['ismine'],
+                   parties_info[u_address_r]['ismine'],
+                   u_address_p, u_address_r)
+
+    decoded_tx = _pset_decoded_tx(connection.decodepsbt(pset))
+    logging.debug('Decoded PSET: {}'.format(decoded_tx))
+
+    unspents = _list_reserved_unspents(decoded_tx['vin'], connection,
+                                       reservations)
+    addresses_info = resolver.resolve(
+        _output_addresses(decoded_tx['vout']), connection)
+
+    addresses_mine = {u_address: info['ismine']
+                      for u_address, info in addresses_info.items()}
+
+    return ParsedAcceptance(pset, *_check_accepted(
+        decoded_tx, unspents, addresses_mine, u_address_p, u_address_r,
+        aggregated))
+
+
+def finalize_pset(pset, connection, broadcast=False, reservations=None,
+                  partial=False):
+    """Sign and send a swap proposal accepted with a PSET
+
+    Should be used only after parse_accepted_pset, see finalize for
+    reservations and partial (the parts are combined with combine_pset).
+    """
+
+    logging.info('Finalizing swap [3/3]')
+    logging.debug('Signing swap transaction (proposer inputs)')
+    ret = connection.walletprocesspsbt(pset)
+
+    if partial:
+        return ret['psbt']
+
+    if not ret['complete']:
+        raise UnsignedTransactionError('Transaction has some unsigned inputs')
+
+    tx = connection.finalizepsbt(ret['psbt'])['hex']
+    return _send_transaction(tx, connection, broadcast, reservations)
+
+
+# Aggregated swaps: the receiver accepts several proposals in a single
+# transaction, which pays a single fee output. Each proposer checks and signs
+# its inputs only, the signed parts are then combined and sent.
+
+def _aggregate(proposals, connection, fee_rate, decoder, reservations):
+    """Aggregate proposals made without PSET, see aggregate
+    """
+    resolver = get_address_resolver(connection)
+
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        network_info = batch.getnetworkinfo()
+        new_addresses = [batch.getnewaddress() for _ in proposals]
+        decoded_p = [_queue_decode(batch, p.tx, decoder) for p in proposals]
+
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    c_addresses_p = [p.c_address_p for p in proposals]
+    c_addresses_r = [new_address.result() for new_address in new_addresses]
+    network_info = network_info.result()
+
+    txu = _create_transaction(
+        [],
+        {p.c_address_p: p.amount_r for p in proposals},
+        {p.c_address_p: p.asset_r for p in proposals},
+        network)
+
+    with _reserving(reservations, connection) as reserve:
+        logging.debug('Selecting inputs to fund swap transaction (receiver)')
+        tx_r = connection.fundrawtransaction(
+            txu,
+            _fund_details(fee_rate),
+        )['hex']
+
+        dtx_r = decode_transaction(tx_r, connection, decoder)
+
+        inputs_r = dtx_r['vin']
+        outputs_r = dtx_r['vout']
+        unspents_r = _list_unspents(inputs_r, connection)
+        _reserve_legs(reserve, c_addresses_r, map(_outpoint, inputs_r),
+                      network)
+
+    inputs_p = list()
+    unspents_details = list()
+    for p, decoded in zip(proposals, decoded_p):
+        inputs_p += decoded()['vin']
+        unspents_details += p.unspents_details
+    unspents_details += _collect_unspents_details(inputs_r, unspents_r)
+
+    outpoints = [_outpoint(input_) for input_ in inputs_p + inputs_r]
+    if len(set(outpoints)) != len(outpoints):
+        raise UnexpectedValueError('Proposals spend the same unspents')
+
+    u_addresses = _output_addresses(outputs_r)
+    addresses_info = resolver.resolve(
+        u_addresses + c_addresses_p + c_addresses_r, connection)
+
+    u_addresses_p = [addresses_info[c_address_p]['unconfidential']
+                     for c_address_p in c_addresses_p]
+    u_addresses_r = [addresses_info[c_address_r]['unconfidential']
+                     for c_address_r in c_addresses_r]
+
+    map_confidential_r = {u_address: addresses_info[u_address]['confidential']
+                          for u_address in u_addresses
+                          if u_address not in u_addresses_p}
+    map_confidential_r.update(zip(u_addresses_p, c_addresses_p))
+    map_amount, map_asset = _map_outputs(outputs_r, map_confidential_r)
+    fee = map_amount.pop('fee') + sum(p.fee_p for p in proposals)
+
+    # join the maps of each proposal to the receiver ones
+    for p, c_address_r in zip(proposals, c_addresses_r):
+        if set(p.map_amount_p).intersection(map_amount).difference(
+                [p.c_address_p, 'fee']):
+            raise UnexpectedValueError('Proposals pay the same address')
+        map_amount, map_asset = _swap_maps(
+            p.map_amount_p, p.map_asset_p, map_amount, map_asset,
+            c_address_r, p.amount_p, p.asset_p, fee)
+
+    logging.debug('Creating aggregated swap transaction')
+    inputs = _shuffle_inputs(inputs_p, inputs_r)
+    tx = _create_transaction(inputs, map_amount, map_asset, network)
+    _check_created(tx, inputs, map_amount, map_asset, connection, decoder)
+
+    # reject a low fee rate before blinding and signing
+    _check_fee_rate(fee, _estimate_vsize(tx, inputs, unspents_r),
+                    network_info['relayfee'])
+
+    logging.debug('Blinding aggregated swap transaction')
+    btx = connection.rawblindrawtransaction(
+        tx, *_pack_blinding_data(inputs, unspents_details))
+
+    logging.debug('Signing aggregated swap transaction (receiver inputs)')
+    stx = connection.signrawtransactionwithwallet(btx)['hex']
+
+    # each proposer only unblinds the output receiving its amount
+    with connection.batch() as batch:
+        dumped_keys = [batch.dumpblindingkey(c_address_r)
+                       for c_address_r in c_addresses_r]
+
+    return [_acceptance(stx, {c_address_r: blinding_key.result()},
+                        u_address_p, u_address_r)
+            for c_address_r, blinding_key, u_address_p, u_address_r
+            in zip(c_addresses_r, dumped_keys, u_addresses_p, u_addresses_r)]
+
+
+def _aggregate_pset(proposals, connection, fee_rate, reservations):
+    """Aggregate proposals made with PSETs, see aggregate
+    """
+    with connection.batch() as batch:
+        blockchain_info = batch.getblockchaininfo()
+        network_info = batch.getnetworkinfo()
+        new_addresses = [batch.getnewaddress() for _ in proposals]
+        decoded_p = [batch.decodepsbt(p.pset) for p in proposals]
+
+    network = get_chain_index(blockchain_info.result().get('chain'))
+    c_addresses_r = [new_address.result() for new_address in new_addresses]
+
+    with _reserving(reservations, connection) as reserve:
+        logging.debug('Selecting inputs to fund swap PSET (receiver)')
+        funded = connection.walletcreatefundedpsbt(
+            [],
+            _createpsbt_outputs([(p.c_address_p, p.amount_r, p.asset_r)
+                                 for p in proposals]),
+            NLOCKTIME, _pset_fund_details(fee_rate))
+
+        dpset_r = connection.decodepsbt(funded['psbt'])
+        _reserve_legs(reserve, c_addresses_r,
+                      map(_outpoint, _pset_inputs(dpset_r)), network)
+
+    outputs_r = _aggregate_pset_args(
+        [decoded.result() for decoded in decoded_p], dpset_r,
+        [(p.c_address_p, c_address_r, p.amount_p, p.asset_p, p.fee_p)
+         for p, c_address_r in zip(proposals, c_addresses_r)],
+        network_info.result()['relayfee'], network)
+
+    logging.debug('Creating aggregated swap PSET (receiver)')
+    pset_r = connection.createpsbt(_pset_inputs(dpset_r), outputs_r,
+                                   NLOCKTIME, IS_REPLACEABLE)
+    # inputs and outputs are shuffled, shared inputs are rejected
+    pset = connection.joinpsbts([p.pset for p in proposals] + [pset_r])
+
+    logging.debug('Blinding and signing aggregated swap transaction '
+                  '(receiver inputs)')
+    pset = connection.walletprocesspsbt(pset)['psbt']
+
+    return [_pset_acceptance(pset,
+                             _unconfidential_address(p.c_address_p, network),
+                             _unconfidential_address(c_address_r, network))
+            for p, c_address_r in zip(proposals, c_addresses_r)]
+
+
+def aggregate(proposals, connection, fee_rate=None, decoder=DECODER_NODE,
+              reservations=None):
+    """Accept several (parsed) swap proposals in a single transaction
+
+    proposals are the records of either parse_proposed or
+    parse_proposed_pset. Return an acceptance per proposal, in order: they
+    share the transaction, each one with the receiver address (and blinding
+    key) of its swap only. Each proposer parses its acceptance with
+    aggregated set and signs its part with finalize (or finalize_pset) and
+    partial set, the parts are then sent with combine (or
+    combine_pset). A proposer checks its balance in the whole transaction:
+    it can only check one of its proposals per aggregated transaction.
+    See accept for reservations, the receiver unspents fund every leg and
+    are reserved under the receiver address of each leg.
+    """
+
+    proposals = list(proposals)
+    if not proposals:
+        raise MissingValueError('No proposal to aggregate')
+
+    logging.info('Accepting {} swap proposals in a single transaction '
+                 '[2/3]'.format(len(proposals)))
+
+    with_pset = [isinstance(p, ParsedPsetProposal) for p in proposals]
+    if any(with_pset) != all(with_pset):
+        raise UnexpectedValueError('Unable to aggregate proposals with and '
+                                   'without PSET')
+    if len(set(p.c_address_p for p in proposals)) != len(proposals):
+        raise UnexpectedValueError('Proposals pay the same address')
+
+    if all(with_pset):
+        return _aggregate_pset(proposals, connection, fee_rate, reservations)
+    return _aggregate(proposals, connection, fee_rate, decoder, reservations)
+
+
+def combine(parts, connection, broadcast=False, reservations=None):
+    """Combine the parts of an aggregated transaction and send it
+
+    parts are the transactions signed by each proposer, see aggregate. See
+    finalize for reservations.
+    """
+
+    logging.info('Combining {} signed parts'.format(len(parts)))
+    tx = connection.combinerawtransaction(list(parts))
+    return _send_transaction(tx, connection, broadcast, reservations)
+
+
+def combine_pset(parts, connection, broadcast=False, reservations=None):
+    """Combine the parts of an aggregated PSET and send its transaction, see
+    combine
+    """
+
+    logging.info('Combining {} signed parts'.format(len(parts)))
+    pset = connection.combinepsbt(list(parts))
+    ret = connection.finalizepsbt(pset)
+
+    if not ret['complete']:
+        raise UnsignedTransactionError('Transaction has some unsigned inputs')
+
+    return _send_transaction(ret['hex'], connection, broadcast, reservations)
+
+
+def parse_payload(payload, connection, decoder=DECODER_NODE,
+                  reservations=None, session=None, aggregated=False):
+    """Parse a (decoded) payload, whatever its status (see get_status)
+
+    Return the record of the parse function of its status. If session (a
+    SessionStore) is set, records are stored (in compact form) and the
+    payload is parsed once. aggregated is passed to the parse functions of
+    accepted swaps, records parsed with it are not stored.
+    """
+    status = get_status(payload)
+
+    def parse(payload):
+        if status == 'proposed':
+            return parse_proposed(*[payload[k] for k in PROPOSED_KEYS],
+                                  connection, decoder=decoder)
+        elif status == 'proposed_pset':
+            return parse_proposed_pset(
+                *[payload[k] for k in PROPOSED_PSET_KEYS], connection)
+        elif status == 'accepted':
+            return parse_accepted(*[payload[k] for k in ACCEPTED_KEYS],
+                                  connection, decoder=decoder,
+                                  reservations=reservations,
+                                  aggregated=aggregated)
+        return parse_accepted_pset(
+            *[payload[k] for k in ACCEPTED_PSET_KEYS], connection,
+            reservations=reservations, aggregated=aggregated)
+
+    if session is None or aggregated:
+        return parse(payload)
+    record = {
+        'proposed': ParsedProposal,
+        'proposed_pset': ParsedPsetProposal,
+    }.get(status, ParsedAcceptance)
+    return record.from_compact(
+        session.parse(payload, lambda payload: parse(payload).compact()))
+
+
+def accept_payload(proposal, connection, fee_rate=None, decoder=DECODER_NODE,
+                   reservations=None, session=None):
+    """Parse and accept a (decoded) proposal, with or without PSET
+
+    If session is set, a proposal already accepted is not funded again, its
+    acceptance is returned.
+    """
+    status = get_status(proposal)
+    if status not in ('proposed', 'proposed_pset'):
+        raise UnexpectedValueError('Not a swap proposal: {}'.format(status))
+
+    check_not_mine(proposal['u_address_p'], connection)
+    if session is not None:
+        state, _, acceptance = session.get(proposal)
+        if state == SESSION_ACCEPTED:
+            logging.info('Proposal already accepted')
+            return acceptance
+
+    ret = parse_payload(proposal, connection, decoder, session=session)
+    if status == 'proposed_pset':
+        acceptance = accept_pset(*ret, connection, fee_rate, reservations)
+    else:
+        acceptance = accept(*ret, connection, fee_rate, decoder=decoder,
+                            reservations=reservations)
+
+    if session is not None:
+        session.save(proposal, SESSION_ACCEPTED, result=acceptance)
+    return acceptance
+
+
+def finalize_payload(payload, connection, broadcast=False,
+                     decoder=DECODER_NODE, reservations=None, session=None,
+                     partial=False):
+    """Parse and finalize a (decoded) accepted swap, with or without PSET
+
+    Return the transaction, or its id if broadcast. If session is set, a
+    swap already finalized is not signed again: its stored transaction is
+    returned (or sent, if broadcast), and the id of a swap already broadcast
+    is returned. If partial, the swap is an aggregated one, return its
+    signed part, see finalize.
+    """
+    status = get_status(payload)
+    if status not in ('accepted', 'accepted_pset'):
+        raise UnexpectedValueError('Not an accepted swap: {}'.format(status))
+
+    state = SESSION_BROADCAST if broadcast else SESSION_FINALIZED
+    if session is not None and not partial:
+        cached_state, _, result = session.get(payload)
+        if cached_state == SESSION_BROADCAST or \
+                cached_state == SESSION_FINALIZED and not broadcast:
+            logging.info('Swap already {}'.format(cached_state))
+            return result
+        if cached_state == SESSION_FINALIZED:
+            logging.info('Swap already finalized, sending it')
+            txid = _send_transaction(result, connection, True, reservations)
+            session.save(payload, state, result=txid)
+            return txid
+
+    tx = parse_payload(payload, connection, decoder, reservations,
+                       session, aggregated=partial).tx
+    if status == 'accepted_pset':
+        ret = finalize_pset(tx, connection, broadcast, reservations, partial)
+    else:
+        ret = finalize(tx, connection, broadcast, reservations, partial)
+
+    if session is not None and not partial:
+        session.save(payload, state, result=ret)
+    return ret
+
+
+def aggregate_payloads(proposals, connection, fee_rate=None,
+                       decoder=DECODER_NODE, reservations=None,
+                       session=None):
+    """Parse and accept several (decoded) proposals in a single transaction
+
+    See aggregate, and accept_payload for session: proposals already
+    accepted are rejected, their unspents are spent by their acceptance.
+    """
+    proposals = list(proposals)
+    parsed = list()
+    for proposal in proposals:
+        status = get_status(proposal)
+        if status not in ('proposed', 'proposed_pset'):
+            raise UnexpectedValueError('Not a swap proposal: {}'.format(
+                status))
+        check_not_mine(proposal['u_address_p'], connection)
+        if session is not None and \
+                session.get(proposal)[0] == SESSION_ACCEPTED:
+            raise UnexpectedValueError('Proposal already accepted')
+        parsed.append(parse_payload(proposal, connection, decoder,
+                                    session=session))
+
+    acceptances = aggregate(parsed, connection, fee_rate, decoder,
+                            reservations)
+
+    if session is not None:
+        for proposal, acceptance in zip(proposals, acceptances):
+            session.save(proposal, SESSION_ACCEPTED, result=acceptance)
+    return acceptances
+
+
+def accept_many(proposals, connect, fee_rate=None, decoder=DECODER_NODE,
+                reservations=None, session=None, workers=ACCEPT_WORKERS):
+    """Accept several (decoded) swap proposals on a pool of worker threads
+
+    connect returns a connection for the calling thread, e.g. the connection
+    property of a ConnCtx, which keeps a connection per thread. Funding is
+    done one proposal at a time and no two acceptances spend the same
+    unspent: if reservations is None, the unspents are only reserved until
+    all the proposals are accepted. A proposal given several times is
+    accepted once. See accept_payload for session.
+    Return an (acceptance, error) pair for each proposal, in order, one of
+    them is None.
+    """
+
+    if reservations is None:
+        reservations = ReservationStore(None)
+
+    def accept_one(proposal):
+        return accept_payload(proposal, connect(), fee_rate, decoder,
+                              reservations, session)
+
+    # payload hash -> future, the same proposal is not funded twice
+    futures = dict()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        keys = list()
+        for proposal in proposals:
+            key = payload_hash(proposal)
+            if key not in futures:
+                futures[key] = executor.submit(accept_one, proposal)
+            keys.append(key)
+
+    results = list()
+    for future in map(futures.get, keys):
+        try:
+            results.append((future.result(), None))
+        except Exception as e:
+            logging.debug('Unable to accept proposal: {}'.format(e))
+            results.append((None, e))
+    return results
+
+
+# asyncio versions, to be used with an AsyncRawProxy connection. Independent
+# calls of each phase are awaited concurrently.
+
+async def _gather_dict(coroutines):
+    keys = list(coroutines)
+    results = await asyncio.gather(*[coroutines[k] for k in keys])
+    return dict(zip(keys, results))
+
+
+async def decode_transaction_async(tx, connection, decoder=DECODER_NODE):
+    """Decode tx with decoder, see decode_transaction
+    """
+    async with connection.batch() as batch:
+        decoded = _queue_decode(batch, tx, decoder)
+    return decoded()
+
+
+async def _list_unspents_async(inputs, connection):
+    """See _list_unspents
+    """
+    txouts = await asyncio.gather(*[
+        connection.gettxout(txid, vout, True)
+        for txid, vout in map(_outpoint, inputs)])
+
+    addresses = _txouts_addresses(txouts)
+    if not addresses:
+        return dict()
+    return _index_unspents(
+        await connection.projected(UNSPENT_FIELDS).listunspent(
+            *_listunspent_args(addresses)))
+
+
+async def propose_async(amount_p, asset_p,
+                        amount_r, asset_r,
+                        connection,
+                        fee_rate=None,
+                        pset=False,
+                        decoder=DECODER_NODE):
+    """Propose a swap, see propose
+    """
+
+    _check_proposal_values(amount_p, asset_p, amount_r, asset_r, fee_rate)
+
+    blockchain_info, network_info, c_address_p = await asyncio.gather(
+        connection.getblockchaininfo(),
+        connection.getnetworkinfo(),
+        connection.getnewaddress())
+
+    network = get_chain_index(blockchain_info.get('chain'))
+
+    if pset:
+        check_pset_version(connection, network_info)
+        return await _propose_pset_async(amount_p, asset_p, amount_r,
+                                         asset_r, c_address_p, network,
+                                         connection, fee_rate)
+
+    txu = _create_transaction(
+        [],
+        {DUMMY_ADDRESS_CONFIDENTIAL[network]: amount_p},
+        {DUMMY_ADDRESS_CONFIDENTIAL[network]: asset_p},
+        network)
+
+    logging.debug('Selecting inputs to fund swap transaction (proposer)')
+    txf = (await connection.fundrawtransaction(
+        txu, _fund_details(fee_rate)))['hex']
+
+    dtxf = await connection.decoderawtransaction(txf)
+
+    unspents, addresses_info = await asyncio.gather(
+        _list_unspents_async(dtxf['vin'], connection),
+        get_address_resolver(connection).resolve_async(
+            _output_addresses(dtxf['vout'], DUMMY_ADDRESS[network]) +
+            [c_address_p], connection))
+
+    proposal, created = _funded_proposal(dtxf, c_address_p, amount_r,
+                                         asset_r, unspents, addresses_info,
+                                         network)
+    await _check_created_async(proposal['tx'], *created, connection, decoder)
+    return proposal
+
+
+async def parse_proposed_async(tx,
+                               u_address_p,
+                               map_confidential,
+                               unspents_details,
+                               connection,
+                               decoder=DECODER_NODE):
+    """Parse a proposed swap, see parse_proposed
+    """
+
+    logging.info('Parsing swap proposal')
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Address map: {}'.format(map_confidential))
+    logging.debug('Unspents_details: {}'.format(unspents_details))
+
+    blockchain_info, dtx = await asyncio.gather(
+        connection.getblockchaininfo(),
+        decode_transaction_async(tx, connection, decoder))
+
+    network = get_chain_index(blockchain_info.get('chain'))
+    logging.debug('Decoded proposer transaction: {}'.format(dtx))
+
+    (amount_p, asset_p, fee_p, amount_r, asset_r, map_amount_p, map_asset_p,
+     to_check) = _parse_proposed_outputs(dtx['vout'], u_address_p,
+                                         map_confidential, network)
+
+    _check_unconfidential_addresses(to_check, network)
+
+    addresses_info = await get_address_resolver(connection).resolve_async(
+        [u_address_p], connection)
+    if addresses_info[u_address_p]['ismine']:
+        logging.info('Parsing own proposal')
+
+    c_address_p = map_confidential[u_address_p]
+
+    return ParsedProposal(tx,
+                          c_address_p, amount_p, asset_p, fee_p,
+                          amount_r, asset_r, map_amount_p, map_asset_p,
+                          unspents_details)
+
+
+async def accept_async(tx_p,
+                       c_address_p, amount_p, asset_p, fee_p,
+                       amount_r, asset_r,
+                       map_amount_p, map_asset_p, unspents_details_p,
+                       connection,
+                       fee_rate=None,
+                       decoder=DECODER_NODE):
+    """Accept a (parsed) swap proposal, see accept
+    """
+
+    logging.info('Accepting swap proposal [2/3]')
+
+    resolver = get_address_resolver(connection)
+
+    blockchain_info, c_address_r, network_info, dtx_p = await asyncio.gather(
+        connection.getblockchaininfo(),
+        connection.getnewaddress(),
+        connection.getnetworkinfo(),
+        decode_transaction_async(tx_p, connection, decoder))
+
+    network = get_chain_index(blockchain_info.get('chain'))
+
+    txu = _create_transaction(
+        [], {c_address_p: amount_r}, {c_address_p: asset_r}, network)
+
+    logging.debug('Selecting inputs to fund swap transaction (receiver)')
+    tx_r = (await connection.fundrawtransaction(
+        txu, _fund_details(fee_rate)))['hex']
+
+    dtx_r = await decode_transaction_async(tx_r, connection, decoder)
+
+    inputs_r = dtx_r['vin']
+    outputs_r = dtx_r['vout']
+    unspents_r = await _list_unspents_async(inputs_r, connection)
+    unspents_details = list(unspents_details_p)
+    unspents_details += _collect_unspents_details(inputs_r, unspents_r)
+
+    u_addresses = _output_addresses(outputs_r)
+    addresses_info = await resolver.resolve_async(
+        u_addresses + [c_address_p, c_address_r], connection)
+
+    u_address_p = addresses_info[c_address_p]['unconfidential']
+    u_address_r = addresses_info[c_address_r]['unconfidential']
+    logging.debug('Receiver address: {}'.format(u_address_r))
+    logging.debug('Proposer address: {}'.format(u_address_p))
+
+    map_confidential_r = {u_address: addresses_info[u_address]['confidential']
+                          for u_address in u_addresses
+                          if u_address != u_address_p}
+    map_confidential_r.update({u_address_p: c_address_p})
+    map_amount_r, map_asset_r = _map_outputs(outputs_r, map_confidential_r)
+    fee_r = map_amount_r.pop('fee')
+
+    inputs = _shuffle_inputs(dtx_p['vin'], inputs_r)
+    map_amount, map_asset = _swap_maps(
+        map_amount_p, map_asset_p, map_amount_r, map_asset_r,
+        c_address_r, amount_p, asset_p, fee_p + fee_r)
+
+    logging.debug('Creating swap transaction')
+    tx = _create_transaction(inputs, map_amount, map_asset, network)
+    await _check_created_async(tx, inputs, map_amount, map_asset, connection,
+                               decoder)
+
+    _check_fee_rate(fee_p + fee_r, _estimate_vsize(tx, inputs, unspents_r),
+                    network_info['relayfee'])
+
+    logging.debug('Blinding swap transaction')
+    btx = await connection.rawblindrawtransaction(
+        tx, *_pack_blinding_data(inputs, unspents_details))
+
+    logging.debug('Signing swap transaction (receiver inputs)')
+    stx = (await connection.signrawtransactionwithwallet(btx))['hex']
+
+    logging.debug('Dumping blinding keys (so that the swap partner can fully '
+                  'unblind the transaction)')
+    addresses_info = await resolver.resolve_async(
+        [c_address for c_address in map_amount if c_address != 'fee'],
+        connection)
+
+    blinding_keys = await _gather_dict({
+        c_address: connection.dumpblindingkey(c_address)
+        for c_address, info in addresses_info.items() if info['ismine']})
+
+    return _acceptance(stx, blinding_keys, u_address_p, u_address_r)
+
+
+async def parse_accepted_async(signed_tx,
+                               blinding_keys,
+                               u_address_p,
+                               u_address_r,
+                               connection,
+                               decoder=DECODER_NODE,
+                               aggregated=False):
+    """Parse an accepted swap proposal, see parse_accepted
+    """
+
+    logging.info('Parsing accepted swap proposal')
+    logging.debug('Blinding keys: {}'.format(blinding_keys))
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Receiver address: {}'.format(u_address_r))
+
+    resolver = get_address_resolver(connection)
+    parties_info = await resolver.resolve_async([u_address_p, u_address_r],
+                                                connection)
+    _check_parties(parties_info[u_address_p]['ismine'],
+                   parties_info[u_address_r]['ismine'],
+                   u_address_p, u_address_r)
+
+    logging.debug('Importing blinding keys')
+    await asyncio.gather(*[
+        connection.importblindingkey(c_address, blinding_key)
+        for c_address, blinding_key in blinding_keys.items()])
+
+    logging.debug('Unblinding transaction to analyze it')
+    unblinded_tx = (await connection.unblindrawtransaction(signed_tx))['hex']
+    decoded_tx = await decode_transaction_async(unblinded_tx, connection,
+                                                decoder)
+    logging.debug('Decoded unblinded transaction: {}'.format(decoded_tx))
+
+    unspents, addresses_info = await asyncio.gather(
+        _list_unspents_async(decoded_tx['vin'], connection),
+        resolver.resolve_async(_output_addresses(decoded_tx['vout']),
+                               connection))
+
+    addresses_mine = {u_address: info['ismine']
+                      for u_address, info in addresses_info.items()}
+
+    return ParsedAcceptance(signed_tx, *_check_accepted(
+        decoded_tx, unspents, addresses_mine, u_address_p, u_address_r,
+        aggregated))
+
+
+async def finalize_async(pstx, connection, broadcast=False):
+    """Sign and send an accepted proposal, see finalize
+    """
+
+    logging.info('Finalizing swap [3/3]')
+    logging.debug('Signing swap transaction (proposer inputs)')
+    ret = await connection.signrawtransactionwithwallet(pstx)
+
+    if not ret['complete']:
+        raise UnsignedTransactionError('Transaction has some unsigned inputs')
+
+    return await _send_transaction_async(ret['hex'], connection, broadcast)
+
+
+async def _send_transaction_async(tx, connection, broadcast):
+    if broadcast:
+        logging.info('Broadcasting transaction')
+        return await connection.sendrawtransaction(tx)
+    else:
+        logging.info('Testing transaction against mempool')
+        if not (await connection.testmempoolaccept([tx]))[0]['allowed']:
+            raise InvalidTransactionError('Invalid transaction: will not be '
+                                          'allowed by mempool')
+
+        return tx
+
+
+async def _propose_pset_async(amount_p, asset_p, amount_r, asset_r,
+                              c_address_p, network, connection, fee_rate):
+    """Propose a swap with a PSET, see propose
+    """
+    logging.debug('Selecting inputs to fund swap PSET (proposer)')
+    funded = await connection.walletcreatefundedpsbt(
+        *_fund_pset_args(amount_p, asset_p, network, fee_rate))
+
+    dpset = await connection.decodepsbt(funded['psbt'])
+    outputs, fee_p = _proposer_pset_args(dpset, c_address_p, amount_r,
+                                         asset_r, network)
+
+    logging.debug('Creating swap PSET (proposer)')
+    pset = await connection.createpsbt(_pset_inputs(dpset), outputs,
+                                       NLOCKTIME, IS_REPLACEABLE)
+
+    logging.debug('Blinding proposer outputs')
+    pset = (await connection.walletprocesspsbt(pset, False))['psbt']
+
+    return _pset_proposal(pset, _unconfidential_address(c_address_p, network),
+                          fee_p)
+
+
+async def parse_proposed_pset_async(pset, u_address_p, fee_p, connection):
+    """Parse a swap proposed with a PSET, see parse_proposed_pset
+    """
+
+    logging.info('Parsing swap proposal')
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Proposer fee: {} (sat)'.format(fee_p))
+
+    network_info = await connection.getnetworkinfo()
+    check_pset_version(connection, network_info)
+
+    blockchain_info, sidechain_info, dpset = await asyncio.gather(
+        connection.getblockchaininfo(),
+        connection.getsidechaininfo(),
+        connection.decodepsbt(pset))
+
+    network = get_chain_index(blockchain_info.get('chain'))
+    logging.debug('Decoded proposer PSET: {}'.format(dpset))
+
+    amount_p, asset_p, amount_r, asset_r, c_address_p = _parse_proposed_pset(
+        dpset, u_address_p, fee_p, sidechain_info['pegged_asset'], network)
+
+    addresses_info = await get_address_resolver(connection).resolve_async(
+        [u_address_p], connection)
+    if addresses_info[u_address_p]['ismine']:
+        logging.info('Parsing own proposal')
+
+    return ParsedPsetProposal(pset,
+                              c_address_p, amount_p, asset_p, fee_p,
+                              amount_r, asset_r)
+
+
+async def accept_pset_async(pset_p,
+                            c_address_p, amount_p, asset_p, fee_p,
+                            amount_r, asset_r,
+                            connection,
+                            fee_rate=None):
+    """Accept a (parsed) swap proposal made with a PSET, see accept_pset
+    """
+
+    logging.info('Accepting swap proposal [2/3]')
+
+    blockchain_info, c_address_r, network_info, dpset_p = \
+        await asyncio.gather(
+            connection.getblockchaininfo(),
+            connection.getnewaddress(),
+            connection.getnetworkinfo(),
+            connection.decodepsbt(pset_p))
+
+    network = get_chain_index(blockchain_info.get('chain'))
+
+    logging.debug('Selecting inputs to fund swap PSET (receiver)')
+    funded = await connection.walletcreatefundedpsbt(
+        [], _createpsbt_outputs([(c_address_p, amount_r, asset_r)]),
+        NLOCKTIME, _pset_fund_details(fee_rate))
+
+    dpset_r = await connection.decodepsbt(funded['psbt'])
+    outputs_r = _receiver_pset_args(
+        dpset_p, dpset_r, c_address_p, c_address_r, amount_p, asset_p, fee_p,
+        network_info['relayfee'], network)
+
+    logging.debug('Creating swap PSET (receiver)')
+    pset_r = await connection.createpsbt(_pset_inputs(dpset_r), outputs_r,
+                                         NLOCKTIME, IS_REPLACEABLE)
+    pset = await connection.joinpsbts([pset_p, pset_r])
+
+    logging.debug('Blinding and signing swap transaction (receiver inputs)')
+    pset = (await connection.walletprocesspsbt(pset))['psbt']
+
+    return _pset_acceptance(pset,
+                            _unconfidential_address(c_address_p, network),
+                            _unconfidential_address(c_address_r, network))
+
+
+async def parse_accepted_pset_async(pset,
+                                    u_address_p,
+                                    u_address_r,
+                                    connection,
+                                    aggregated=False):
+    """Parse a swap proposal accepted with a PSET, see parse_accepted_pset
+    """
+
+    logging.info('Parsing accepted swap proposal')
+    logging.debug('Proposer address: {}'.format(u_address_p))
+    logging.debug('Receiver address: {}'.format(u_address_r))
+
+    resolver = get_address_resolver(connection)
+    parties_info, dpset = await asyncio.gather(
+        resolver.resolve_async([u_address_p, u_address_r], connection),
+        connection.decodepsbt(pset))
+    _check_parties(parties_info[u_address_p]['ismine'],
+                   parties_info[u_address_r]['ismine'],
+                   u_address_p, u_address_r)
+
+    decoded_tx = _pset_decoded_tx(dpset)
+    logging.debug('Decoded PSET: {}'.format(decoded_tx))
+
+    unspents, addresses_info = await asyncio.gather(
+        _list_unspents_async(decoded_tx['vin'], connection),
+        resolver.resolve_async(_output_addresses(decoded_tx['vout']),
+                               connection))
+
+    addresses_mine = {u_address: info['ismine']
+                      for u_address, info in addresses_info.items()}
+
+    return ParsedAcceptance(pset, *_check_accepted(
+        decoded_tx, unspents, addresses_mine, u_address_p, u_address_r,
+        aggregated))
+
+
+async def finalize_pset_async(pset, connection, broadcast=False):
+    """Sign and send a swap proposal accepted with a PSET, see finalize_pset
+    """
+
+    logging.info('Finalizing swap [3/3]')
+    logging.debug('Signing swap transaction (proposer inputs)')
+    ret = await connection.walletprocesspsbt(pset)
+
+    if not ret['complete']:
+        raise UnsignedTransactionError('Transaction has some unsigned inputs')
+
+    tx = (await connection.finalizepsbt(ret['psbt']))['hex']
+    return await _send_transaction_async(tx, connection, broadcast)
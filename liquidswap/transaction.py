@@ -0,0 +1,628 @@
+"""Elements transactions
+
+Serialization of raw Elements transactions, both explicit and confidential,
+decode(), a local equivalent of decoderawtransaction, and create(), of
+createrawtransaction: transactions are built and decoded without a round
+trip to the node.
+
+Deserialized transactions are dicts:
+{'version', 'locktime', 'vin': [input], 'vout': [output]}
+input: {'txid', 'vout', 'is_pegin', 'script_sig', 'sequence', 'issuance',
+        'issuance_amount_rangeproof', 'inflation_keys_rangeproof', 'witness',
+        'pegin_witness'}
+output: {'asset', 'value', 'nonce', 'script_pubkey', 'surjectionproof',
+         'rangeproof'}
+Scripts, proofs and the confidential fields (with their prefix byte) are
+bytes, witnesses are lists of bytes.
+"""
+
+import hashlib
+import struct
+
+from liquidswap.address import (
+    address_script,
+    parse_address,
+    script_address,
+    script_type,
+)
+from liquidswap.constants import SINGLE_ADDRESS_MIN_VERSION
+from liquidswap.exceptions import (
+    TransactionDecodeError,
+    InvalidAddressError,
+    MissingValueError,
+)
+from liquidswap.liquidrpc import Satoshi
+
+
+OUTPOINT_ISSUANCE_FLAG = 1 << 31
+OUTPOINT_PEGIN_FLAG = 1 << 30
+OUTPOINT_INDEX_MASK = 0x3fffffff
+NULL_INDEX = 0xffffffff
+NULL_TXID = '00' * 32
+WITNESS_SCALE_FACTOR = 4
+TX_VERSION = 2
+SEQUENCE_FINAL = 0xffffffff
+# opt-in replace by fee (BIP125)
+SEQUENCE_RBF = 0xfffffffd
+
+# first byte of a confidential field -> size of the field: null, explicit,
+# commitments
+VALUE_SIZES = {0x00: 1, 0x01: 9, 0x08: 33, 0x09: 33}
+ASSET_SIZES = {0x00: 1, 0x01: 33, 0x0a: 33, 0x0b: 33}
+NONCE_SIZES = {0x00: 1, 0x01: 33, 0x02: 33, 0x03: 33}
+EXPLICIT = 0x01
+NULL = b'\x00'
+
+# secp256k1 field size, to check commitment nonces
+SECP256K1_P = 2**256 - 2**32 - 977
+
+# sizes (bytes) of the data added by blinding and signing
+COMMITMENT_SIZE = 33
+RANGEPROOF_SIZE = 4174
+SIGNATURE_SIZE = 72
+SCHNORR_SIGNATURE_SIZE = 64
+PUBKEY_SIZE = 33
+P2SH_P2WPKH_SCRIPT_SIG_SIZE = 23
+# spent output type assumed when unknown, the Liquid wallet default
+DEFAULT_INPUT_TYPE = 'scripthash'
+
+# script opcodes names, 0x61 (OP_NOP) onwards
+OPCODE_NAMES = (
+    'OP_NOP OP_VER OP_IF OP_NOTIF OP_VERIF OP_VERNOTIF OP_ELSE OP_ENDIF '
+    'OP_VERIFY OP_RETURN OP_TOALTSTACK OP_FROMALTSTACK OP_2DROP OP_2DUP '
+    'OP_3DUP OP_2OVER OP_2ROT OP_2SWAP OP_IFDUP OP_DEPTH OP_DROP OP_DUP '
+    'OP_NIP OP_OVER OP_PICK OP_ROLL OP_ROT OP_SWAP OP_TUCK OP_CAT OP_SUBSTR '
+    'OP_LEFT OP_RIGHT OP_SIZE OP_INVERT OP_AND OP_OR OP_XOR OP_EQUAL '
+    'OP_EQUALVERIFY OP_RESERVED1 OP_RESERVED2 OP_1ADD OP_1SUB OP_2MUL '
+    'OP_2DIV OP_NEGATE OP_ABS OP_NOT OP_0NOTEQUAL OP_ADD OP_SUB OP_MUL '
+    'OP_DIV OP_MOD OP_LSHIFT OP_RSHIFT OP_BOOLAND OP_BOOLOR OP_NUMEQUAL '
+    'OP_NUMEQUALVERIFY OP_NUMNOTEQUAL OP_LESSTHAN OP_GREATERTHAN '
+    'OP_LESSTHANOREQUAL OP_GREATERTHANOREQUAL OP_MIN OP_MAX OP_WITHIN '
+    'OP_RIPEMD160 OP_SHA1 OP_SHA256 OP_HASH160 OP_HASH256 OP_CODESEPARATOR '
+    'OP_CHECKSIG OP_CHECKSIGVERIFY OP_CHECKMULTISIG OP_CHECKMULTISIGVERIFY '
+    'OP_NOP1 OP_CHECKLOCKTIMEVERIFY OP_CHECKSEQUENCEVERIFY OP_NOP4 OP_NOP5 '
+    'OP_NOP6 OP_NOP7 OP_NOP8 OP_NOP9 OP_NOP10').split()
+OP_PUSHDATA1 = 0x4c
+OP_PUSHDATA2 = 0x4d
+OP_PUSHDATA4 = 0x4e
+OP_1NEGATE = 0x4f
+OP_RESERVED = 0x50
+OP_1 = 0x51
+OP_16 = 0x60
+OP_NOP = 0x61
+
+
+def _sha256d(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def _error(reason):
+    return TransactionDecodeError('TX decode failed: {}'.format(reason))
+
+
+class _Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, n):
+        if self.pos + n > len(self.data):
+            raise _error('unexpected end of data')
+        self.pos += n
+        return self.data[self.pos - n:self.pos]
+
+    def unpack(self, fmt):
+        return struct.unpack(fmt, self.read(struct.calcsize(fmt)))[0]
+
+    def compact_size(self):
+        n = self.unpack('<B')
+        for prefix, fmt, minimum in ((0xfd, '<H', 0xfd),
+                                     (0xfe, '<I', 0x10000),
+                                     (0xff, '<Q', 0x100000000)):
+            if n == prefix:
+                n = self.unpack(fmt)
+                if n < minimum:
+                    raise _error('non-canonical compact size')
+                break
+        if n > len(self.data):
+            raise _error('size too large')
+        return n
+
+    def var_bytes(self):
+        return self.read(self.compact_size())
+
+    def stack(self):
+        return [self.var_bytes() for _ in range(self.compact_size())]
+
+    def confidential(self, sizes, name):
+        prefix = self.unpack('<B')
+        if prefix not in sizes:
+            raise _error('invalid {} commitment'.format(name))
+        self.pos -= 1
+        return self.read(sizes[prefix])
+
+    def done(self):
+        return self.pos == len(self.data)
+
+
+def _read_input(r):
+    txid = r.read(32)[::-1].hex()
+    n = r.unpack('<I')
+    is_pegin = has_issuance = False
+    if n != NULL_INDEX:
+        has_issuance = bool(n & OUTPOINT_ISSUANCE_FLAG)
+        is_pegin = bool(n & OUTPOINT_PEGIN_FLAG)
+        n &= OUTPOINT_INDEX_MASK
+    input_ = {
+        'txid': txid,
+        'vout': n,
+        'is_pegin': is_pegin,
+        'script_sig': r.var_bytes(),
+        'sequence': r.unpack('<I'),
+        'issuance': None,
+        'issuance_amount_rangeproof': b'',
+        'inflation_keys_rangeproof': b'',
+        'witness': [],
+        'pegin_witness': [],
+    }
+    if has_issuance:
+        input_['issuance'] = {
+            'blinding_nonce': r.read(32),
+            'entropy': r.read(32),
+            'amount': r.confidential(VALUE_SIZES, 'value'),
+            'inflation_keys': r.confidential(VALUE_SIZES, 'value'),
+        }
+    return input_
+
+
+def _read_output(r):
+    return {
+        'asset': r.confidential(ASSET_SIZES, 'asset'),
+        'value': r.confidential(VALUE_SIZES, 'value'),
+        'nonce': r.confidential(NONCE_SIZES, 'nonce'),
+        'script_pubkey': r.var_bytes(),
+        'surjectionproof': b'',
+        'rangeproof': b'',
+    }
+
+
+def _has_witness(tx):
+    return any(i['issuance_amount_rangeproof'] or
+               i['inflation_keys_rangeproof'] or i['witness'] or
+               i['pegin_witness'] for i in tx['vin']) or \
+        any(o['surjectionproof'] or o['rangeproof'] for o in tx['vout'])
+
+
+def deserialize(data):
+    """Deserialize a raw transaction (bytes)
+
+    Raise TransactionDecodeError if data is not a valid transaction.
+    """
+    r = _Reader(data)
+    tx = {'version': r.unpack('<i')}
+    flags = r.unpack('<B')
+    tx['vin'] = [_read_input(r) for _ in range(r.compact_size())]
+    tx['vout'] = [_read_output(r) for _ in range(r.compact_size())]
+    tx['locktime'] = r.unpack('<I')
+
+    if flags & 1:
+        flags ^= 1
+        for input_ in tx['vin']:
+            input_['issuance_amount_rangeproof'] = r.var_bytes()
+            input_['inflation_keys_rangeproof'] = r.var_bytes()
+            input_['witness'] = r.stack()
+            input_['pegin_witness'] = r.stack()
+        for output in tx['vout']:
+            output['surjectionproof'] = r.var_bytes()
+            output['rangeproof'] = r.var_bytes()
+        if not _has_witness(tx):
+            raise _error('superfluous witness record')
+    if flags:
+        raise _error('unknown transaction optional data')
+    if not r.done():
+        raise _error('extra data after transaction')
+    return tx
+
+
+def _compact_size(n):
+    if n < 0xfd:
+        return struct.pack('<B', n)
+    elif n <= 0xffff:
+        return struct.pack('<BH', 0xfd, n)
+    elif n <= 0xffffffff:
+        return struct.pack('<BI', 0xfe, n)
+    return struct.pack('<BQ', 0xff, n)
+
+
+def _var_bytes(data):
+    return _compact_size(len(data)) + data
+
+
+def _stack(items):
+    return _compact_size(len(items)) + b''.join(map(_var_bytes, items))
+
+
+def serialize(tx, witness=True):
+    """Raw transaction (bytes), without the witness if not witness"""
+    witness = witness and _has_witness(tx)
+    parts = [struct.pack('<iB', tx['version'], 1 if witness else 0),
+             _compact_size(len(tx['vin']))]
+    for input_ in tx['vin']:
+        n = input_['vout']
+        if not (input_['txid'] == NULL_TXID and n == NULL_INDEX):
+            n |= (OUTPOINT_ISSUANCE_FLAG if input_['issuance'] else 0) | \
+                (OUTPOINT_PEGIN_FLAG if input_['is_pegin'] else 0)
+        parts += [bytes.fromhex(input_['txid'])[::-1], struct.pack('<I', n),
+                  _var_bytes(input_['script_sig']),
+                  struct.pack('<I', input_['sequence'])]
+        issuance = input_['issuance']
+        if issuance:
+            parts += [issuance['blinding_nonce'], issuance['entropy'],
+                      issuance['amount'], issuance['inflation_keys']]
+    parts.append(_compact_size(len(tx['vout'])))
+    for output in tx['vout']:
+        parts += [output['asset'], output['value'], output['nonce'],
+                  _var_bytes(output['script_pubkey'])]
+    parts.append(struct.pack('<I', tx['locktime']))
+    if witness:
+        for input_ in tx['vin']:
+            parts += [_var_bytes(input_['issuance_amount_rangeproof']),
+                      _var_bytes(input_['inflation_keys_rangeproof']),
+                      _stack(input_['witness']),
+                      _stack(input_['pegin_witness'])]
+        for output in tx['vout']:
+            parts += [_var_bytes(output['surjectionproof']),
+                      _var_bytes(output['rangeproof'])]
+    return b''.join(parts)
+
+
+def txid(tx):
+    return _sha256d(serialize(tx, witness=False))[::-1].hex()
+
+
+def wtxid(tx):
+    return _sha256d(serialize(tx))[::-1].hex()
+
+
+def weight(tx):
+    return len(serialize(tx, witness=False)) * (WITNESS_SCALE_FACTOR - 1) + \
+        len(serialize(tx))
+
+
+def vsize(tx):
+    return (weight(tx) + WITNESS_SCALE_FACTOR - 1) // WITNESS_SCALE_FACTOR
+
+
+def surjectionproof_size(n_inputs):
+    """Size of the surjection proof of an output of a transaction with
+    n_inputs inputs"""
+    return 2 + (n_inputs + 7) // 8 + 32 * (1 + min(3, n_inputs))
+
+
+def _signed(input_, spent_type):
+    """input_ with placeholders of the size of its signature data"""
+    if input_['script_sig'] or input_['witness']:
+        return input_
+    signature, pubkey = bytes(SIGNATURE_SIZE), bytes(PUBKEY_SIZE)
+    if spent_type == 'pubkeyhash':
+        script_sig = _var_bytes(signature) + _var_bytes(pubkey)
+        return dict(input_, script_sig=script_sig)
+    if spent_type == 'witness_v0_keyhash':
+        return dict(input_, witness=[signature, pubkey])
+    if spent_type == 'witness_v1_taproot':
+        return dict(input_, witness=[bytes(SCHNORR_SIGNATURE_SIZE)])
+    # p2sh-p2wpkh
+    return dict(input_, script_sig=bytes(P2SH_P2WPKH_SCRIPT_SIG_SIZE),
+                witness=[signature, pubkey])
+
+
+def _blinded(output, n_inputs):
+    """output with placeholders of the size of its commitments and proofs
+    if it has a blinding key"""
+    if output['nonce'] == NULL or output['value'][0] != EXPLICIT:
+        return output
+    return dict(output, asset=bytes(COMMITMENT_SIZE),
+                value=bytes(COMMITMENT_SIZE),
+                surjectionproof=bytes(surjectionproof_size(n_inputs)),
+                rangeproof=bytes(RANGEPROOF_SIZE))
+
+
+def estimate_vsize(tx, spent_types=None):
+    """Estimate the vsize of tx once blinded and fully signed
+
+    spent_types are the script types (see script_type) of the outputs
+    spent by the inputs, None (or a None item) if unknown: p2sh-p2wpkh is
+    assumed. Inputs already signed and outputs already blinded are counted
+    as they are.
+    """
+    spent_types = list(spent_types or [])
+    spent_types += [None] * (len(tx['vin']) - len(spent_types))
+    return vsize(dict(
+        tx,
+        vin=[_signed(i, t or DEFAULT_INPUT_TYPE)
+             for i, t in zip(tx['vin'], spent_types)],
+        vout=[_blinded(o, len(tx['vin'])) for o in tx['vout']]))
+
+
+def explicit_value(value):
+    """Value of a confidential value field, None if it is not explicit"""
+    if value[0] == EXPLICIT:
+        return struct.unpack('>Q', value[1:])[0]
+    return None
+
+
+def explicit_asset(asset):
+    """Asset (hex) of a confidential asset field, None if it is not explicit
+    """
+    if asset[0] == EXPLICIT:
+        return asset[1:][::-1].hex()
+    return None
+
+
+def _commitment_hex(field):
+    return '' if field == NULL else field.hex()
+
+
+def _fully_valid_pubkey(nonce):
+    # compressed public key of a point on the curve
+    if len(nonce) != 33 or nonce[0] not in (2, 3):
+        return False
+    x = int.from_bytes(nonce[1:], 'big')
+    if x >= SECP256K1_P:
+        return False
+    y2 = (pow(x, 3, SECP256K1_P) + 7) % SECP256K1_P
+    return pow(y2, (SECP256K1_P - 1) // 2, SECP256K1_P) in (0, 1)
+
+
+def rangeproof_info(proof):
+    """Return (exponent, mantissa, min_value, max_value) from the header of
+    a rangeproof, None if the header is not valid
+    """
+    if len(proof) < 65 or proof[0] & 128:
+        return None
+    exp, mantissa, max_value = -1, 0, 0
+    offset = 1
+    if proof[0] & 64:
+        exp = proof[0] & 31
+        mantissa = proof[1] + 1
+        if exp > 18 or mantissa > 64:
+            return None
+        max_value = 2**64 - 1 >> (64 - mantissa)
+        offset = 2
+    for _ in range(exp):
+        if max_value > (2**64 - 1) // 10:
+            return None
+        max_value *= 10
+    min_value = 0
+    if proof[0] & 32:
+        min_value = struct.unpack('>Q', proof[offset:offset + 8])[0]
+    if max_value > 2**64 - 1 - min_value:
+        return None
+    return exp, mantissa, min_value, max_value + min_value
+
+
+def _script_num(data):
+    if not data:
+        return 0
+    n = int.from_bytes(data, 'little')
+    if data[-1] & 0x80:
+        return -(n & ~(0x80 << 8 * (len(data) - 1)))
+    return n
+
+
+def script_asm(script):
+    """Disassembly of script, as ScriptToAsmStr (signatures are not decoded)
+    """
+    items = []
+    pos = 0
+    while pos < len(script):
+        opcode = script[pos]
+        pos += 1
+        if opcode <= OP_PUSHDATA4:
+            size = opcode
+            if opcode >= OP_PUSHDATA1:
+                width = {OP_PUSHDATA1: 1, OP_PUSHDATA2: 2, OP_PUSHDATA4: 4}[
+                    opcode]
+                if pos + width > len(script):
+                    items.append('[error]')
+                    break
+                size = int.from_bytes(script[pos:pos + width], 'little')
+                pos += width
+            if pos + size > len(script):
+                items.append('[error]')
+                break
+            data = script[pos:pos + size]
+            pos += size
+            items.append(str(_script_num(data)) if size <= 4 else data.hex())
+        elif opcode == OP_1NEGATE:
+            items.append('-1')
+        elif opcode == OP_RESERVED:
+            items.append('OP_RESERVED')
+        elif OP_1 <= opcode <= OP_16:
+            items.append(str(opcode - OP_1 + 1))
+        elif opcode - OP_NOP < len(OPCODE_NAMES):
+            items.append(OPCODE_NAMES[opcode - OP_NOP])
+        else:
+            items.append('OP_UNKNOWN')
+    return ' '.join(items)
+
+
+def _script_pubkey(script, network, elements_version):
+    typ = script_type(script)
+    address = script_address(script, network)
+    decoded = {'asm': script_asm(script), 'hex': script.hex()}
+    if elements_version is not None and \
+            elements_version < SINGLE_ADDRESS_MIN_VERSION:
+        if typ == 'witness_v1_taproot':
+            typ = 'witness_unknown'
+        if address is not None:
+            decoded.update({'reqSigs': 1, 'addresses': [address]})
+    elif address is not None:
+        decoded['address'] = address
+    decoded['type'] = typ
+    return decoded
+
+
+def _decode_value(value, prefix):
+    """Decoded fields of a confidential value"""
+    sat = explicit_value(value)
+    if sat is not None:
+        return {prefix: Satoshi(sat)}
+    return {prefix + 'commitment': _commitment_hex(value)}
+
+
+def _decode_input(input_, coinbase):
+    if coinbase:
+        vin = {'coinbase': input_['script_sig'].hex()}
+    else:
+        vin = {
+            'txid': input_['txid'],
+            'vout': input_['vout'],
+            'scriptSig': {'asm': script_asm(input_['script_sig']),
+                          'hex': input_['script_sig'].hex()},
+            'is_pegin': input_['is_pegin'],
+        }
+    if input_['witness']:
+        vin['txinwitness'] = [item.hex() for item in input_['witness']]
+    if input_['pegin_witness']:
+        vin['pegin_witness'] = [item.hex()
+                                for item in input_['pegin_witness']]
+    issuance = input_['issuance']
+    if issuance:
+        vin['issuance'] = {
+            'assetBlindingNonce': issuance['blinding_nonce'][::-1].hex(),
+            'assetEntropy': issuance['entropy'][::-1].hex(),
+            'isreissuance': issuance['blinding_nonce'] != b'\0' * 32,
+        }
+        vin['issuance'].update(_decode_value(issuance['amount'],
+                                             'assetamount'))
+        if issuance['inflation_keys'] != NULL:
+            vin['issuance'].update(_decode_value(issuance['inflation_keys'],
+                                                 'tokenamount'))
+    vin['sequence'] = input_['sequence']
+    return vin
+
+
+def _decode_output(output, n, network, elements_version):
+    vout = dict()
+    sat = explicit_value(output['value'])
+    if sat is not None:
+        vout['value'] = Satoshi(sat)
+    else:
+        info = rangeproof_info(output['rangeproof'])
+        if info is not None:
+            exp, mantissa, min_value, max_value = info
+            vout.update({
+                'value-minimum': Satoshi(min_value),
+                'value-maximum': Satoshi(max_value),
+                'ct-exponent': exp,
+                'ct-bits': mantissa,
+            })
+        vout['valuecommitment'] = _commitment_hex(output['value'])
+    asset = explicit_asset(output['asset'])
+    if asset is not None:
+        vout['asset'] = asset
+    else:
+        vout['assetcommitment'] = _commitment_hex(output['asset'])
+    vout.update({
+        'commitmentnonce': _commitment_hex(output['nonce']),
+        'commitmentnonce_fully_valid': _fully_valid_pubkey(output['nonce']),
+        'n': n,
+        'scriptPubKey': _script_pubkey(output['script_pubkey'], network,
+                                       elements_version),
+    })
+    return vout
+
+
+def decode(hex_tx, network, elements_version=None):
+    """Decode a raw transaction (hex) as decoderawtransaction does
+
+    Addresses are encoded for network, scriptPubKey has the layout of
+    elements_version (the latest if None). Values are Satoshi; withash,
+    issued asset ids and rangeproof details other than the header are not
+    computed.
+    Raise TransactionDecodeError if hex_tx is not a valid transaction.
+    """
+    try:
+        data = bytes.fromhex(hex_tx)
+    except (TypeError, ValueError):
+        raise _error('invalid hex')
+    tx = deserialize(data)
+    coinbase = len(tx['vin']) == 1 and tx['vin'][0]['txid'] == NULL_TXID \
+        and tx['vin'][0]['vout'] == NULL_INDEX
+    tx_weight = len(serialize(tx, witness=False)) * \
+        (WITNESS_SCALE_FACTOR - 1) + len(data)
+    wtx_id = _sha256d(data)[::-1].hex()
+    return {
+        'txid': txid(tx),
+        'hash': wtx_id,
+        'wtxid': wtx_id,
+        'version': tx['version'],
+        'size': len(data),
+        'vsize': (tx_weight + WITNESS_SCALE_FACTOR - 1) //
+        WITNESS_SCALE_FACTOR,
+        'weight': tx_weight,
+        'locktime': tx['locktime'],
+        'vin': [_decode_input(i, coinbase) for i in tx['vin']],
+        'vout': [_decode_output(o, n, network, elements_version)
+                 for n, o in enumerate(tx['vout'])],
+    }
+
+
+def _explicit_output(script, asset, amount, nonce=NULL):
+    return {
+        'asset': bytes([EXPLICIT]) + bytes.fromhex(asset)[::-1],
+        'value': bytes([EXPLICIT]) + struct.pack('>Q', amount),
+        'nonce': nonce,
+        'script_pubkey': script,
+        'surjectionproof': b'',
+        'rangeproof': b'',
+    }
+
+
+def create(inputs, map_amount, map_asset, network, locktime=0,
+           replaceable=False):
+    """Unsigned transaction (hex), as createrawtransaction builds it
+
+    inputs are dicts with txid, vout and optionally sequence, map_amount
+    maps addresses (or 'fee') to amounts in sat, map_asset maps them to
+    assets. Outputs follow the order of map_amount, outputs to confidential
+    addresses carry the blinding key.
+    Raise InvalidAddressError if an address is not valid for network.
+    """
+    if replaceable:
+        sequence = SEQUENCE_RBF
+    elif locktime:
+        sequence = SEQUENCE_FINAL - 1
+    else:
+        sequence = SEQUENCE_FINAL
+
+    tx = {'version': TX_VERSION, 'locktime': locktime, 'vout': []}
+    tx['vin'] = [{
+        'txid': input_['txid'],
+        'vout': input_['vout'],
+        'is_pegin': False,
+        'script_sig': b'',
+        'sequence': input_.get('sequence', sequence),
+        'issuance': None,
+        'issuance_amount_rangeproof': b'',
+        'inflation_keys_rangeproof': b'',
+        'witness': [],
+        'pegin_witness': [],
+    } for input_ in inputs]
+
+    for key, amount in map_amount.items():
+        asset = map_asset.get(key)
+        if not asset:
+            raise MissingValueError('Missing asset for output {}'.format(key))
+        if key == 'fee':
+            tx['vout'].append(_explicit_output(b'', asset, amount))
+            continue
+        try:
+            script = address_script(key, network)
+            _, pubkey = parse_address(key, network)
+        except ValueError:
+            raise InvalidAddressError('Invalid address: {}'.format(key))
+        tx['vout'].append(_explicit_output(script, asset, amount,
+                                           pubkey or NULL))
+    return serialize(tx).hex()
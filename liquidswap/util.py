@@ -1,9 +1,14 @@
 import logging
 
+from liquidswap.liquidrpc import Satoshi
+from liquidswap.address import is_valid_address
 from liquidswap.constants import (
     PROPOSED_KEYS,
     ACCEPTED_KEYS,
+    PROPOSED_PSET_KEYS,
+    ACCEPTED_PSET_KEYS,
     ELEMENTS_MIN_VERSION,
+    PSET_MIN_VERSION,
     WALLET_MIN_VERSION,
     OWN_PROPOSAL_ERROR_MSG,
     NETWORK_REGTEST,
@@ -22,6 +27,9 @@ from liquidswap.exceptions import (
 
 
 def btc2sat(btc):
+    if isinstance(btc, Satoshi):
+        # already decoded as satoshis by the RPC codec
+        return int(btc)
     return round(btc * 10**8)
 
 
@@ -44,6 +52,15 @@ def sort_dict(d):
     return {k: v for k, v in sorted(d.items())}
 
 
+def get_output_address(output):
+    """Return the (unconfidential) address of a decoded output, if any
+    """
+    script_pubkey = output['scriptPubKey']
+    if 'addresses' in script_pubkey:
+        return script_pubkey['addresses'][0]
+    return script_pubkey.get('address')
+
+
 def get_chain_index(chain):
     if chain == 'liquidv1':
         network = NETWORK_MAINNET
@@ -55,7 +72,9 @@ def get_chain_index(chain):
 
 
 def is_mine(address, connection):
-    if not connection.validateaddress(address)['isvalid']:
+    # chain info is cached by the connection, the address is checked locally
+    network = get_chain_index(connection.getblockchaininfo().get('chain'))
+    if not is_valid_address(address, network):
         raise InvalidAddressError('Invalid address: {}'.format(address))
     return connection.getaddressinfo(address)['ismine']
 
@@ -74,24 +93,47 @@ def get_status(proposal):
         return 'proposed'
     elif set(proposal) == set(ACCEPTED_KEYS):
         return 'accepted'
+    elif set(proposal) == set(PROPOSED_PSET_KEYS):
+        return 'proposed_pset'
+    elif set(proposal) == set(ACCEPTED_PSET_KEYS):
+        return 'accepted_pset'
     else:
         raise UnexpectedValueError('Unexpected proposal {}'.format(proposal))
 
 
-def check_liquid_version(connection):
+def check_liquid_version(connection, network_info=None):
     """Raise error if Liquid version is below min supported
     """
-    network_info = connection.getnetworkinfo()
+    if network_info is None:
+        network_info = connection.getnetworkinfo()
     if network_info.get('version', 0) < ELEMENTS_MIN_VERSION:
         msg = 'Unsupported liquid version, must be at least {}'.format(
             ELEMENTS_MIN_VERSION)
         raise UnsupportedLiquidVersionError(msg)
 
 
-def check_wallet_version(connection):
+def supports_pset(network_info):
+    """Whether the node swaps with PSETs
+    """
+    return network_info.get('version', 0) >= PSET_MIN_VERSION
+
+
+def check_pset_version(connection, network_info=None):
+    """Raise error if the node cannot swap with PSETs
+    """
+    if network_info is None:
+        network_info = connection.getnetworkinfo()
+    if not supports_pset(network_info):
+        msg = 'Unsupported liquid version for PSET swaps, must be at least ' \
+              '{}'.format(PSET_MIN_VERSION)
+        raise UnsupportedLiquidVersionError(msg)
+
+
+def check_wallet_version(connection, wallet_info=None):
     """Raise error if wallet version is below min supported
     """
-    wallet_info = connection.getwalletinfo()
+    if wallet_info is None:
+        wallet_info = connection.getwalletinfo()
     if wallet_info.get('walletversion', 0) < WALLET_MIN_VERSION:
         msg = 'Unsupported wallet version, must be at least {}'.format(
             WALLET_MIN_VERSION)
@@ -101,15 +143,19 @@ def check_wallet_version(connection):
 def check_wallet_unlocked(connection):
     """Raise error if wallet is locked
     """
+    # the wallet may have been unlocked in the meantime
+    connection.invalidate_cache('getwalletinfo')
     wallet_info = connection.getwalletinfo()
     if wallet_info.get('unlocked_until', 1) == 0:
         raise LockedWalletError('Wallet locked, please unlock it to proceed')
 
 
-def check_network(expected_network, connection):
+def check_network(expected_network, connection, blockchain_info=None):
     """Raise error if expected network and node network mismatch
     """
-    network = get_chain_index(connection.getblockchaininfo().get('chain'))
+    if blockchain_info is None:
+        blockchain_info = connection.getblockchaininfo()
+    network = get_chain_index(blockchain_info.get('chain'))
     if network != expected_network:
         msg = 'Network mismatch: tool expecting {}, node using {}.'.format(
             NETWORK_NAMES[expected_network], NETWORK_NAMES[network])
@@ -119,9 +165,14 @@ def check_network(expected_network, connection):
 def do_initial_checks(connection, expected_network):
     """Do initial checks
     """
-    check_liquid_version(connection)
-    check_wallet_version(connection)
-    check_network(expected_network, connection)
+    with connection.batch() as batch:
+        network_info = batch.getnetworkinfo()
+        wallet_info = batch.getwalletinfo()
+        blockchain_info = batch.getblockchaininfo()
+
+    check_liquid_version(connection, network_info.result())
+    check_wallet_version(connection, wallet_info.result())
+    check_network(expected_network, connection, blockchain_info.result())
 
 
 def set_logging(verbose):
@@ -141,6 +192,18 @@ def compute_receiver_fee(connection, tx, proposer_fee):
 
     outputs = connection.decoderawtransaction(tx)['vout']
     fees = [o['value'] for o in outputs if o['scriptPubKey']['type'] == 'fee']
+    return _receiver_fee(fees, proposer_fee)
+
+
+def compute_receiver_fee_pset(connection, pset, proposer_fee):
+    """Compute transaction fees of a proposal accepted with a PSET
+    """
+
+    fees = list(connection.decodepsbt(pset)['fees'].values())
+    return _receiver_fee(fees, proposer_fee)
+
+
+def _receiver_fee(fees, proposer_fee):
     if len(fees) != 1:
         raise UnexpectedValueError('Missing fee')
     receiver_fee = btc2sat(fees[0]) - proposer_fee
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#
+# run concurrent swaps against the fake Elements node (no elementsd needed)
+# and check that they all succeed and leave the wallets consistent
+#
+# each swap proposes, accepts and finalizes in its own thread, the proposer
+# and the receiver wallets are shared by all the swaps: their unspents are
+# reserved so that concurrent swaps do not spend the same ones
+
+import argparse
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from liquidswap import swap
+from liquidswap.connect import get_connection
+from liquidswap.encode import encode_payload, decode_payload
+from liquidswap.fakenode import start_fake_nodes, DEFAULT_VERSION
+from liquidswap.reservation import ReservationStore
+from liquidswap.util import btc2sat
+
+
+def swap_once(urls, assets, amount_p, amount_r, reservations, pset):
+    """Propose, accept and finalize a swap, return its txid"""
+    c_p = get_connection({'service_url': urls[0]})
+    c_r = get_connection({'service_url': urls[1]})
+
+    proposal = swap.propose(btc2sat(amount_p), assets[0],
+                            btc2sat(amount_r), assets[1],
+                            c_p, reservations=reservations[0], pset=pset)
+    # payloads go through their encoding, as with the CLI
+    proposal = decode_payload(encode_payload(proposal))
+    acceptance = swap.accept_payload(proposal, c_r,
+                                     reservations=reservations[1])
+    acceptance = decode_payload(encode_payload(acceptance))
+    return swap.finalize_payload(acceptance, c_p, broadcast=True,
+                                 reservations=reservations[0])
+
+
+def balances(url):
+    """Wallet balances (sat) by asset label"""
+    return {label: btc2sat(amount) for label, amount in
+            get_connection({'service_url': url}).getbalance().items()}
+
+
+def check(condition, message):
+    if not condition:
+        print('FAIL: {}'.format(message))
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Concurrent swaps against the fake Elements node')
+    parser.add_argument('--swaps', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--version', type=int, default=DEFAULT_VERSION,
+                        help='Elements version to report')
+    parser.add_argument('--pset', action='store_true',
+                        help='swap with PSETs (version 220100 or later)')
+    args = parser.parse_args(argv)
+
+    amount_p, amount_r = Decimal('0.5'), Decimal('0.25')
+    # one unspent of each asset per swap, and as many for the fees
+    servers = start_fake_nodes(wallets=2, utxos=2 * args.swaps,
+                               version=args.version)
+    urls = [server.url for server in servers]
+    assets = [servers[0].chain.labels['asset{}'.format(i)] for i in (0, 1)]
+    before = [balances(url) for url in urls]
+    reservations = (ReservationStore(None), ReservationStore(None))
+    random_state = random.getstate()
+
+    with ThreadPoolExecutor(args.workers) as executor:
+        futures = [executor.submit(swap_once, urls, assets, amount_p,
+                                   amount_r, reservations, args.pset)
+                   for _ in range(args.swaps)]
+        txids = [future.result() for future in futures]
+
+    after = [balances(url) for url in urls]
+    total_p = btc2sat(amount_p) * args.swaps
+    total_r = btc2sat(amount_r) * args.swaps
+
+    check(len(set(txids)) == args.swaps, 'swaps share a transaction')
+    check(after[0]['asset0'] == before[0]['asset0'] - total_p and
+          after[0]['asset1'] == before[0].get('asset1', 0) + total_r,
+          'unexpected proposer balances: {}'.format(after[0]))
+    check(after[1]['asset1'] == before[1]['asset1'] - total_r and
+          after[1]['asset0'] == before[1].get('asset0', 0) + total_p,
+          'unexpected receiver balances: {}'.format(after[1]))
+    for url in urls:
+        connection = get_connection({'service_url': url})
+        check(not connection.listlockunspent(), 'unspents left locked')
+    check(not reservations[0].reservations(), 'proposer reservations left')
+    # the receiver reservations are only released by its next funding, once
+    # it sees them spent
+    connection = get_connection({'service_url': urls[1]})
+    check(all(connection.gettxout(txid, vout) is None
+              for txid, vout in reservations[1].outpoints()),
+          'receiver reservations not spent')
+    check(random.getstate() == random_state, 'global random state changed')
+    print('OK: {} swaps, {} workers'.format(args.swaps, args.workers))
+
+
+if __name__ == '__main__':
+    main()
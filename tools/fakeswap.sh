@@ -0,0 +1,27 @@
+#!/bin/bash
+#
+# run a swap with the CLI against the fake Elements node (no elementsd needed)
+# FAKENODE_VERSION sets the Elements version reported by the node, e.g.
+# 220100 to swap with PSETs
+
+set -e
+
+export LC_ALL=C.UTF-8
+export LANG=C.UTF-8
+
+python3 -m liquidswap.fakenode --port ${FAKENODE_PORT:-7050} \
+    ${FAKENODE_VERSION:+--version $FAKENODE_VERSION} > .fakenode &
+FAKENODE_PID=$!
+trap "kill $FAKENODE_PID; rm -f .fakenode *_fake.txt" EXIT
+sleep 1
+
+URL1=$(jq -r '.wallets[0].url' .fakenode)
+URL2=$(jq -r '.wallets[1].url' .fakenode)
+ASSET1=$(jq -r '.wallets[0].asset' .fakenode)
+ASSET2=$(jq -r '.wallets[1].asset' .fakenode)
+
+liquidswap-cli -r -u $URL1 propose $ASSET1 1 $ASSET2 2 -o proposal_fake.txt
+liquidswap-cli -r -u $URL2 info proposal_fake.txt
+liquidswap-cli -r -u $URL2 accept proposal_fake.txt -o accepted_fake.txt
+liquidswap-cli -r -u $URL1 info accepted_fake.txt
+liquidswap-cli -r -u $URL1 finalize accepted_fake.txt -s
@@ -32,3 +32,5 @@ ln -s elements-0.18.1.1 elements
 
 . ./tools/set_env.sh "${PWD}/elements/bin" "$PWD"
 ./tools/simpleswap.sh
+python3 tools/fakestress.py
+python3 tools/fakestress.py --version 220100 --pset